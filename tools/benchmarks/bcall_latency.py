@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018  weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure the latency of WebNip.do() over N fake backends.
+
+Each fake backend sleeps for --delay milliseconds and then yields --results
+objects. The overhead is the time spent after the slowest backend finished.
+"""
+
+from __future__ import print_function
+
+import argparse
+from threading import RLock
+import time
+
+from weboob.core.ouiboube import WebNip
+
+
+class FakeBackend(object):
+    def __init__(self, name, delay, results):
+        self.name = name
+        self.delay = delay
+        self.results = results
+        self.lock = RLock()
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, t, v, tb):
+        self.lock.release()
+
+    def has_caps(self, caps):
+        return True
+
+    def iter_results(self):
+        time.sleep(self.delay)
+        for i in range(self.results):
+            yield i
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', '--backends', type=int, default=50, help='number of fake backends')
+    parser.add_argument('-d', '--delay', type=float, default=10, help='time spent by each backend (ms)')
+    parser.add_argument('-r', '--results', type=int, default=10, help='results yielded by each backend')
+    parser.add_argument('-i', '--iterations', type=int, default=20)
+    parser.add_argument('-w', '--max-workers', type=int, default=None)
+    args = parser.parse_args()
+
+    weboob = WebNip(modules_path=False)
+    for i in range(args.backends):
+        name = 'fake%d' % i
+        weboob.backend_instances[name] = FakeBackend(name, args.delay / 1000., args.results)
+
+    timings = []
+    for _ in range(args.iterations):
+        start = time.time()
+        count = len(list(weboob.do('iter_results', max_workers=args.max_workers)))
+        timings.append(time.time() - start)
+        assert count == args.backends * args.results
+
+    timings.sort()
+    # With enough workers, the ideal duration is a single delay.
+    waves = 1
+    if args.max_workers:
+        waves = -(-args.backends // args.max_workers)
+    ideal = waves * args.delay / 1000.
+
+    print('%d backends, %d results each, %.1f ms delay, %d iterations' %
+          (args.backends, args.results, args.delay, args.iterations))
+    print('min    %8.2f ms (overhead %6.2f ms)' % (timings[0] * 1000, (timings[0] - ideal) * 1000))
+    print('median %8.2f ms (overhead %6.2f ms)' % (timings[len(timings) // 2] * 1000,
+                                                   (timings[len(timings) // 2] - ideal) * 1000))
+    print('max    %8.2f ms (overhead %6.2f ms)' % (timings[-1] * 1000, (timings[-1] - ideal) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018  weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure the time spent to parse a large bank history page with the
+elements of FrenchTransaction, and the part of it spent outside of the
+filters (elements instantiation, introspection and environment).
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+
+import lxml.html
+
+from weboob.browser.elements import ItemElement, TableElement
+from weboob.tools.capabilities.bank.transactions import FrenchTransaction as Transaction
+
+
+LABELS = [u'CB CARREFOUR %02d/%02d', u'VIR SEPA M. JEAN DUPONT', u'PRLV SEPA EDF', u'RETRAIT DAB %02d/%02d',
+          u'CHEQUE 1234567', u'FRAIS TENUE DE COMPTE']
+
+
+def make_history(rows):
+    html = [u'<html><body><table id="history"><thead><tr><th>Date</th><th>Valeur</th><th>Libellé</th>'
+            u'<th>Débit</th><th>Crédit</th></tr></thead><tbody>']
+    for i in range(rows):
+        day, month = i % 28 + 1, i % 12 + 1
+        label = LABELS[i % len(LABELS)]
+        if '%' in label:
+            label = label % (day, month)
+        amount = u'%d,%02d' % (i % 1000, i % 100)
+        html.append(u'<tr><td>%02d/%02d/2018</td><td>%02d/%02d/2018</td><td>%s</td><td>%s</td><td>%s</td></tr>'
+                    % (day, month, day, month, label, amount if i % 3 else u'', u'' if i % 3 else amount))
+    html.append(u'</tbody></table></body></html>')
+    return lxml.html.fromstring(u''.join(html))
+
+
+class FakePage(object):
+    browser = None
+
+    def __init__(self, doc, params):
+        self.doc = doc
+        self.params = params
+
+
+class History(Transaction.TransactionsElement):
+    head_xpath = '//table[@id="history"]/thead/tr/th'
+    item_xpath = '//table[@id="history"]/tbody/tr'
+
+
+class Empty(TableElement):
+    # Same elements, without any filter, to measure the overhead of elements.
+    head_xpath = History.head_xpath
+    item_xpath = History.item_xpath
+
+    col_date = History.col_date
+    col_vdate = History.col_vdate
+    col_raw = History.col_raw
+    col_credit = History.col_credit
+    col_debit = History.col_debit
+
+    class item(ItemElement):
+        klass = Transaction
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-r', '--rows', type=int, default=2000, help='number of transactions in the page')
+    parser.add_argument('-n', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    doc = make_history(args.rows)
+    # Typical page parameters: URL groups, and an account given to the method.
+    params = {'account_id': u'12345678901', 'page': u'1',
+              'account': {'id': u'12345678901', 'label': u'Compte courant', 'coming': [u'%d' % i for i in range(50)]}}
+
+    def report(name, klass):
+        page = FakePage(doc, params)
+        count = []
+        duration = min(timeit.repeat(lambda: count.append(len(list(klass(page)()))), number=1, repeat=args.repeat))
+        print('%-24s %8.2f ms  %6.2f us/row' % (name, duration * 1e3, duration / count[-1] * 1e6))
+
+    print('%d rows' % args.rows)
+    report('transactions', History)
+    report('elements only', Empty)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018  weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure the overhead of the @debug() decorator on filters, when parsing
+a transactions table, with the DEBUG_FILTERS level disabled and enabled.
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import timeit
+
+import lxml.html
+
+from weboob.browser.filters import base
+from weboob.browser.filters.standard import CleanText, CleanDecimal, Date
+from weboob.tools.log import getLogger, DEBUG_FILTERS
+
+
+def make_table(rows):
+    html = ['<table>']
+    for i in range(rows):
+        html.append('<tr><td>%02d/%02d/2018</td><td>  VIR SEPA  No %d  </td><td>-1 234,%02d</td></tr>'
+                    % (i % 28 + 1, i % 12 + 1, i, i % 100))
+    html.append('</table>')
+    return lxml.html.fromstring(''.join(html)).xpath('//tr')
+
+
+def parse(rows):
+    date = Date(CleanText('./td[1]'), dayfirst=True)
+    label = CleanText('./td[2]')
+    amount = CleanDecimal('./td[3]', replace_dots=True)
+    for row in rows:
+        date(row)
+        label(row)
+        amount(row)
+
+
+def unconditional(function):
+    # Previous behaviour: always build the message, even if it is discarded.
+    logger = getLogger('b2filters')
+
+    def print_debug(self, value):
+        logger.log(DEBUG_FILTERS, base.debug_message(self, value))
+        return function(self, value)
+    return print_debug
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-r', '--rows', type=int, default=5000, help='number of rows in the table')
+    parser.add_argument('-n', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = make_table(args.rows)
+    logger = getLogger('b2filters')
+    logger.propagate = False
+    logger.addHandler(logging.NullHandler())
+    # 3 filters, and the CleanText nested in Date.
+    calls = 4 * args.rows
+
+    def report(name):
+        duration = min(timeit.repeat(lambda: parse(rows), number=1, repeat=args.repeat))
+        print('%-34s %8.2f ms  %6.2f us/filter' % (name, duration * 1e3, duration / calls * 1e6))
+
+    print('%d rows, %d filter calls' % (args.rows, calls))
+
+    logger.setLevel(logging.DEBUG)
+    report('debug disabled')
+
+    filters = (CleanText, CleanDecimal, Date)
+    originals = dict((cls, cls.__dict__['filter']) for cls in filters)
+    for cls in filters:
+        setattr(cls, 'filter', unconditional(getattr(originals[cls], '__wrapped__', originals[cls])))
+    report('debug disabled, message built')
+    for cls in filters:
+        setattr(cls, 'filter', originals[cls])
+
+    logger.setLevel(DEBUG_FILTERS)
+    report('debug enabled')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018  weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure time and memory needed to build, copy and serialize lots of
+Transaction objects.
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import gc
+import time
+from decimal import Decimal
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from weboob.capabilities.bank import Transaction
+
+
+def build(count):
+    date = datetime.date(2018, 3, 1)
+    amount = Decimal('-12.34')
+    transactions = []
+    for i in range(count):
+        tr = Transaction()
+        tr.date = date
+        tr.rdate = date
+        tr.label = u'CB MONOPRIX %d' % (i % 1000)
+        tr.raw = u'CARTE 01/03 CB MONOPRIX %d' % (i % 1000)
+        tr.amount = amount
+        tr.type = Transaction.TYPE_CARD
+        transactions.append(tr)
+    return transactions
+
+
+def timed(name, func, count, memory):
+    gc.collect()
+    if memory:
+        tracemalloc.start()
+    start = time.time()
+    result = func()
+    duration = time.time() - start
+    line = '%-10s %8.2f s  %6.2f us/object' % (name, duration, duration / count * 1e6)
+    if memory:
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        line += '  %8.1f MiB  %5d bytes/object' % (size / 1024. / 1024, size // count)
+    print(line)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', '--count', type=int, default=1000000, help='number of transactions')
+    parser.add_argument('-m', '--memory', action='store_true',
+                        help='also measure allocated memory (slower, needs python 3)')
+    args = parser.parse_args()
+    if args.memory and tracemalloc is None:
+        parser.error('tracemalloc is not available')
+
+    transactions = timed('build', lambda: build(args.count), args.count, args.memory)
+    copies = timed('copy', lambda: [tr.copy() for tr in transactions], args.count, args.memory)
+    del copies
+    dicts = timed('to_dict', lambda: [tr.to_dict() for tr in transactions], args.count, args.memory)
+    transactions = None
+    timed('from_dict', lambda: [Transaction.from_dict(d) for d in dicts], args.count, args.memory)
+    timed('trusted', lambda: [Transaction.from_dict(d, trusted=True) for d in dicts], args.count, args.memory)
+
+
+if __name__ == '__main__':
+    main()
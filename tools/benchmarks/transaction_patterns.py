@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018  weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compare the classification of transaction labels by PatternsMatcher with
+the sequential matching of PATTERNS, for every PATTERNS list declared in
+bank modules, and measure both.
+"""
+
+from __future__ import print_function
+
+import argparse
+import ast
+import io
+import os
+import re
+import timeit
+
+from weboob.tools.capabilities.bank.transactions import FrenchTransaction, PatternsMatcher
+
+
+LABELS = [
+    u'CB CARREFOUR MARKET 12/03', u'CB SNCF INTERNET FACT.120318', u'CB RETRAIT DU 14/03 PARIS',
+    u'CARTE X1234 12/03 AMAZON EU', u'CARTE 12/03 LECLERC', u'PAIEMENT CB 1203 PARIS MONOPRIX',
+    u'PAIEMENT PAR CARTE X4321 FNAC 12/03', u'ACHAT CB MONOPRIX 12.03.18 CARTE NO 123',
+    u'RETRAIT DAB 12/03 PARIS 10', u'RETRAIT DAB 1203 BNP', u'RET DAB 12/03/18 LYON',
+    u'RETRAIT CB 12/03 14H32 PARIS', u'VIR SEPA M. JEAN DUPONT', u'VIREMENT RECU DE MME MARTIN',
+    u'VIR SEPA RECU /DE CAF DE PARIS /MOTIF ALLOCATIONS', u'VIREMENT EMIS VERS LIVRET A',
+    u'VIR INST RE 123456 DE: JEAN', u'VIRT SEPA LOYER MARS', u'PRLV SEPA EDF CLIENTS PARTICULIERS',
+    u'PRLV FREE MOBILE', u'PRELEVEMENT SEPA ORANGE', u'PRELEVEMENT EUROPEEN 123 DE: SFR',
+    u'ECHEANCE PRET 12345678', u'ECH PRET CAP+IN 12345', u'CHEQUE 1234567', u'CHEQUE N 7654321',
+    u'CHQ. 1234567', u'REMISE CHEQUES 12345', u'REMISE CHEQUE N 42', u'REM CHQ REF10203',
+    u'FRAIS TENUE DE COMPTE', u'COTISATION CARTE VISA PREMIER', u'COMMISSION INTERVENTION',
+    u'FRAIS PAIEMENT HORS ZONE EURO', u'INTERETS CREDITEURS', u'INTERETS DEBITEURS 1ER TRIM',
+    u'DEPOT ESPECES', u'VERSEMENT ESPECES AGENCE', u'AVOIR CB 12/03 AMAZON', u'REMBOURSEMENT CB 1203',
+    u'F COTIS VISA CLASSIC', u'F RETRAIT DAB HORS GROUPE', u'ANNUL VIR SEPA', u'PAIEMENT CHQ 123',
+    u'DEBIT MENSUEL CARTE', u'FACTURE CARTE DU 010318 CARREFOUR', u'PRELEVEMENT IMPOTS TIP',
+    u'TIP IMPOTS', u'ACHAT 12/03 CARREFOUR CARTE 1234', u'ABONNEMENT SERVICE EN LIGNE',
+    u'CREDIT CARTE 12/03 AMAZON', u'DEBIT CARTE BANCAIRE DIFFERE', u'SALAIRE MARS 2018',
+    u'REGLEMENT CARTE DU 28/02', u'PAIEMENT 12/03 CARTE X1234 SNCF', u'',
+]
+
+
+class TypeNames(dict):
+    # Any name used in PATTERNS (FrenchTransaction, Transaction, etc.) has
+    # the TYPE_* attributes of FrenchTransaction.
+    def __missing__(self, key):
+        return FrenchTransaction
+
+
+def find_patterns(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if not filename.endswith('.py'):
+                continue
+            path = os.path.join(dirpath, filename)
+            with io.open(path, 'rb') as fd:
+                try:
+                    tree = ast.parse(fd.read(), path)
+                except SyntaxError:
+                    continue
+            for node in ast.walk(tree):
+                if not isinstance(node, ast.ClassDef):
+                    continue
+                for stmt in node.body:
+                    if isinstance(stmt, ast.Assign) and [getattr(t, 'id', None) for t in stmt.targets] == ['PATTERNS']:
+                        try:
+                            patterns = eval(compile(ast.Expression(stmt.value), path, 'eval'), {}, TypeNames(re=re))
+                        except Exception:
+                            continue
+                        if patterns:
+                            yield '%s:%s' % (os.path.relpath(path, root), node.name), patterns
+
+
+def sequential(patterns, text):
+    for pattern, _type in patterns:
+        m = pattern.match(text)
+        if m:
+            return _type, m.groupdict()
+    return None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-m', '--modules', default=os.path.join(os.path.dirname(__file__), '..', '..', 'modules'),
+                        help='path to modules')
+    parser.add_argument('-n', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    total_seq = total_matcher = 0
+    count = mismatches = 0
+    for name, patterns in find_patterns(args.modules):
+        matcher = PatternsMatcher(patterns)
+        for label in LABELS:
+            count += 1
+            if sequential(patterns, label) != matcher.match(label):
+                mismatches += 1
+                print('MISMATCH %s %r' % (name, label))
+
+        duration_seq = min(timeit.repeat(lambda: [sequential(patterns, label) for label in LABELS],
+                                         number=10, repeat=args.repeat))
+        duration_matcher = min(timeit.repeat(lambda: [matcher.match(label) for label in LABELS],
+                                             number=10, repeat=args.repeat))
+        total_seq += duration_seq
+        total_matcher += duration_matcher
+        print('%-60s %3d patterns %7.2f us/label -> %7.2f us/label'
+              % (name, len(patterns), duration_seq / 10 / len(LABELS) * 1e6,
+                 duration_matcher / 10 / len(LABELS) * 1e6))
+
+    print('%d classifications, %d mismatches' % (count, mismatches))
+    print('total: sequential %.2f ms, matcher %.2f ms' % (total_seq * 1e3, total_matcher * 1e3))
+
+
+if __name__ == '__main__':
+    main()
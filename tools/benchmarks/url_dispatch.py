@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018  weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure how long it takes to find the URL object handling a response, and
+to build an URL, in a PagesBrowser with lots of URL objects.
+"""
+
+from __future__ import print_function
+
+import argparse
+import re
+import timeit
+
+from weboob.browser import PagesBrowser, URL
+from weboob.tools.regex_helper import normalize
+
+
+class FakePage(object):
+    def __init__(self, browser, response, params):
+        self.params = params
+
+
+def make_browser(count):
+    attrs = {'BASEURL': 'https://www.example-bank.fr/'}
+    for i in range(count):
+        attrs['url%d' % i] = URL(r'/espace/section%d/(?P<id>\d+)/details\.html' % i,
+                                 r'/espace/section%d/(?P<id>\d+)\?page=(?P<page>\d+)' % i,
+                                 FakePage)
+    return type('BigBrowser', (PagesBrowser,), attrs)()
+
+
+def naive_find(browser, url):
+    # Previous implementation: rebuild every regexp and try each URL.
+    for u in browser._urls.values():
+        for regex in u.urls:
+            if not re.match(r'^[\w\?]+://.*', regex):
+                regex = re.escape(browser.BASEURL).rstrip('/') + '/' + regex.lstrip('/')
+            if re.match(regex, url):
+                return u
+
+
+def indexed_find(browser, url):
+    for u in browser.get_url_index().iter_candidates(url):
+        if u.match(url):
+            return u
+
+
+def naive_build(url, **kwargs):
+    patterns = []
+    for u in url.urls:
+        patterns += normalize(u)
+    return patterns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', '--urls', type=int, default=60, help='number of URL objects in the browser')
+    parser.add_argument('-i', '--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    browser = make_browser(args.urls)
+    # Worst case for a linear scan: the last declared URL.
+    target = 'https://www.example-bank.fr/espace/section%d/1234?page=2' % (args.urls - 1)
+    last = getattr(browser, 'url%d' % (args.urls - 1))
+    assert naive_find(browser, target) is last
+    assert indexed_find(browser, target) is last
+
+    def report(name, func):
+        duration = min(timeit.repeat(func, number=args.iterations, repeat=3)) / args.iterations
+        print('%-28s %8.2f us' % (name, duration * 1e6))
+
+    print('%d URL objects, %d iterations' % (args.urls, args.iterations))
+    report('dispatch (linear, rebuilt)', lambda: naive_find(browser, target))
+    report('dispatch (indexed)', lambda: indexed_find(browser, target))
+    report('normalize() only, uncached', lambda: naive_build(last))
+    report('full build(), memoized', lambda: last.build(id=1234, page=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -48,6 +48,7 @@ from weboob.exceptions import BrowserHTTPSDowngrade, ModuleInstallError
 
 from weboob.tools.log import getLogger
 from weboob.tools.compat import basestring, unicode, urlparse, urljoin
+from weboob.tools.deadline import get_deadline
 from weboob.tools.json import json
 
 from .cookies import WeboobCookieJar
@@ -55,7 +56,7 @@ from .exceptions import HTTPNotFound, ClientError, ServerError
 from .sessions import FuturesSession
 from .profiles import Firefox
 from .pages import NextPage
-from .url import URL, normalize_url
+from .url import URL, URLIndex, normalize_url
 
 
 class Browser(object):
@@ -282,7 +283,8 @@ class Browser(object):
         When `is_async` is True, open() returns a Future object (see
         concurrent.futures for more details), which can be evaluated with its
         result() method. If any exception is raised while processing request,
-        it is caught and re-raised when calling result().
+        it is caught and re-raised when calling result(). The Future can also
+        be awaited from an asyncio coroutine.
 
         For example:
 
@@ -320,10 +322,12 @@ class Browser(object):
         req = self.build_request(url, referrer, data_encoding=data_encoding, **kwargs)
         preq = self.prepare_request(req)
 
-        if hasattr(preq, '_cookies'):
+        if hasattr(preq, '_cookies') and preq._cookies is not self.session.cookies:
             # The _cookies attribute is not present in requests < 2.2. As in
             # previous version it doesn't calls extract_cookies_to_jar(), it is
             # not a problem as we keep our own cookiejar instance.
+            # It is the session cookiejar when there are no cookies specific
+            # to the request, which does not need to be converted.
             preq._cookies = WeboobCookieJar.from_cookiejar(preq._cookies)
             if self.COOKIE_POLICY:
                 preq._cookies.set_policy(self.COOKIE_POLICY)
@@ -337,6 +341,19 @@ class Browser(object):
         if timeout is None:
             timeout = self.TIMEOUT
 
+        # When running in a backend call with a deadline, do not wait longer
+        # than the remaining time, and do not send anything once the call is
+        # stopped.
+        deadline = get_deadline()
+        if deadline is not None:
+            deadline.check()
+            remaining = deadline.remaining()
+            if remaining is not None:
+                if isinstance(timeout, tuple):
+                    timeout = tuple(min(t, remaining) if t else remaining for t in timeout)
+                else:
+                    timeout = min(timeout, remaining) if timeout else remaining
+
         # We define an inner_callback here in order to execute the same code
         # regardless of is_async param.
         def inner_callback(future, response):
@@ -361,6 +378,11 @@ class Browser(object):
     def async_open(self, url, **kwargs):
         """
         Shortcut to open(url, is_async=True).
+
+        The result can be used as a :class:`concurrent.futures.Future`, or
+        awaited from an asyncio coroutine:
+
+        >>> response = await browser.async_open('http://google.com') # doctest: +SKIP
         """
         if 'async' in kwargs:
             del kwargs['async']
@@ -640,6 +662,21 @@ class PagesBrowser(DomainBrowser):
     You can then use URL instances to go on pages.
     """
 
+    PREFETCH_PAGES = False
+    """
+    If True, the next page of a paginated list is fetched in background while
+    the current one is processed, when it is known beforehand (see
+    :meth:`prefetch` and :attr:`weboob.browser.elements.ListElement.next_page`).
+    Only enable it on websites which do not keep a navigation state.
+    """
+
+    PREFETCH_STATELESS_ONLY = True
+    """
+    If True, only GET requests are prefetched: other requests (like form
+    submissions) are usually not safe to send before the current page has
+    been processed.
+    """
+
     _urls = None
 
     def __init__(self, *args, **kwargs):
@@ -662,6 +699,24 @@ class PagesBrowser(DomainBrowser):
         for url in self._urls.values():
             url.browser = self
 
+        self._url_index = None
+        self._url_index_key = None
+        self._prefetched = None
+
+    def get_url_index(self):
+        """
+        Get the index used to find which :class:`URL` objects may handle a
+        response. It is rebuilt only if BASEURL or URL patterns change.
+
+        :rtype: :class:`weboob.browser.url.URLIndex`
+        """
+        urls = [url for url in self._urls.values() if url.klass is not None]
+        key = (self.BASEURL, tuple(tuple(url.urls) for url in urls))
+        if self._url_index_key != key:
+            self._url_index = URLIndex(urls, self.BASEURL)
+            self._url_index_key = key
+        return self._url_index
+
     def open(self, *args, **kwargs):
         """
         Same method than
@@ -677,34 +732,40 @@ class PagesBrowser(DomainBrowser):
         # asynchronous requests, see :meth:`Browser.open` and its `is_async`
         # and `callback` params.
         def internal_callback(response):
-            # Try to handle the response page with an URL instance.
-            response.page = None
-            if page_class:
-                response.page = page_class(self, response)
-                return callback(response)
+            self.handle_page(response, page_class)
+            return callback(response)
 
-            for url in self._urls.values():
-                response.page = url.handle(response)
-                if response.page is not None:
-                    self.logger.debug('Handle %s with %s', response.url, response.page.__class__.__name__)
-                    break
+        return super(PagesBrowser, self).open(callback=internal_callback, *args, **kwargs)
 
-            if response.page is None:
-                regexp = r'^(?P<proto>\w+)://.*'
+    def handle_page(self, response, page_class=None):
+        """
+        Set the `page` attribute of a response, with `page_class` if given,
+        or with the first :class:`URL` object which matches its url.
+        """
+        # Try to handle the response page with an URL instance.
+        response.page = None
+        if page_class:
+            response.page = page_class(self, response)
+            return
 
-                proto_response = re.match(regexp, response.url)
-                if proto_response:
-                    proto_response = proto_response.group('proto')
-                    proto_base = re.match(regexp, self.BASEURL).group('proto')
+        for url in self.get_url_index().iter_candidates(response.url):
+            response.page = url.handle(response)
+            if response.page is not None:
+                self.logger.debug('Handle %s with %s', response.url, response.page.__class__.__name__)
+                break
 
-                    if proto_base == 'https' and proto_response != 'https':
-                        raise BrowserHTTPSDowngrade()
+        if response.page is None:
+            regexp = r'^(?P<proto>\w+)://.*'
 
-                self.logger.debug('Unable to handle %s', response.url)
+            proto_response = re.match(regexp, response.url)
+            if proto_response:
+                proto_response = proto_response.group('proto')
+                proto_base = re.match(regexp, self.BASEURL).group('proto')
 
-            return callback(response)
+                if proto_base == 'https' and proto_response != 'https':
+                    raise BrowserHTTPSDowngrade()
 
-        return super(PagesBrowser, self).open(callback=internal_callback, *args, **kwargs)
+            self.logger.debug('Unable to handle %s', response.url)
 
     def location(self, *args, **kwargs):
         """
@@ -717,7 +778,13 @@ class PagesBrowser(DomainBrowser):
             # Call leave hook.
             self.page.on_leave()
 
-        response = self.open(*args, **kwargs)
+        prefetched, self._prefetched = self._prefetched, None
+        if prefetched is not None and len(args) == 1 and not kwargs and args[0] is prefetched[0]:
+            response = prefetched[1].result()
+        else:
+            if prefetched is not None:
+                prefetched[1].cancel()
+            response = self.open(*args, **kwargs)
 
         self.response = response
         self.page = response.page
@@ -730,6 +797,35 @@ class PagesBrowser(DomainBrowser):
         # Returns self.response in case on_load recalls location()
         return self.response
 
+    def prefetch(self, request):
+        """
+        Start to fetch a page in background, if :attr:`PREFETCH_PAGES` is
+        enabled. The next call to :meth:`location` with the same *request*
+        object will use the response instead of doing the request again.
+
+        It is called by :class:`weboob.browser.elements.ListElement` with its
+        next page, and can be called by pages with the request they are going
+        to give to :class:`weboob.browser.pages.NextPage`.
+
+        :param request: url or :class:`requests.Request` object
+        :returns: True if the request is being fetched
+        :rtype: bool
+        """
+        if not self.PREFETCH_PAGES:
+            return False
+
+        if self.PREFETCH_STATELESS_ONLY and isinstance(request, requests.Request):
+            method = request.method or ('POST' if request.data or request.files else 'GET')
+            if method.upper() not in ('GET', 'HEAD'):
+                return False
+
+        if self._prefetched is not None:
+            self._prefetched[1].cancel()
+
+        self.logger.debug('Prefetching %s', request.url if isinstance(request, requests.Request) else request)
+        self._prefetched = (request, self.open(request, is_async=True))
+        return True
+
     def pagination(self, func, *args, **kwargs):
         r"""
         This helper function can be used to handle pagination pages easily.
@@ -739,6 +835,10 @@ class PagesBrowser(DomainBrowser):
 
         :class:`NextPage` constructor can take an url or a Request object.
 
+        If :attr:`PREFETCH_PAGES` is enabled, the next page may already have
+        been fetched while the current one was processed (see
+        :meth:`prefetch`).
+
         >>> from .pages import HTMLPage
         >>> class Page(HTMLPage):
         ...     def iter_values(self):
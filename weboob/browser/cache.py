@@ -17,18 +17,150 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
-__all__ = ['CacheMixin']
+from email.utils import mktime_tz, parsedate_tz
+import hashlib
+import pickle
+import sqlite3
+from threading import Lock
+import time
+
+from requests import Request, Response
+from requests.structures import CaseInsensitiveDict
+
+from weboob.tools.compat import parse_qsl, urlencode, urlsplit, urlunsplit
+
+__all__ = ['CacheMixin', 'SQLiteCacheStore']
+
+
+def parse_cache_control(value):
+    """
+    Parse a Cache-Control header.
+
+    >>> sorted(parse_cache_control('no-cache, max-age=60, Private').items())
+    [('max-age', '60'), ('no-cache', None), ('private', None)]
+    """
+    directives = {}
+    for directive in (value or '').split(','):
+        name, _, arg = directive.partition('=')
+        name = name.strip().lower()
+        if name:
+            directives[name] = arg.strip().strip('"') or None
+    return directives
+
+
+def parse_http_date(value):
+    """
+    Parse a date from an HTTP header to a timestamp, or None if it is invalid.
+
+    >>> parse_http_date('Thu, 01 Jan 1970 00:01:00 GMT')
+    60
+    >>> parse_http_date('0') is None
+    True
+    """
+    parsed = parsedate_tz(value or '')
+    if parsed is None:
+        return None
+    return mktime_tz(parsed)
 
 
 class CacheEntry(object):
-    def __init__(self, response):
+    def __init__(self, response, shared=False):
         self.response = response
+        self.shared = shared
         self.etag = response.headers.get('ETag')
         self.last_modified = response.headers.get('Last-Modified')
+        self.cache_control = {}
+        self.expires = None
+        self.stale_until = None
+        self.update_freshness(response)
+
+    def update_freshness(self, response):
+        """
+        Compute when the entry expires, from headers of a response to the
+        same request, according to RFC 7234 and RFC 5861.
+        """
+        if 'Cache-Control' in response.headers:
+            self.cache_control = parse_cache_control(response.headers['Cache-Control'])
+
+        self.expires = self.stale_until = None
+        if 'no-cache' in self.cache_control:
+            return
+
+        now = time.time()
+        # s-maxage overrides max-age only for shared caches.
+        directives = ('s-maxage', 'max-age') if self.shared else ('max-age',)
+        directive = next((d for d in directives if d in self.cache_control), None)
+        if directive is not None:
+            lifetime = self._get_seconds(directive)
+            if lifetime is None:
+                return
+        elif 'Expires' in response.headers:
+            expires = parse_http_date(response.headers['Expires'])
+            if expires is None:
+                # An invalid date means "already expired".
+                return
+            date = parse_http_date(response.headers.get('Date')) or now
+            lifetime = expires - date
+        else:
+            return
+
+        try:
+            age = int(response.headers.get('Age', 0))
+        except ValueError:
+            age = 0
+        self.expires = now + lifetime - age
+
+        # RFC 5861: a stale response can be used while it is revalidated in
+        # background.
+        stale = self._get_seconds('stale-while-revalidate')
+        if stale and 'must-revalidate' not in self.cache_control and \
+           not (self.shared and 'proxy-revalidate' in self.cache_control):
+            self.stale_until = self.expires + stale
+
+    def _get_seconds(self, directive):
+        try:
+            return int(self.cache_control.get(directive))
+        except (TypeError, ValueError):
+            return None
+
+    def is_fresh(self):
+        return self.expires is not None and time.time() < self.expires
+
+    def can_serve_stale(self):
+        return self.stale_until is not None and time.time() < self.stale_until
+
+    def is_storable(self):
+        if 'no-store' in self.cache_control:
+            return False
+        if self.shared and 'private' in self.cache_control:
+            return False
+        return bool(self.has_cache_key() or self.expires is not None)
 
     def has_cache_key(self):
         return (self.etag or self.last_modified)
 
+    # The response itself can not be pickled, as its request holds hooks
+    # bound to the browser. Only what is needed to rebuild it is kept.
+    RESPONSE_ATTRS = ('status_code', 'reason', 'url', 'encoding')
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        response = state.pop('response')
+        state['response_state'] = dict((attr, getattr(response, attr)) for attr in self.RESPONSE_ATTRS)
+        state['response_state']['headers'] = dict(response.headers)
+        state['response_state']['_content'] = response.content
+        return state
+
+    def __setstate__(self, state):
+        response_state = state.pop('response_state')
+        response = Response()
+        response.headers = CaseInsensitiveDict(response_state.pop('headers'))
+        for attr, value in response_state.items():
+            setattr(response, attr, value)
+        response._content_consumed = True
+        state['response'] = response
+        self.__dict__.update(state)
+
     def update_request(self, request):
         if self.last_modified:
             request.headers['If-Modified-Since'] = self.last_modified
@@ -36,6 +168,102 @@ class CacheEntry(object):
             request.headers['If-None-Match'] = self.etag
 
 
+class SQLiteCacheStore(object):
+    """
+    Cache store keeping entries in a SQLite database, so the cache is kept
+    between runs.
+
+    It behaves like a dict, except that keys are hashed and can not be
+    iterated. Values are pickled. When the total size of entries exceeds
+    `max_size`, least recently used entries are evicted.
+
+    It can be used as the :attr:`CacheMixin.cache` store:
+
+    >>> browser.cache = SQLiteCacheStore('/path/to/cache.sqlite') # doctest: +SKIP
+
+    :param path: path of the database file
+    :type path: :class:`str`
+    :param max_size: maximum size of the cache in bytes, or None for no limit
+    :type max_size: :class:`int`
+    """
+
+    def __init__(self, path, max_size=100 * 1024 * 1024):
+        self.path = path
+        self.max_size = max_size
+        self.lock = Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS cache ('
+                            'key TEXT PRIMARY KEY, value BLOB, size INTEGER, accessed REAL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+
+    def make_key(self, key):
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def __getitem__(self, key):
+        key = self.make_key(key)
+        with self.lock, self.db:
+            row = self.db.execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            self.db.execute('UPDATE cache SET accessed = ? WHERE key = ?', (time.time(), key))
+        return pickle.loads(bytes(row[0]))
+
+    def __setitem__(self, key, value):
+        key = self.make_key(key)
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock, self.db:
+            self.db.execute('INSERT OR REPLACE INTO cache (key, value, size, accessed) VALUES (?, ?, ?, ?)',
+                            (key, sqlite3.Binary(data), len(data), time.time()))
+            self._evict()
+
+    def _evict(self):
+        # Must be called with self.lock held, in a transaction.
+        if self.max_size is None:
+            return
+
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+        if total <= self.max_size:
+            return
+
+        cursor = self.db.execute('SELECT key, size FROM cache ORDER BY accessed')
+        to_delete = []
+        for key, size in cursor:
+            if total <= self.max_size:
+                break
+            to_delete.append((key,))
+            total -= size
+        self.db.executemany('DELETE FROM cache WHERE key = ?', to_delete)
+
+    def __delitem__(self, key):
+        key = self.make_key(key)
+        with self.lock, self.db:
+            if not self.db.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount:
+                raise KeyError(key)
+
+    def __contains__(self, key):
+        key = self.make_key(key)
+        with self.lock:
+            return self.db.execute('SELECT 1 FROM cache WHERE key = ?', (key,)).fetchone() is not None
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def clear(self):
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM cache')
+
+    def close(self):
+        self.db.close()
+
+
 class CacheMixin(object):
     """Mixin to inherit in a Browser"""
 
@@ -47,7 +275,8 @@ class CacheMixin(object):
         """Cache store object
 
         To limit the size of the cache, a :class:`weboob.tools.lrudict.LimitedLRUDict`
-        instance can be used.
+        instance can be used. To keep the cache between runs, use a
+        :class:`SQLiteCacheStore` instance. Any other mapping can be used.
         """
 
         self.is_updatable = True
@@ -60,39 +289,153 @@ class CacheMixin(object):
         If `True`, the `ETag` and `Last-Modified` of the response will be
         stored along with the cache. When the request is re-executed, instead
         of simply returning the previous response, the server is queried to
-        check if a newer version of the page exists.
+        check if a newer version of the page exists, unless the response is
+        still fresh according to its `Cache-Control` or `Expires` headers.
         If a newer page exists, it is returned instead and overwrites the
         obsolete page in the cache.
+
+        A stale response allowed by `stale-while-revalidate` is returned
+        immediately, and revalidated in background.
+        """
+
+        self.is_shared = False
+
+        """Whether the cache is shared between several users
+
+        A shared cache honors `s-maxage` and does not store `private`
+        responses.
+        """
+
+        self.cache_key_headers = None
+
+        """Headers taken into account to make cache keys
+
+        None to use all headers, except those in
+        :attr:`cache_key_ignored_headers`. Set it to a list of names to only
+        use those headers.
+        """
+
+        self.cache_key_ignored_headers = ('Cookie', 'Referer', 'User-Agent')
+
+        """Headers ignored to make cache keys
+
+        They do not change the response, so they should not prevent cache
+        hits.
+        """
+
+        self.cache_key_ignored_params = ()
+
+        """Query parameters ignored to make cache keys
+
+        For example, tracking identifiers or timestamps which do not change
+        the response.
         """
 
+        self.revalidating = set()
+
+    def normalize_cache_url(self, url, params=None):
+        """
+        Canonicalize a URL for cache keys: query parameters are merged with
+        `params`, sorted, and those in :attr:`cache_key_ignored_params` are
+        removed. The fragment is dropped.
+        """
+        scheme, netloc, path, query, _ = urlsplit(url)
+        query = parse_qsl(query, keep_blank_values=True)
+        if params:
+            query.extend(params.items() if isinstance(params, dict) else params)
+        # Sort by name only, as the order of repeated parameters may matter.
+        query = sorted(((k, v) for k, v in query if k not in self.cache_key_ignored_params), key=lambda kv: kv[0])
+        return urlunsplit((scheme.lower(), netloc.lower(), path, urlencode(query, doseq=True), ''))
+
     def make_cache_key(self, request):
         """Make a key for the cache corresponding to the request."""
 
         body = getattr(request, 'body', None)
-        headers = tuple(request.headers.values())
-        return (request.method, request.url, body, headers)
+        if body is None:
+            # Not prepared request
+            body = getattr(request, 'data', None)
+        # Encode data so that keys are hashable, even with lists of values.
+        if isinstance(body, dict):
+            body = urlencode(sorted(body.items()), doseq=True)
+        elif isinstance(body, (list, tuple)):
+            body = urlencode(body, doseq=True)
+
+        ignored = set(name.lower() for name in self.cache_key_ignored_headers)
+        headers = [(name, value) for name, value in request.headers.items() if name.lower() not in ignored]
+        if self.cache_key_headers is not None:
+            allowed = set(name.lower() for name in self.cache_key_headers)
+            headers = [(name, value) for name, value in headers if name.lower() in allowed]
+        headers = tuple(sorted((name.lower(), value) for name, value in headers))
+        url = self.normalize_cache_url(request.url, getattr(request, 'params', None))
+        return (request.method, url, body, headers)
+
+    def _store_response(self, key, entry, response):
+        if response.status_code == 304 and entry is not None:
+            # Headers of the 304 response tell how long the entry is fresh.
+            entry.update_freshness(response)
+            self.cache[key] = entry
+            return entry.response
+        elif response.status_code == 200:
+            entry = CacheEntry(response, self.is_shared)
+            if entry.is_storable():
+                self.logger.debug('storing %r response in cache', response.url)
+                self.cache[key] = entry
+        return response
+
+    def _revalidate(self, key, entry, request, kwargs):
+        if key in self.revalidating:
+            return
+
+        self.revalidating.add(key)
+        entry.update_request(request)
+
+        def done(future):
+            self.revalidating.discard(key)
+            if future.exception() is not None:
+                self.logger.debug('unable to revalidate %r: %s', request.url, future.exception())
+
+        future = super(CacheMixin, self).open(request, is_async=True,
+                                              callback=lambda response: self._store_response(key, entry, response),
+                                              **kwargs)
+        future.add_done_callback(done)
+
+    def _restore_response(self, response, request):
+        if response.request is None:
+            # Responses loaded from a persistent store, like
+            # SQLiteCacheStore, lose their request and their page.
+            if isinstance(request, Request):
+                request = self.prepare_request(request)
+            response.request = request
+            handle_page = getattr(self, 'handle_page', None)
+            if handle_page is not None:
+                handle_page(response)
+        return response
 
     def open_with_cache(self, url, **kwargs):
         """Perform a request using the cache if possible."""
         request = self.build_request(url, **kwargs)
 
         key = self.make_cache_key(request)
-        if key in self.cache:
-            if not self.is_updatable:
+        try:
+            entry = self.cache[key]
+        except KeyError:
+            entry = None
+
+        if entry is not None:
+            if not self.is_updatable or entry.is_fresh():
                 self.logger.debug('cache HIT for %r', request.url)
-                return self.cache[key].response
+                return self._restore_response(entry.response, request)
+            elif entry.can_serve_stale():
+                self.logger.debug('cache HIT for %r (stale, revalidating)', request.url)
+                self._revalidate(key, entry, request, kwargs)
+                return self._restore_response(entry.response, request)
             else:
-                self.cache[key].update_request(request)
+                entry.update_request(request)
 
         response = super(CacheMixin, self).open(request, **kwargs)
-        if response.status_code == 304:
+        if response.status_code == 304 and entry is not None:
             self.logger.debug('cache HIT for %r', request.url)
-            return self.cache[key].response
-        elif response.status_code == 200:
-            entry = CacheEntry(response)
-            if entry.has_cache_key():
-                self.logger.debug('storing %r response in cache', request.url)
-                self.cache[key] = entry
+            return self._restore_response(self._store_response(key, entry, response), response.request)
 
         self.logger.debug('cache MISS for %r', request.url)
-        return response
+        return self._store_response(key, entry, response)
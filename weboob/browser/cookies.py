@@ -26,6 +26,29 @@ except ImportError:
 __all__ = ['WeboobCookieJar', 'BlockAllCookies']
 
 
+def request_domains(request):
+    """
+    Get the cookie domains which can match the host of a request, according
+    to :class:`cookielib.DefaultCookiePolicy`: the host and all its parent
+    domains, with and without a leading dot.
+
+    >>> from requests.cookies import MockRequest
+    >>> from requests import Request
+    >>> sorted(request_domains(MockRequest(Request('GET', 'https://www.example.com:8080/path'))))
+    ['', '.com', '.example.com', '.www.example.com', 'com', 'example.com', 'www.example.com']
+
+    :rtype: :class:`set`
+    """
+    domains = set([''])
+    for host in cookielib.eff_request_host(request):
+        labels = host.split('.')
+        for i in range(len(labels)):
+            domain = '.'.join(labels[i:])
+            domains.add(domain)
+            domains.add('.' + domain)
+    return domains
+
+
 class WeboobCookieJar(requests.cookies.RequestsCookieJar):
     @classmethod
     def from_cookiejar(klass, cj):
@@ -41,6 +64,18 @@ class WeboobCookieJar(requests.cookies.RequestsCookieJar):
         cj = requests.cookies.merge_cookies(cookielib.LWPCookieJar(), self)
         cj.save(filename, ignore_discard=True, ignore_expires=True)
 
+    def _cookies_for_request(self, request):
+        if not isinstance(self._policy, cookielib.DefaultCookiePolicy):
+            return super(WeboobCookieJar, self)._cookies_for_request(request)
+
+        # Do not evaluate the policy on domains which can't match the request.
+        domains = request_domains(request)
+        cookies = []
+        for domain in self._cookies:
+            if domain in domains:
+                cookies.extend(self._cookies_for_domain(domain, request))
+        return cookies
+
     def copy(self):
         """Return an object copy of the cookie jar."""
         new_cj = type(self)()
@@ -26,12 +26,19 @@ from collections import OrderedDict
 from copy import deepcopy
 import traceback
 
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
 import lxml.html
 
 from weboob.tools.log import getLogger, DEBUG_FILTERS
 from weboob.tools.compat import basestring, unicode, with_metaclass
 from weboob.browser.pages import NextPage
+from weboob.capabilities.base import IMMUTABLE_TYPES, _DELETED
 
+from .filters.base import select_css, select_xpath
 from .filters.standard import _Filter, CleanText
 from .filters.html import AttributeNotFound, XPathNotFound
 
@@ -55,7 +62,110 @@ def method(klass):
     return inner
 
 
-class AbstractElement(object):
+class ElementEnv(MutableMapping):
+    """
+    Environment of an element, chained to the one of its parent.
+
+    Keys which are not set on the element itself are looked up in the
+    parent. Mutable values are deep-copied on first access, so changes are
+    never seen by the parent nor by siblings, as if the whole environment
+    had been copied, but only the used keys are.
+    """
+
+    def __init__(self, parent=None):
+        self._data = {}
+        self._parent = parent
+
+    def _lookup(self, key):
+        env = self
+        while isinstance(env, ElementEnv):
+            if key in env._data:
+                value = env._data[key]
+                if value is _DELETED:
+                    raise KeyError(key)
+                return value
+            env = env._parent
+
+        if env is None:
+            raise KeyError(key)
+        return env[key]
+
+    def __getitem__(self, key):
+        try:
+            return self._data[key]
+        except KeyError:
+            pass
+
+        value = self._lookup(key)
+        if not isinstance(value, IMMUTABLE_TYPES):
+            value = self._data[key] = deepcopy(value)
+        return value
+
+    def __contains__(self, key):
+        try:
+            self._lookup(key)
+        except KeyError:
+            return False
+        else:
+            return True
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._data[key] = _DELETED
+
+    def __iter__(self):
+        if self._parent is not None:
+            for key in self._parent:
+                if key not in self._data:
+                    yield key
+        for key, value in self._data.items():
+            if value is not _DELETED:
+                yield key
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, dict(self))
+
+
+class _ElementMeta(type):
+    """
+    Private meta-class used to find, once per class, the nested elements,
+    the load_* loaders and the col_* columns definitions.
+    """
+    def __new__(mcs, name, bases, attrs):
+        new_class = super(_ElementMeta, mcs).__new__(mcs, name, bases, attrs)
+
+        new_class._item_classes = []
+        new_class._loaders = []
+        new_class._columns = {}
+        for attrname in dir(new_class):
+            attr = getattr(new_class, attrname)
+            if isinstance(attr, _ElementMeta) and attr is not new_class:
+                new_class._item_classes.append(attr)
+                continue
+
+            m = re.match('load_(.*)', attrname)
+            if m:
+                new_class._loaders.append((m.group(1), attrname))
+                continue
+
+            m = re.match('col_(.*)', attrname)
+            if m:
+                cols = attr
+                if not isinstance(cols, (list,tuple)):
+                    cols = [cols]
+                new_class._columns[m.group(1)] = [s.lower() if isinstance(s, (str, unicode)) else s for s in cols]
+
+        return new_class
+
+
+class AbstractElement(with_metaclass(_ElementMeta, object)):
     _creation_counter = 0
     condition = None
 
@@ -70,9 +180,9 @@ class AbstractElement(object):
             self.el = page.doc
 
         if parent is not None:
-            self.env = deepcopy(parent.env)
+            self.env = ElementEnv(parent.env)
         else:
-            self.env = deepcopy(page.params)
+            self.env = ElementEnv(page.params)
 
         # Used by debug
         self._random_id = AbstractElement._creation_counter
@@ -98,17 +208,17 @@ class AbstractElement(object):
         pass
 
     def cssselect(self, *args, **kwargs):
+        if len(args) == 1 and not kwargs:
+            return select_css(self.el, args[0])
         return self.el.cssselect(*args, **kwargs)
 
     def xpath(self, *args, **kwargs):
+        if len(args) == 1 and not kwargs:
+            return select_xpath(self.el, args[0])
         return self.el.xpath(*args, **kwargs)
 
     def handle_loaders(self):
-        for attrname in dir(self):
-            m = re.match('load_(.*)', attrname)
-            if not m:
-                continue
-            name = m.group(1)
+        for name, attrname in self._loaders:
             if name in self.loaders:
                 continue
             loader = getattr(self, attrname)
@@ -138,7 +248,7 @@ class ListElement(AbstractElement):
         sufficient.
         """
         if self.item_xpath is not None:
-            for el in self.el.xpath(self.item_xpath):
+            for el in select_xpath(self.el, self.item_xpath):
                 yield el
         else:
             yield self.el
@@ -149,17 +259,23 @@ class ListElement(AbstractElement):
 
         self.parse(self.el)
 
+        # Evaluate next page beforehand, so that the browser can fetch it
+        # while items of this one are processed.
+        prefetch = getattr(self.page.browser, 'PREFETCH_PAGES', False)
+        if prefetch:
+            next_page = self.get_next_page()
+            if next_page is not None:
+                self.page.browser.prefetch(next_page)
+
         items = []
         for el in self.find_elements():
-            for attrname in dir(self):
-                attr = getattr(self, attrname)
-                if isinstance(attr, type) and issubclass(attr, AbstractElement) and attr != type(self):
-                    item = attr(self.page, self, el)
-                    if item.condition is not None and not item.condition():
-                        continue
+            for klass in self._item_classes:
+                item = klass(self.page, self, el)
+                if item.condition is not None and not item.condition():
+                    continue
 
-                    item.handle_loaders()
-                    items.append(item)
+                item.handle_loaders()
+                items.append(item)
 
         for item in items:
             for obj in item:
@@ -171,22 +287,32 @@ class ListElement(AbstractElement):
             for obj in self.flush():
                 yield obj
 
-        self.check_next_page()
+        if prefetch:
+            if next_page is not None:
+                raise NextPage(next_page)
+        else:
+            self.check_next_page()
 
     def flush(self):
         for obj in self.objects.values():
             yield obj
 
-    def check_next_page(self):
+    def get_next_page(self):
+        """
+        Get the request of the next page, from the `next_page` attribute
+        (a filter or a method), if any.
+        """
         if not hasattr(self, 'next_page'):
-            return
+            return None
 
         next_page = getattr(self, 'next_page')
         try:
-            value = self.use_selector(next_page)
+            return self.use_selector(next_page)
         except (AttributeNotFound, XPathNotFound):
-            return
+            return None
 
+    def check_next_page(self):
+        value = self.get_next_page()
         if value is None:
             return
 
@@ -211,7 +337,7 @@ class SkipItem(Exception):
     """
 
 
-class _ItemElementMeta(type):
+class _ItemElementMeta(_ElementMeta):
     """
     Private meta-class used to keep order of obj_* attributes in :class:`ItemElement`.
     """
@@ -233,7 +359,6 @@ class _ItemElementMeta(type):
 
 class ItemElement(with_metaclass(_ItemElementMeta, AbstractElement)):
     _attrs = None
-    _loaders = None
     klass = None
     validate = None
 
@@ -344,19 +469,10 @@ class TableElement(ListElement):
 
         self._cols = {}
 
-        columns = {}
-        for attrname in dir(self):
-            m = re.match('col_(.*)', attrname)
-            if m:
-                cols = getattr(self, attrname)
-                if not isinstance(cols, (list,tuple)):
-                    cols = [cols]
-                columns[m.group(1)] = [s.lower() if isinstance(s, (str, unicode)) else s for s in cols]
-
         colnum = 0
-        for el in self.el.xpath(self.head_xpath):
+        for el in select_xpath(self.el, self.head_xpath):
             title = self.cleaner.clean(el)
-            for name, titles in columns.items():
+            for name, titles in self._columns.items():
                 if name in self._cols:
                     continue
                 if title.lower() in [s for s in titles if isinstance(s, (str, unicode))] or \
@@ -19,6 +19,7 @@
 
 from functools import wraps
 
+import lxml.etree
 import lxml.html
 
 from weboob.exceptions import ParseError
@@ -29,6 +30,89 @@ from weboob.tools.log import getLogger, DEBUG_FILTERS
 __all__ = ['FilterError', 'Filter',]
 
 
+XPATH_CACHE_SIZE = 10000
+"""
+Maximum number of compiled XPath and CSS selectors kept by :func:`select_xpath`
+and :func:`select_css`.
+"""
+
+_xpath_cache = {}
+
+
+def get_compiled_selector(selector, css=False, translator='html'):
+    """
+    Get a compiled version of a XPath or CSS selector, shared by the whole
+    process.
+
+    `translator` is the cssselect translator used for CSS selectors:
+    'html' for HTML documents, 'xml' for case-sensitive XML ones.
+
+    Functions defined by
+    :meth:`weboob.browser.pages.HTMLPage.define_xpath_functions` are
+    available, as they are registered in the default namespace.
+
+    :returns: a :class:`lxml.etree.XPath` object, or None if the selector
+              can't be compiled
+    """
+    key = (selector, css, translator if css else None)
+    try:
+        return _xpath_cache[key]
+    except KeyError:
+        pass
+
+    try:
+        if css:
+            from lxml.cssselect import CSSSelector
+            compiled = CSSSelector(selector, translator=translator)
+        else:
+            compiled = lxml.etree.XPath(selector)
+    except Exception:
+        # Let the caller raise the usual error.
+        compiled = None
+
+    if len(_xpath_cache) >= XPATH_CACHE_SIZE:
+        _xpath_cache.clear()
+    _xpath_cache[key] = compiled
+    return compiled
+
+
+def select_xpath(item, selector):
+    """
+    Same as `item.xpath(selector)`, but with the compiled selector cached
+    if item is an lxml element or document.
+
+    >>> select_xpath(lxml.html.fromstring('<p><b>foo</b></p>'), './b/text()')
+    ['foo']
+    """
+    if isinstance(item, (lxml.etree._Element, lxml.etree._ElementTree)):
+        compiled = get_compiled_selector(selector)
+        if compiled is not None:
+            return compiled(item)
+    return item.xpath(selector)
+
+
+def select_css(item, selector):
+    """
+    Same as `item.cssselect(selector)`, but with the compiled selector
+    cached if item is an lxml element or document.
+
+    Like `cssselect()`, HTML elements are matched case-insensitively, and
+    XML ones case-sensitively.
+
+    >>> len(select_css(lxml.etree.fromstring('<Root><Item/></Root>'), 'Item'))
+    1
+    >>> len(select_css(lxml.html.fromstring('<div><P>foo</P></div>'), 'p'))
+    1
+    """
+    if isinstance(item, (lxml.etree._Element, lxml.etree._ElementTree)):
+        root = item.getroot() if isinstance(item, lxml.etree._ElementTree) else item
+        translator = 'html' if isinstance(root, lxml.html.HtmlMixin) else 'xml'
+        compiled = get_compiled_selector(selector, css=True, translator=translator)
+        if compiled is not None:
+            return compiled(item)
+    return item.cssselect(selector)
+
+
 class NoDefault(object):
     def __repr__(self):
         return 'NO_DEFAULT'
@@ -92,46 +176,59 @@ def debug(*args):
     A decorator function to provide some debug information
     in Filters.
     It prints by default the name of the Filter and the input value.
+
+    The message is only built when the DEBUG_FILTERS level is enabled on
+    the "b2filters" logger, otherwise the decorated method is called
+    directly.
     """
+    logger = getLogger('b2filters')
+
     def wraper(function):
         @wraps(function)
         def print_debug(self, value):
-            logger = getLogger('b2filters')
-            result = ''
-            outputvalue = value
-            if isinstance(value, list):
-                from lxml import etree
-                outputvalue = ''
-                first = True
-                for element in value:
-                    if first:
-                        first = False
-                    else:
-                        outputvalue += ', '
-                    if isinstance(element, etree.ElementBase):
-                        outputvalue += "%s" % etree.tostring(element, encoding=unicode)
-                    else:
-                        outputvalue += "%r" % element
-            if self._obj is not None:
-                result += "%s" % self._obj._random_id
-            if self._key is not None:
-                result += ".%s" % self._key
-            name = str(self)
-            result += " %s(%r" % (name, outputvalue)
-            for arg in self.__dict__:
-                if arg.startswith('_') or arg == u"selector":
-                    continue
-                if arg == u'default' and getattr(self, arg) == _NO_DEFAULT:
-                    continue
-                result += ", %s=%r" % (arg, getattr(self, arg))
-            result += u')'
-            logger.log(DEBUG_FILTERS, result)
-            res = function(self, value)
-            return res
+            if logger.isEnabledFor(DEBUG_FILTERS):
+                logger.log(DEBUG_FILTERS, debug_message(self, value))
+            return function(self, value)
         return print_debug
     return wraper
 
 
+def debug_message(flt, value):
+    """
+    Build the message logged by :func:`debug` when the *flt* filter is called with
+    *value*.
+    """
+    result = ''
+    outputvalue = value
+    if isinstance(value, list):
+        from lxml import etree
+        outputvalue = ''
+        first = True
+        for element in value:
+            if first:
+                first = False
+            else:
+                outputvalue += ', '
+            if isinstance(element, etree.ElementBase):
+                outputvalue += "%s" % etree.tostring(element, encoding=unicode)
+            else:
+                outputvalue += "%r" % element
+    if flt._obj is not None:
+        result += "%s" % flt._obj._random_id
+    if flt._key is not None:
+        result += ".%s" % flt._key
+    name = str(flt)
+    result += " %s(%r" % (name, outputvalue)
+    for arg in flt.__dict__:
+        if arg.startswith('_') or arg == u"selector":
+            continue
+        if arg == u'default' and getattr(flt, arg) == _NO_DEFAULT:
+            continue
+        result += ", %s=%r" % (arg, getattr(flt, arg))
+    result += u')'
+    return result
+
+
 class Filter(_Filter):
     """
     Class used to filter on a HTML element given as call parameter to return
@@ -157,7 +254,7 @@ class Filter(_Filter):
 
     def select(self, selector, item):
         if isinstance(selector, basestring):
-            ret = item.xpath(selector)
+            ret = select_xpath(item, selector)
         elif isinstance(selector, _Filter):
             selector._key = self._key
             selector._obj = self._obj
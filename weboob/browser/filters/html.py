@@ -24,7 +24,7 @@ from weboob.exceptions import ParseError
 from weboob.tools.compat import basestring, unicode, urljoin
 from weboob.tools.html import html2text
 
-from .base import _NO_DEFAULT, Filter, FilterError, _Selector, debug
+from .base import _NO_DEFAULT, Filter, FilterError, _Selector, debug, select_css
 from .standard import TableCell, ColumnNotFound # TODO move class here when modules are migrated
 
 
@@ -53,7 +53,7 @@ class CSS(_Selector):
     will take the text of all ``<div>`` having CSS class "main".
     """
     def select(self, selector, item):
-        ret = item.cssselect(selector)
+        ret = select_css(item, selector)
         if isinstance(ret, list):
             for el in ret:
                 if isinstance(el, html.HtmlElement):
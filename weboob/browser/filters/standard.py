@@ -35,7 +35,7 @@ from weboob.exceptions import ParseError
 from weboob.browser.url import URL
 from weboob.tools.compat import parse_qs, urlparse
 
-from .base import _NO_DEFAULT, FilterError, _Filter, Filter, debug
+from .base import _NO_DEFAULT, FilterError, _Filter, Filter, debug, select_xpath
 
 
 __all__ = ['FilterError', 'ColumnNotFound', 'RegexpError', 'ItemNotFound',
@@ -208,7 +208,7 @@ class TableCell(_Filter):
         for name in self.names:
             idx = item.parent.get_colnum(name)
             if idx is not None:
-                ret = item.xpath(self.td % (idx + 1))
+                ret = select_xpath(item, self.td % (idx + 1))
                 for el in ret:
                     self.highlight_el(el, item)
                 return ret
@@ -310,7 +310,7 @@ class CleanText(Filter):
             if children:
                 txt = [t.strip() for t in txt.itertext()]
             else:
-                txt = [t.strip() for t in txt.xpath('./text()')]
+                txt = [t.strip() for t in select_xpath(txt, './text()')]
             txt = u' '.join(txt)  # 'foo   bar'
         if newlines:
             txt = re.compile(u'\s+', flags=re.UNICODE).sub(u' ', txt)  # 'foo bar'
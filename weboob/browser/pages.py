@@ -24,7 +24,6 @@ from functools import wraps
 import warnings
 from io import BytesIO
 import codecs
-from cgi import parse_header
 from functools import reduce
 import re
 
@@ -140,15 +139,15 @@ class Page(object):
         self.forced_encoding = encoding or self.ENCODING
         if self.forced_encoding:
             self.response.encoding = self.forced_encoding
-        self.doc = self.build_doc(self.data)
-
-        # Last chance to change encoding, according to :meth:`detect_encoding`,
-        # which can be used to detect a document-level encoding declaration
-        if not self.forced_encoding:
+        else:
+            # Last chance to change encoding, according to :meth:`detect_encoding`,
+            # which can be used to detect a document-level encoding declaration.
+            # It is called before building the document, so that it is parsed
+            # only once.
             encoding = self.detect_encoding()
             if encoding and encoding != self.encoding:
                 self.response.encoding = encoding
-                self.doc = self.build_doc(self.data)
+        self.doc = self.build_doc(self.data)
 
     # Encoding issues are delegated to Response instance, implemented by
     # requests module.
@@ -206,6 +205,9 @@ class Page(object):
         """
         Override this method to implement detection of document-level encoding
         declaration, if any (eg. html5's <meta charset="some-charset">).
+
+        It is called before :meth:`build_doc`, so it has to work on the raw
+        :attr:`data` and can't use :attr:`doc`.
         """
         return None
 
@@ -508,6 +510,65 @@ class RawPage(Page):
         return content
 
 
+BOMS = ((codecs.BOM_UTF8, 'utf-8'),
+        (codecs.BOM_UTF16_LE, 'utf-16le'),
+        (codecs.BOM_UTF16_BE, 'utf-16be'))
+
+PRESCAN_RE = re.compile(br'''<!--.*?-->|<meta[\s/](?:"[^"]*"|'[^']*'|[^'">])*>''', re.DOTALL | re.IGNORECASE)
+PRESCAN_ATTR_RE = re.compile(br'''([^\s/>=]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]*))?''')
+PRESCAN_CHARSET_RE = re.compile(br'''charset\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s;"']+))''', re.IGNORECASE)
+
+
+def prescan_encoding(data):
+    """
+    Find the encoding declared by a HTML document, looking at raw bytes
+    without parsing it, following the HTML5 "prescan" algorithm: a byte
+    order mark takes precedence, then the first <meta> node with a
+    "charset" attribute, or with "http-equiv" set to content-type and a
+    charset in its "content" attribute. Comments are skipped.
+
+    >>> prescan_encoding(b'<html><head><meta charset="ISO-8859-15"></head></html>')
+    'iso-8859-15'
+    >>> prescan_encoding(b'<meta content="text/html; charset=windows-1252" http-equiv="Content-Type">')
+    'windows-1252'
+    >>> prescan_encoding(b'<!-- <meta charset="utf-8"> --><meta charset=latin1>')
+    'latin1'
+    >>> prescan_encoding(codecs.BOM_UTF8 + b'<meta charset="latin1">')
+    'utf-8'
+    >>> prescan_encoding(b'<meta name="description" content="charset=utf-8">') is None
+    True
+
+    :param data: beginning of the document
+    :type data: :class:`bytes`
+    :rtype: :class:`str` or None
+    """
+    for bom, encoding in BOMS:
+        if data.startswith(bom):
+            return encoding
+
+    for m in PRESCAN_RE.finditer(data):
+        if m.group(0).startswith(b'<!--'):
+            continue
+
+        attrs = {}
+        for name, value in PRESCAN_ATTR_RE.findall(m.group(0)[len(b'<meta'):-1]):
+            attrs.setdefault(name.lower(), value.strip(b'\'"'))
+
+        charset = attrs.get(b'charset')
+        if not charset and attrs.get(b'http-equiv', b'').lower() == b'content-type':
+            cm = PRESCAN_CHARSET_RE.search(attrs.get(b'content', b''))
+            if cm:
+                charset = cm.group(1) or cm.group(2) or cm.group(3)
+        if not charset:
+            continue
+
+        encoding = charset.strip().decode('ascii', 'replace').lower()
+        if encoding.startswith('utf-16'):
+            # the document would not be readable as ascii, per specification
+            return 'utf-8'
+        return encoding
+
+
 class HTMLPage(Page):
     """
     HTML page.
@@ -536,6 +597,14 @@ class HTMLPage(Page):
     Default value is None, means refreshes aren't handled.
     """
 
+    ENCODING_PRESCAN_SIZE = 8192
+    """
+    Number of bytes at the beginning of the document in which
+    :meth:`detect_encoding` looks for an encoding declaration.
+
+    None means the whole document is scanned.
+    """
+
     def __init__(self, *args, **kwargs):
         import lxml.html as html
         ns = html.etree.FunctionNamespace(None)
@@ -640,18 +709,14 @@ class HTMLPage(Page):
 
     def detect_encoding(self):
         """
-        Look for encoding in the document "http-equiv" and "charset" meta nodes.
+        Look for a byte order mark, or for encoding in the document
+        "http-equiv" and "charset" meta nodes, in the first
+        :attr:`ENCODING_PRESCAN_SIZE` bytes of the document.
         """
-        encoding = self.encoding
-        for content in self.doc.xpath('//head/meta[lower-case(@http-equiv)="content-type"]/@content'):
-            # meta http-equiv=content-type content=...
-            _, params = parse_header(content)
-            if 'charset' in params:
-                encoding = params['charset'].strip("'\"")
-
-        for charset in self.doc.xpath('//head/meta[@charset]/@charset'):
-            # meta charset=...
-            encoding = charset.lower()
+        data = self.data
+        if self.ENCODING_PRESCAN_SIZE is not None:
+            data = data[:self.ENCODING_PRESCAN_SIZE]
+        encoding = prescan_encoding(data) or self.encoding
 
         if encoding == 'iso-8859-1' or not encoding:
             encoding = 'windows-1252'
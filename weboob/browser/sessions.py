@@ -21,9 +21,10 @@
 # XXX Licence issues?
 
 try:
-    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures import ThreadPoolExecutor, Future
 except ImportError:
     ThreadPoolExecutor = None
+    Future = object
 
 from requests import Session
 from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
@@ -70,15 +71,19 @@ class WeboobSession(Session):
         """
         cookies = request.cookies or {}
 
-        # Bootstrap CookieJar.
-        if not isinstance(cookies, cookielib.CookieJar):
-            cookies = cookiejar_from_dict(cookies)
-
-        # Merge with session cookies
-        merged_cookies = RequestsCookieJar()
-        merged_cookies.update(self.cookies)
-        merged_cookies.update(cookies)
+        if cookies:
+            # Bootstrap CookieJar.
+            if not isinstance(cookies, cookielib.CookieJar):
+                cookies = cookiejar_from_dict(cookies)
 
+            # Merge with session cookies
+            merged_cookies = RequestsCookieJar()
+            merged_cookies.update(self.cookies)
+            merged_cookies.update(cookies)
+        else:
+            # No need to copy session cookies, they are not modified when
+            # preparing the request.
+            merged_cookies = self.cookies
 
         # Set environment's basic authentication if not explicitly set.
         auth = request.auth
@@ -100,6 +105,34 @@ class WeboobSession(Session):
         return p
 
 
+class WeboobFuture(Future):
+    """
+    Future of an asynchronous request.
+
+    Besides the :class:`concurrent.futures.Future` API, it can be awaited from
+    an :mod:`asyncio` coroutine. Cancelling the awaiting task cancels the
+    request if it has not been sent yet.
+    """
+
+    def __await__(self):
+        import asyncio
+        return asyncio.wrap_future(self).__await__()
+
+    # Allow "yield from" in generator-based coroutines.
+    __iter__ = __await__
+
+    def run(self, func, *args, **kwargs):
+        if not self.set_running_or_notify_cancel():
+            return
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.set_exception(e)
+        else:
+            self.set_result(result)
+
+
 class FuturesSession(WeboobSession):
     def __init__(self, executor=None, max_workers=2, max_retries=2, *args, **kwargs):
         """Creates a FuturesSession
@@ -154,7 +187,9 @@ class FuturesSession(WeboobSession):
         if is_async:
             if not self.executor:
                 raise ImportError('Please install python-concurrent.futures')
-            return self.executor.submit(func, *args, **kwargs)
+            future = WeboobFuture()
+            self.executor.submit(future.run, func, *args, **kwargs)
+            return future
 
         return func(*args, **kwargs)
 
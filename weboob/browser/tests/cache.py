@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+from threading import Thread
+from unittest import TestCase
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from weboob.browser import Browser, PagesBrowser, URL
+from weboob.browser.cache import CacheMixin, SQLiteCacheStore
+from weboob.browser.pages import RawPage
+from weboob.browser.sessions import WeboobFuture
+
+
+def make_response(url, status_code=200, content=b'', headers=None):
+    response = Response()
+    response.url = url
+    response.status_code = status_code
+    response._content = content
+    response.headers = CaseInsensitiveDict(headers or {})
+    return response
+
+
+# Mock of a Browser which returns prepared responses instead of doing
+# network requests.
+class MockBrowser(Browser):
+    def __init__(self, *args, **kwargs):
+        super(MockBrowser, self).__init__(*args, **kwargs)
+        self.responses = []
+        self.requests = []
+
+    def open(self, request, is_async=False, callback=lambda response: response, **kwargs):
+        self.requests.append(request)
+        response = self.responses.pop(0)
+        if is_async:
+            future = WeboobFuture()
+            future.run(callback, response)
+            return future
+        return callback(response)
+
+
+class MyCacheBrowser(CacheMixin, MockBrowser):
+    pass
+
+
+class CacheMixinTest(TestCase):
+    def setUp(self):
+        self.browser = MyCacheBrowser()
+        self.url = 'http://weboob.org/'
+
+    def test_not_cacheable(self):
+        self.browser.responses = [make_response(self.url, content=b'1'), make_response(self.url, content=b'2')]
+        self.assertEqual(self.browser.open_with_cache(self.url).content, b'1')
+        self.assertEqual(self.browser.open_with_cache(self.url).content, b'2')
+        self.assertEqual(len(self.browser.requests), 2)
+
+    def test_revalidate(self):
+        self.browser.responses = [make_response(self.url, content=b'1', headers={'ETag': '"abc"'}),
+                                  make_response(self.url, status_code=304)]
+        self.assertEqual(self.browser.open_with_cache(self.url).content, b'1')
+        self.assertEqual(self.browser.open_with_cache(self.url).content, b'1')
+        self.assertEqual(self.browser.requests[1].headers['If-None-Match'], '"abc"')
+
+    def test_fresh(self):
+        self.browser.responses = [make_response(self.url, content=b'1', headers={'Cache-Control': 'max-age=60'})]
+        self.assertEqual(self.browser.open_with_cache(self.url).content, b'1')
+        self.assertEqual(self.browser.open_with_cache(self.url).content, b'1')
+        self.assertEqual(len(self.browser.requests), 1)
+
+    def test_expired(self):
+        self.browser.responses = [make_response(self.url, content=b'1', headers={'Expires': 'Thu, 01 Jan 1970 00:00:00 GMT',
+                                                                                 'ETag': '"abc"'}),
+                                  make_response(self.url, status_code=304)]
+        self.browser.open_with_cache(self.url)
+        self.browser.open_with_cache(self.url)
+        self.assertEqual(len(self.browser.requests), 2)
+
+    def test_no_store(self):
+        self.browser.responses = [make_response(self.url, headers={'Cache-Control': 'no-store', 'ETag': '"abc"'})]
+        self.browser.open_with_cache(self.url)
+        self.assertEqual(len(self.browser.cache), 0)
+
+    def test_key_normalization(self):
+        self.browser.responses = [make_response(self.url, content=b'1', headers={'Cache-Control': 'max-age=60'})]
+        self.browser.cache_key_ignored_params = ('utm_source',)
+        self.browser.open_with_cache(self.url + '?b=2&a=1&utm_source=x', headers={'Referer': 'http://a/'})
+        response = self.browser.open_with_cache(self.url + '?a=1&b=2#top', headers={'Referer': 'http://b/'})
+        self.assertEqual(response.content, b'1')
+        self.assertEqual(len(self.browser.requests), 1)
+
+    def test_key_headers(self):
+        self.browser.responses = [make_response(self.url, content=b'1', headers={'Cache-Control': 'max-age=60'}),
+                                  make_response(self.url, content=b'2', headers={'Cache-Control': 'max-age=60'})]
+        self.assertEqual(self.browser.open_with_cache(self.url, headers={'X-Api-Version': '1'}).content, b'1')
+        self.assertEqual(self.browser.open_with_cache(self.url, headers={'X-Api-Version': '2'}).content, b'2')
+        self.assertEqual(self.browser.open_with_cache(self.url, headers={'X-Api-Version': '1',
+                                                                         'User-Agent': 'other'}).content, b'1')
+        self.assertEqual(len(self.browser.requests), 2)
+
+        # Only listed headers are used.
+        self.browser.cache_key_headers = ('Accept',)
+        self.browser.responses.append(make_response(self.url, content=b'3', headers={'Cache-Control': 'max-age=60'}))
+        self.assertEqual(self.browser.open_with_cache(self.url, headers={'X-Api-Version': '3'}).content, b'3')
+        self.assertEqual(self.browser.open_with_cache(self.url, headers={'X-Api-Version': '4'}).content, b'3')
+        self.assertEqual(len(self.browser.requests), 3)
+
+    def test_key_data(self):
+        self.browser.responses = [make_response(self.url, content=b'1', headers={'Cache-Control': 'max-age=60'}),
+                                  make_response(self.url, content=b'2', headers={'Cache-Control': 'max-age=60'})]
+        self.assertEqual(self.browser.open_with_cache(self.url, data={'a': 1}).content, b'1')
+        self.assertEqual(self.browser.open_with_cache(self.url, data={'a': 2}).content, b'2')
+
+    def test_key_data_list(self):
+        self.browser.responses = [make_response(self.url, content=b'1', headers={'Cache-Control': 'max-age=60'}),
+                                  make_response(self.url, content=b'2', headers={'Cache-Control': 'max-age=60'})]
+        self.assertEqual(self.browser.open_with_cache(self.url, data={'a': ['1', '2']}).content, b'1')
+        self.assertEqual(self.browser.open_with_cache(self.url, data={'a': ['1', '2']}).content, b'1')
+        self.assertEqual(self.browser.open_with_cache(self.url, data={'a': ['2', '1']}).content, b'2')
+        self.assertEqual(len(self.browser.requests), 2)
+
+    def test_shared(self):
+        headers = {'Cache-Control': 'max-age=60, s-maxage=0'}
+        self.browser.responses = [make_response(self.url, headers=headers) for _ in range(3)]
+        self.browser.open_with_cache(self.url)
+        self.browser.open_with_cache(self.url)
+        self.assertEqual(len(self.browser.requests), 1)
+
+        self.browser.cache.clear()
+        self.browser.is_shared = True
+        self.browser.open_with_cache(self.url)
+        self.browser.open_with_cache(self.url)
+        self.assertEqual(len(self.browser.requests), 3)
+
+    def test_stale_while_revalidate(self):
+        self.browser.responses = [make_response(self.url, content=b'1',
+                                                headers={'Cache-Control': 'max-age=0, stale-while-revalidate=60'}),
+                                  make_response(self.url, content=b'2', headers={'Cache-Control': 'max-age=60'})]
+        self.assertEqual(self.browser.open_with_cache(self.url).content, b'1')
+        # stale response is returned, and refreshed in background
+        self.assertEqual(self.browser.open_with_cache(self.url).content, b'1')
+        self.assertEqual(self.browser.open_with_cache(self.url).content, b'2')
+        self.assertEqual(len(self.browser.requests), 2)
+
+
+class SQLiteCacheStoreTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_persistent(self):
+        browser = MyCacheBrowser()
+        browser.cache = SQLiteCacheStore(self.path)
+        url = 'http://weboob.org/'
+        browser.responses = [make_response(url, content=b'1', headers={'Cache-Control': 'max-age=60'})]
+        browser.open_with_cache(url)
+        browser.cache.close()
+
+        browser = MyCacheBrowser()
+        browser.cache = SQLiteCacheStore(self.path)
+        self.assertEqual(browser.open_with_cache(url).content, b'1')
+        self.assertEqual(browser.requests, [])
+
+    def test_eviction(self):
+        store = SQLiteCacheStore(self.path, max_size=1000)
+        for i in range(10):
+            store[i] = b'x' * 300
+        self.assertLessEqual(len(store), 3)
+        self.assertIn(9, store)
+        self.assertNotIn(0, store)
+        with self.assertRaises(KeyError):
+            store[0]
+        store.close()
+
+
+class CachedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits += 1
+        body = ('hit %d' % self.server.hits).encode('ascii')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'max-age=60')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class RealCacheBrowser(CacheMixin, Browser):
+    pass
+
+
+class CachedPage(RawPage):
+    pass
+
+
+class RealCachePagesBrowser(CacheMixin, PagesBrowser):
+    cached = URL('/page', CachedPage)
+
+
+class SQLiteCacheStoreBrowserTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'cache.sqlite')
+        self.server = HTTPServer(('127.0.0.1', 0), CachedHandler)
+        self.server.hits = 0
+        self.thread = Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d/page' % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_real_response(self):
+        browser = RealCacheBrowser(proxy={})
+        browser.cache = SQLiteCacheStore(self.path)
+        self.assertEqual(browser.open_with_cache(self.url).text, u'hit 1')
+        browser.cache.close()
+
+        browser = RealCacheBrowser(proxy={})
+        browser.cache = SQLiteCacheStore(self.path)
+        response = browser.open_with_cache(self.url)
+        self.assertEqual(response.text, u'hit 1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.url, self.url)
+        self.assertEqual(response.headers['content-type'], 'text/plain; charset=utf-8')
+        self.assertEqual(self.server.hits, 1)
+        browser.cache.close()
+
+    def test_pages_browser(self):
+        for _ in range(2):
+            browser = RealCachePagesBrowser(proxy={})
+            browser.BASEURL = self.url[:-len('/page')]
+            browser.cache = SQLiteCacheStore(self.path)
+            response = browser.open_with_cache(self.url)
+            self.assertIsInstance(response.page, CachedPage)
+            self.assertEqual(response.page.doc, b'hit 1')
+            self.assertEqual(response.request.url, self.url)
+            self.assertEqual(response.request.method, 'GET')
+            browser.cache.close()
+        self.assertEqual(self.server.hits, 1)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+
+from requests import Request
+from requests.cookies import RequestsCookieJar, get_cookie_header
+
+from weboob.browser.cookies import WeboobCookieJar, BlockAllCookies
+from weboob.browser.sessions import WeboobSession
+
+
+def fill_jar(jar):
+    jar.set('session', '1', domain='www.example.com', path='/')
+    jar.set('shared', '2', domain='.example.com', path='/')
+    jar.set('deep', '3', domain='.example.com', path='/account')
+    jar.set('host', '4', domain='example.com', path='/')
+    jar.set('secure', '5', domain='.example.com', path='/', secure=True)
+    jar.set('other', '6', domain='.example.org', path='/')
+    jar.set('local', '7', domain='localhost.local', path='/')
+    for i in range(20):
+        jar.set('tracker', str(i), domain='.tracker%d.com' % i, path='/')
+    return jar
+
+
+class WeboobCookieJarTest(TestCase):
+    def test_cookie_header(self):
+        jar = fill_jar(WeboobCookieJar())
+        reference = fill_jar(RequestsCookieJar())
+        for url in ('https://www.example.com/account/history',
+                    'http://www.example.com/',
+                    'http://sub.www.example.com/',
+                    'https://example.com/',
+                    'https://example.org/',
+                    'http://localhost/',
+                    'http://127.0.0.1:8080/',
+                    'https://tracker3.com/'):
+            request = Request('GET', url).prepare()
+            self.assertEqual(get_cookie_header(jar, request), get_cookie_header(reference, request), url)
+
+    def test_policy(self):
+        jar = fill_jar(WeboobCookieJar())
+        jar.set_policy(BlockAllCookies())
+        self.assertIsNone(get_cookie_header(jar, Request('GET', 'https://www.example.com/').prepare()))
+
+
+class WeboobSessionTest(TestCase):
+    def setUp(self):
+        self.session = WeboobSession()
+        self.session.cookies = fill_jar(WeboobCookieJar())
+
+    def test_session_cookies(self):
+        preq = self.session.prepare_request(Request('GET', 'https://www.example.com/'))
+        self.assertIs(preq._cookies, self.session.cookies)
+        self.assertEqual(preq.headers['Cookie'], 'session=1; shared=2; secure=5; host=4')
+
+    def test_request_cookies(self):
+        preq = self.session.prepare_request(Request('GET', 'https://www.example.com/', cookies={'extra': '8'}))
+        self.assertIsNot(preq._cookies, self.session.cookies)
+        self.assertEqual(sorted(preq.headers['Cookie'].split('; ')),
+                         ['extra=8', 'host=4', 'secure=5', 'session=1', 'shared=2'])
+        self.assertNotIn('extra', self.session.cookies)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+
+import lxml.html
+
+from weboob.browser.elements import ElementEnv, ItemElement, ListElement, TableElement
+from weboob.browser.filters.standard import CleanText, Env, TableCell
+from weboob.capabilities.base import BaseObject, StringField
+
+
+class FakePage(object):
+    browser = None
+
+    def __init__(self, html, params=None):
+        self.doc = lxml.html.fromstring(html)
+        self.params = params
+
+
+class Row(BaseObject):
+    label = StringField('Label')
+    path = StringField('Path')
+    tag = StringField('Tag')
+
+
+class ElementEnvTest(TestCase):
+    def test_lookup(self):
+        parent = ElementEnv({'a': 1})
+        parent['b'] = 2
+        env = ElementEnv(parent)
+        env['c'] = 3
+        self.assertEqual(env['a'], 1)
+        self.assertEqual(env['b'], 2)
+        self.assertEqual(env.get('d'), None)
+        self.assertIn('a', env)
+        self.assertNotIn('d', env)
+        self.assertEqual(dict(env), {'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(len(env), 3)
+        self.assertNotIn('c', parent)
+
+    def test_copy_on_access(self):
+        params = {'path': ['root']}
+        parent = ElementEnv(params)
+        first = ElementEnv(parent)
+        second = ElementEnv(parent)
+        first['path'].append('first')
+        second['path'].append('second')
+        self.assertEqual(params['path'], ['root'])
+        self.assertEqual(parent['path'], ['root'])
+        self.assertEqual(first['path'], ['root', 'first'])
+        self.assertEqual(second['path'], ['root', 'second'])
+
+    def test_delete(self):
+        parent = ElementEnv({'a': 1})
+        env = ElementEnv(parent)
+        del env['a']
+        self.assertNotIn('a', env)
+        self.assertEqual(list(env), [])
+        self.assertEqual(parent['a'], 1)
+        with self.assertRaises(KeyError):
+            del env['a']
+
+    def test_no_params(self):
+        env = ElementEnv(None)
+        self.assertEqual(len(env), 0)
+        with self.assertRaises(KeyError):
+            env['a']
+
+
+class ElementsTest(TestCase):
+    HTML = """
+    <table>
+      <tr><th>Tag</th><th>Label</th></tr>
+      <tr><td>x</td><td>first</td></tr>
+      <tr><td>y</td><td>second</td></tr>
+    </table>
+    """
+
+    def test_introspection(self):
+        class Table(TableElement):
+            head_xpath = '//tr/th'
+            item_xpath = '//tr[td]'
+
+            col_label = u'Label'
+            col_tag = [u'TAG', u'Name']
+
+            class item(ItemElement):
+                klass = Row
+
+                load_prefix = Env('prefix')
+
+                obj_tag = CleanText(TableCell('tag'))
+
+                def obj_label(self):
+                    return self.loaders['prefix'] + CleanText(TableCell('label'))(self)
+
+        self.assertEqual(Table._item_classes, [Table.item])
+        self.assertEqual(Table._columns, {'label': [u'label'], 'tag': [u'tag', u'name']})
+        self.assertEqual(Table.item._loaders, [('prefix', 'load_prefix')])
+        self.assertEqual(Table.item._item_classes, [])
+
+        page = FakePage(self.HTML, {'prefix': u'> '})
+        rows = list(Table(page)())
+        self.assertEqual([(r.tag, r.label) for r in rows], [(u'x', u'> first'), (u'y', u'> second')])
+
+    def test_env_isolation(self):
+        class List(ListElement):
+            item_xpath = '//tr[td]'
+
+            class item(ItemElement):
+                klass = Row
+
+                obj_label = CleanText('./td[2]')
+
+                def obj_path(self):
+                    self.env['path'].append(self.obj.label)
+                    return u'/'.join(self.env['path'])
+
+        page = FakePage(self.HTML, {'path': [u'root']})
+        rows = list(List(page)())
+        self.assertEqual([r.path for r in rows], [u'root/first', u'root/second'])
+        self.assertEqual(page.params['path'], [u'root'])
@@ -16,9 +16,11 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 from unittest import TestCase
+from lxml.etree import fromstring as xml_fromstring
 from lxml.html import fromstring
 
-from weboob.browser.filters.standard import RawText
+from weboob.browser.filters.html import CSS
+from weboob.browser.filters.standard import CleanText, RawText
 
 
 class RawTextTest(TestCase):
@@ -48,3 +50,14 @@ class RawTextTest(TestCase):
     def test_first_node_is_element_recursive(self):
         e = fromstring('<html><body><p><span>229,90</span> EUR</p></body></html>')
         self.assertEqual("229,90 EUR", RawText('//p', default="foo", children=True)(e))
+
+
+class CSSTest(TestCase):
+    def test_xml_case_sensitive(self):
+        doc = xml_fromstring('<Root><Item>foo</Item><item>bar</item></Root>')
+        self.assertEqual([el.text for el in CSS('Item')(doc)], ['foo'])
+        self.assertEqual(CleanText(CSS('item'))(doc), u'bar')
+
+    def test_html_case_insensitive(self):
+        doc = fromstring('<html><body><P>foo</P></body></html>')
+        self.assertEqual(CleanText(CSS('p'))(doc), u'foo')
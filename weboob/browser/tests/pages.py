@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+
+from requests import Response
+
+from weboob.browser import PagesBrowser
+from weboob.browser.pages import HTMLPage
+
+
+class CountingPage(HTMLPage):
+    def build_doc(self, content):
+        self.build_count = getattr(self, 'build_count', 0) + 1
+        return super(CountingPage, self).build_doc(content)
+
+
+def make_response(content, encoding='ISO-8859-1'):
+    response = Response()
+    response.url = 'http://example.org/'
+    response.status_code = 200
+    response._content = content
+    response.encoding = encoding
+    return response
+
+
+class HTMLPageEncodingTest(TestCase):
+    def setUp(self):
+        self.browser = PagesBrowser()
+
+    def test_meta_charset(self):
+        content = u'<html><head><meta charset="utf-8"></head><body><p>é</p></body></html>'.encode('utf-8')
+        page = CountingPage(self.browser, make_response(content))
+        self.assertEqual(page.encoding, 'utf-8')
+        self.assertEqual(page.build_count, 1)
+        self.assertEqual(page.doc.xpath('//p')[0].text, u'é')
+
+    def test_http_equiv(self):
+        content = (u'<html><head><meta http-equiv="Content-Type" content="text/html; charset=iso-8859-15">'
+                   u'</head><body><p>€</p></body></html>').encode('iso-8859-15')
+        page = CountingPage(self.browser, make_response(content))
+        self.assertEqual(page.encoding, 'iso-8859-15')
+        self.assertEqual(page.build_count, 1)
+        self.assertEqual(page.doc.xpath('//p')[0].text, u'€')
+
+    def test_no_declaration(self):
+        content = u'<html><body><p>’</p></body></html>'.encode('windows-1252')
+        page = CountingPage(self.browser, make_response(content, None))
+        self.assertEqual(page.encoding, 'windows-1252')
+        self.assertEqual(page.build_count, 1)
+        self.assertEqual(page.doc.xpath('//p')[0].text, u'’')
+
+    def test_forced_encoding(self):
+        content = u'<html><head><meta charset="utf-8"></head><body><p>é</p></body></html>'.encode('latin-1')
+        page = CountingPage(self.browser, make_response(content), encoding='latin-1')
+        self.assertEqual(page.encoding, 'latin-1')
+        self.assertEqual(page.build_count, 1)
+        self.assertEqual(page.doc.xpath('//p')[0].text, u'é')
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import re
+from threading import Event
+from unittest import TestCase
+
+from requests import Response
+from requests.adapters import BaseAdapter
+
+from weboob.browser import PagesBrowser, URL
+from weboob.browser.elements import ListElement, ItemElement, method
+from weboob.browser.filters.html import Link
+from weboob.browser.filters.standard import CleanText
+from weboob.browser.pages import HTMLPage
+from weboob.capabilities.base import BaseObject
+
+
+class FakeAdapter(BaseAdapter):
+    PAGES = 3
+
+    def __init__(self):
+        super(FakeAdapter, self).__init__()
+        self.requested = []
+        self.fetched = dict((i, Event()) for i in range(1, self.PAGES + 1))
+
+    def send(self, request, **kwargs):
+        num = int(re.search(r'list-(\d+)', request.url).group(1))
+        self.requested.append((request.method, num))
+
+        html = u''.join(u'<li>%d.%d</li>' % (num, i) for i in range(3))
+        if num < self.PAGES:
+            html += u'<a href="/list-%d.html">next</a>' % (num + 1)
+
+        response = Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+        response._content = html.encode('utf-8')
+        self.fetched[num].set()
+        return response
+
+    def close(self):
+        pass
+
+
+class ListPage(HTMLPage):
+    @method
+    class iter_values(ListElement):
+        item_xpath = '//li'
+        next_page = Link('//a', default=None)
+
+        class item(ItemElement):
+            klass = BaseObject
+
+            obj_id = CleanText('.')
+
+
+class MyBrowser(PagesBrowser):
+    BASEURL = 'http://weboob.test/'
+
+    list = URL(r'list-(?P<num>\d+)\.html', ListPage)
+
+    def __init__(self, *args, **kwargs):
+        super(MyBrowser, self).__init__(*args, **kwargs)
+        self.adapter = FakeAdapter()
+        self.session.mount('http://weboob.test/', self.adapter)
+
+
+class MyPrefetchBrowser(MyBrowser):
+    PREFETCH_PAGES = True
+
+
+class PrefetchTest(TestCase):
+    def iter_values(self, browser):
+        browser.list.go(num=1)
+        return [obj.id for obj in browser.pagination(lambda: browser.page.iter_values())]
+
+    def test_disabled(self):
+        browser = MyBrowser()
+        self.assertEqual(self.iter_values(browser), ['%d.%d' % (n, i) for n in range(1, 4) for i in range(3)])
+        self.assertEqual(browser.adapter.requested, [('GET', 1), ('GET', 2), ('GET', 3)])
+
+    def test_prefetch(self):
+        browser = MyPrefetchBrowser()
+        browser.list.go(num=1)
+        values = []
+        for obj in browser.pagination(lambda: browser.page.iter_values()):
+            if not values:
+                # the second page is fetched while the first is processed
+                self.assertTrue(browser.adapter.fetched[2].wait(5))
+            values.append(obj.id)
+
+        self.assertEqual(values, ['%d.%d' % (n, i) for n in range(1, 4) for i in range(3)])
+        self.assertEqual(browser.adapter.requested, [('GET', 1), ('GET', 2), ('GET', 3)])
+        self.assertEqual(browser.url, 'http://weboob.test/list-3.html')
+
+    def test_discarded(self):
+        browser = MyPrefetchBrowser()
+        browser.list.go(num=1)
+        next(browser.page.iter_values())
+        self.assertTrue(browser.adapter.fetched[2].wait(5))
+        # going elsewhere drops the prefetched page
+        browser.list.go(num=3)
+        self.assertEqual(browser.url, 'http://weboob.test/list-3.html')
+        self.assertIsNone(browser._prefetched)
+
+    def test_stateless_only(self):
+        from requests import Request
+
+        browser = MyPrefetchBrowser()
+        self.assertFalse(browser.prefetch(Request('POST', 'http://weboob.test/list-2.html', data={'a': 'b'})))
+        self.assertTrue(browser.prefetch('http://weboob.test/list-2.html'))
@@ -135,3 +135,42 @@ class URLTest(TestCase):
         self.assertRaisesRegexp(AssertionError, "You can use this method" +
                                 " only if there is a Page class handler.",
                                 self.myBrowser.urlRegex.is_here, id=2)
+
+
+class MyMockIndexPage(Page):
+    pass
+
+
+class MyMockIndexBrowser(PagesBrowser):
+    BASEURL = "http://weboob.org/"
+
+    optional = URL(r'/lists?/(?P<id>\d+)', MyMockIndexPage)
+    absolute = URL(r'http://test\.org/', MyMockIndexPage)
+    anything = URL(r'.*', MyMockIndexPage)
+    nopage = URL(r'/news')
+
+
+# Class that tests the index used to find URLs matching a response
+class URLIndexTest(TestCase):
+
+    def setUp(self):
+        self.myBrowser = MyMockIndexBrowser()
+
+    def candidates(self, url):
+        return [u for u in self.myBrowser.get_url_index().iter_candidates(url)]
+
+    def test_candidates(self):
+        b = self.myBrowser
+        self.assertEqual(self.candidates('http://weboob.org/list/1'), [b.optional, b.anything])
+        self.assertEqual(self.candidates('http://weboob.org/lists/1'), [b.optional, b.anything])
+        self.assertEqual(self.candidates('http://weboob.org/other'), [b.anything])
+        self.assertEqual(self.candidates('http://test.org/'), [b.absolute])
+        self.assertEqual(self.candidates('http://other.org/'), [])
+
+    def test_patterns_change(self):
+        b = self.myBrowser
+        self.assertEqual(self.candidates('http://test.org/'), [b.absolute])
+        b.nopage.klass = MyMockIndexPage
+        b.nopage.urls.insert(0, r'http://test\.org/news')
+        self.assertEqual(self.candidates('http://test.org/news'), [b.absolute, b.nopage])
+        self.assertTrue(b.nopage.match('http://test.org/news'))
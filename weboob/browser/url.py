@@ -32,6 +32,75 @@ class UrlNotResolvable(Exception):
     """
 
 
+_normalize_cache = {}
+
+
+def normalize_pattern(pattern):
+    """
+    Memoized version of :func:`weboob.tools.regex_helper.normalize`.
+
+    The returned list must not be modified.
+    """
+    try:
+        return _normalize_cache[pattern]
+    except KeyError:
+        result = _normalize_cache[pattern] = normalize(pattern)
+        return result
+
+
+def literal_prefix(regex):
+    """
+    Get the literal string any match of the regex starts with.
+
+    >>> literal_prefix(r'http://example\.org/(?P<id>\d+)')
+    'http://example.org/'
+    >>> literal_prefix(r'http://example\.org/lists?')
+    'http://example.org/list'
+    >>> literal_prefix(r'http://a\.org/|http://b\.org/')
+    ''
+    """
+    # A top-level alternation can match anything.
+    depth = 0
+    escaped = in_class = False
+    for c in regex:
+        if escaped:
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        elif in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and depth == 0:
+            return ''
+
+    prefix = []
+    i = 0
+    while i < len(regex):
+        c = regex[i]
+        if c == '\\':
+            if i + 1 >= len(regex) or regex[i + 1].isalnum():
+                # Character class like \d, or a backreference.
+                break
+            c = regex[i + 1]
+            i += 2
+        elif c in '.^$*+?{}[]|()':
+            break
+        else:
+            i += 1
+
+        if i < len(regex) and regex[i] in '?*{':
+            # This character is optional.
+            break
+        prefix.append(c)
+
+    return ''.join(prefix)
+
+
 class URL(object):
     """
     A description of an URL on the PagesBrowser website.
@@ -54,6 +123,34 @@ class URL(object):
         self._creation_counter = URL._creation_counter
         URL._creation_counter += 1
 
+        self._regexes_key = None
+        self._regexes = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Compiled regexes can't be deepcopied on Python 2.
+        state['_regexes_key'] = state['_regexes'] = None
+        return state
+
+    def get_regexes(self, base):
+        """
+        Get the absolute regexps of this URL for the given base URL.
+
+        They are only computed when the base or the patterns change.
+
+        :rtype: list[(str, compiled regex)]
+        """
+        key = (base, tuple(self.urls))
+        if self._regexes_key != key:
+            regexes = []
+            for regex in self.urls:
+                if not re.match(r'^[\w\?]+://.*', regex):
+                    regex = re.escape(base).rstrip('/') + '/' + regex.lstrip('/')
+                regexes.append((regex, re.compile(regex)))
+            self._regexes = regexes
+            self._regexes_key = key
+        return self._regexes
+
     def is_here(self, **kwargs):
         """
         Returns True if the current page of browser matches this URL.
@@ -126,7 +223,7 @@ class URL(object):
         params = kwargs.pop('params', None)
         patterns = []
         for url in self.urls:
-            patterns += normalize(url)
+            patterns += normalize_pattern(url)
 
         for pattern, _ in patterns:
             url = pattern
@@ -160,10 +257,8 @@ class URL(object):
             assert self.browser is not None
             base = self.browser.BASEURL
 
-        for regex in self.urls:
-            if not re.match(r'^[\w\?]+://.*', regex):
-                regex = re.escape(base).rstrip('/') + '/' + regex.lstrip('/')
-            m = re.match(regex, url)
+        for _, regex in self.get_regexes(base):
+            m = regex.match(url)
             if m:
                 return m
 
@@ -207,6 +302,49 @@ class URL(object):
         return inner
 
 
+class URLIndex(object):
+    """
+    Index of :class:`URL` objects, to quickly find which ones may match an
+    url, using a trie of the literal prefixes of their regexps.
+
+    :param urls: URL objects, in the order they have to be tried
+    :type urls: list[:class:`URL`]
+    :param base: base URL of the browser
+    :type base: :class:`str`
+    """
+
+    def __init__(self, urls, base):
+        self.urls = list(urls)
+        self.root = {}
+        for position, url in enumerate(self.urls):
+            if base is None:
+                # Relative patterns can't be resolved.
+                prefixes = ['']
+            else:
+                prefixes = [literal_prefix(regex) for regex, _ in url.get_regexes(base)]
+
+            for prefix in prefixes:
+                node = self.root
+                for c in prefix:
+                    node = node.setdefault(c, {})
+                node.setdefault(None, []).append(position)
+
+    def iter_candidates(self, url):
+        """
+        Iter on URL objects which may match the url, in order.
+        """
+        node = self.root
+        positions = set(node.get(None, ()))
+        for c in url:
+            node = node.get(c)
+            if node is None:
+                break
+            positions.update(node.get(None, ()))
+
+        for position in sorted(positions):
+            yield self.urls[position]
+
+
 def normalize_url(url):
     """Normalize URL by lower-casing the domain and other fixes.
 
@@ -17,21 +17,22 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
-from collections import OrderedDict
+from collections import OrderedDict, deque
 import warnings
 import re
+import datetime
 from decimal import Decimal
-from copy import deepcopy, copy
+from copy import deepcopy
 import sys
 
-from weboob.tools.compat import unicode, long, with_metaclass, StrConv
+from weboob.tools.compat import basestring, unicode, long, with_metaclass, StrConv
 from weboob.tools.misc import to_unicode
 
 
 __all__ = ['UserError', 'FieldNotFound', 'NotAvailable',
            'NotLoaded', 'Capability', 'Field', 'IntField', 'DecimalField',
            'FloatField', 'StringField', 'BytesField', 'BoolField',
-           'empty', 'BaseObject']
+           'empty', 'accepts_conditions', 'BaseObject']
 
 
 def enum(**enums):
@@ -62,6 +63,34 @@ def empty(value):
     return False
 
 
+def find_types(name):
+    """
+    Find all the classes with this name.
+
+    :rtype: :class:`tuple`
+    """
+    # the following is a (almost) copy/paste from
+    # https://stackoverflow.com/questions/11775460/lexical-cast-from-string-to-type
+    types = ()
+    q = deque([object])
+    while q:
+        t = q.popleft()
+        if t.__name__ == name:
+            types += (t,)
+        else:
+            try:
+                # keep looking!
+                q.extend(t.__subclasses__())
+            except TypeError:
+                # type.__subclasses__ needs an argument for
+                # whatever reason.
+                if t is type:
+                    continue
+                else:
+                    raise
+    return types
+
+
 def find_object(mylist, error=None, **kwargs):
     """
     Very simple tools to return an object with the matching parameters in
@@ -79,6 +108,22 @@ def find_object(mylist, error=None, **kwargs):
     return None
 
 
+def accepts_conditions(func):
+    """
+    Decorator for methods of modules able to filter results by themselves
+    (for example with a search form of the website).
+
+    When the user gives a condition, the method is called with a
+    `conditions` keyword argument, a list of conditions which are true for
+    every expected object, with `left` (the field name), `op` (one of `=`,
+    `!=`, `<`, `>`, `|`) and `right` (the value, as a string) attributes.
+    Objects not matching them can be skipped, but it is only a hint, and
+    results are still filtered by the application.
+    """
+    func.accepts_conditions = True
+    return func
+
+
 class UserError(Exception):
     """
     Exception containing an error message for user.
@@ -197,7 +242,7 @@ class Field(object):
 
     def __init__(self, doc, *args, **kwargs):
         self.types = ()
-        self.value = kwargs.get('default', NotLoaded)
+        self.value = self.normalize(kwargs.get('default', NotLoaded))
         self.doc = doc
 
         for arg in args:
@@ -206,12 +251,49 @@ class Field(object):
             else:
                 raise TypeError('Arguments must be types or strings of type name')
 
+        # Types resolved by get_types(), and the ones among them for which
+        # convert() has been found to keep values unchanged.
+        self._types = None
+        self._exact_types = set()
+
         self._creation_counter = Field._creation_counter
         Field._creation_counter += 1
 
+    def get_types(self, refresh=False):
+        """
+        Get the accepted types, with the ones given by name looked up.
+
+        The result is cached; use *refresh* to look names up again, for
+        example if classes have been defined since.
+
+        :rtype: :class:`tuple`
+        """
+        if self._types is None or refresh:
+            types = ()
+            for v in self.types:
+                if isinstance(v, str):
+                    types += find_types(v)
+                else:
+                    types += (v,)
+            self._types = types
+            self._exact_types = set()
+        return self._types
+
     def convert(self, value):
         """
         Convert value to the wanted one.
+
+        Values whose type is exactly one of the accepted types are expected
+        to be returned unchanged, and once it has been the case, they are
+        stored without calling this method.
+        """
+        return value
+
+    def normalize(self, value):
+        """
+        Called on every value stored in the field, once it has been
+        validated. Contrary to :meth:`convert`, it is silent and must return
+        an equivalent value of an accepted type.
         """
         return value
 
@@ -292,6 +374,18 @@ class BytesField(Field):
         return bytes(value)
 
 
+# Types of default values which can be shared by all instances of an object.
+IMMUTABLE_TYPES = (NotLoadedType, NotAvailableType, type(None), basestring, bytes, bool, int, long,
+                   float, Decimal, datetime.date, datetime.time, datetime.timedelta)
+
+
+class _Deleted(object):
+    def __repr__(self):
+        return 'DELETED'
+
+_DELETED = _Deleted()
+
+
 class _BaseObjectMeta(type):
     def __new__(cls, name, bases, attrs):
         fields = [(field_name, attrs.pop(field_name)) for field_name, obj in list(attrs.items()) if isinstance(obj, Field)]
@@ -301,9 +395,17 @@ class _BaseObjectMeta(type):
         if new_class._fields is None:
             new_class._fields = OrderedDict()
         else:
-            new_class._fields = deepcopy(new_class._fields)
+            new_class._fields = OrderedDict(new_class._fields)
         new_class._fields.update(fields)
 
+        # Fields are shared by all instances, which only store a list of
+        # values, indexed by the position of the field in _fields.
+        new_class._fields_index = dict((field_name, (i, field))
+                                       for i, (field_name, field) in enumerate(new_class._fields.items()))
+        new_class._fields_defaults = [field.value for field in new_class._fields.values()]
+        new_class._fields_mutable = tuple(i for i, value in enumerate(new_class._fields_defaults)
+                                          if not isinstance(value, IMMUTABLE_TYPES))
+
         if new_class.__doc__ is None:
             new_class.__doc__ = ''
         for name, field in fields:
@@ -344,11 +446,26 @@ class BaseObject(with_metaclass(_BaseObjectMeta, StrConv, object)):
     _fields = None
 
     def __init__(self, id=u'', url=NotLoaded, backend=None):
+        self.__dict__['_values'] = self._new_values()
         self.id = to_unicode(id)
         self.backend = backend
-        self._fields = deepcopy(self._fields)
         self.__setattr__('url', url)
 
+    def _new_values(self):
+        values = list(self._fields_defaults)
+        for i in self._fields_mutable:
+            values[i] = deepcopy(values[i])
+        return values
+
+    def _get_values(self):
+        try:
+            return self.__dict__['_values']
+        except KeyError:
+            # __init__ has not been called, for example if the object is
+            # being unserialized.
+            values = self.__dict__['_values'] = self._new_values()
+            return values
+
     @property
     def fullid(self):
         """
@@ -372,10 +489,9 @@ class BaseObject(with_metaclass(_BaseObjectMeta, StrConv, object)):
         return True
 
     def copy(self):
-        obj = copy(self)
-        obj._fields = copy(self._fields)
-        for k in obj._fields:
-            obj._fields[k] = copy(obj._fields[k])
+        obj = self.__class__.__new__(self.__class__)
+        obj.__dict__.update(self.__dict__)
+        obj.__dict__['_values'] = list(self._get_values())
         return obj
 
     def __deepcopy__(self, memo):
@@ -403,8 +519,9 @@ class BaseObject(with_metaclass(_BaseObjectMeta, StrConv, object)):
 
         if hasattr(self, 'id') and self.id is not None:
             yield 'id', self.id
-        for name, field in self._fields.items():
-            yield name, field.value
+        for name, value in zip(self._fields, self._get_values()):
+            if value is not _DELETED:
+                yield name, value
 
     def __eq__(self, obj):
         if isinstance(obj, BaseObject):
@@ -413,70 +530,63 @@ class BaseObject(with_metaclass(_BaseObjectMeta, StrConv, object)):
             return False
 
     def __getattr__(self, name):
-        if self._fields is not None and name in self._fields:
-            return self._fields[name].value
-        else:
+        try:
+            value = self._get_values()[self._fields_index[name][0]]
+        except KeyError:
+            value = _DELETED
+
+        if value is _DELETED:
             raise AttributeError("'%s' object has no attribute '%s'" % (
                 self.__class__.__name__, name))
+        return value
 
     def __setattr__(self, name, value):
         try:
-            attr = (self._fields or {})[name]
+            index, attr = self._fields_index[name]
         except KeyError:
-            if name not in dir(self) and not name.startswith('_'):
+            if not name.startswith('_') and name not in self.__dict__ and not hasattr(type(self), name):
                 warnings.warn('Creating a non-field attribute %s. Please prefix it with _' % name,
                               AttributeCreationWarning, stacklevel=2)
             object.__setattr__(self, name, value)
-        else:
-            if not empty(value):
-                try:
-                    # Try to convert value to the wanted one.
-                    nvalue = attr.convert(value)
-                    # If the value was converted
-                    if nvalue is not value:
-                        warnings.warn('Value %s was converted from %s to %s' %
-                                      (name, type(value), type(nvalue)),
-                                      ConversionWarning, stacklevel=2)
-                    value = nvalue
-                except Exception:
-                    # error during conversion, it will probably not
-                    # match the wanted following types, so we'll
-                    # raise ValueError.
-                    pass
-            from collections import deque
-            actual_types = ()
-            for v in attr.types:
-                if isinstance(v, str):
-                    # the following is a (almost) copy/paste from
-                    # https://stackoverflow.com/questions/11775460/lexical-cast-from-string-to-type
-                    q = deque([object])
-                    while q:
-                        t = q.popleft()
-                        if t.__name__ == v:
-                            actual_types += (t,)
-                        else:
-                            try:
-                                # keep looking!
-                                q.extend(t.__subclasses__())
-                            except TypeError:
-                                # type.__subclasses__ needs an argument for
-                                # whatever reason.
-                                if t is type:
-                                    continue
-                                else:
-                                    raise
-                else:
-                    actual_types += (v,)
+            return
 
-            if not isinstance(value, actual_types) and not empty(value):
+        # Fast path: value has already been checked to be of this type.
+        if type(value) in attr._exact_types or empty(value):
+            self._get_values()[index] = attr.normalize(value)
+            return
+
+        nvalue = value
+        try:
+            # Try to convert value to the wanted one.
+            nvalue = attr.convert(value)
+            # If the value was converted
+            if nvalue is not value:
+                warnings.warn('Value %s was converted from %s to %s' %
+                              (name, type(value), type(nvalue)),
+                              ConversionWarning, stacklevel=2)
+        except Exception:
+            # error during conversion, it will probably not
+            # match the wanted following types, so we'll
+            # raise ValueError.
+            pass
+
+        actual_types = attr.get_types()
+        if not isinstance(nvalue, actual_types) and not empty(nvalue):
+            if any(isinstance(v, str) for v in attr.types):
+                # The class may have been defined after types were looked up.
+                actual_types = attr.get_types(refresh=True)
+            if not isinstance(nvalue, actual_types):
                 raise ValueError(
                     'Value for "%s" needs to be of type %r, not %r' % (
-                        name, actual_types, type(value)))
-            attr.value = value
+                        name, actual_types, type(nvalue)))
+
+        if nvalue is value and type(value) in actual_types:
+            attr._exact_types.add(type(value))
+        self._get_values()[index] = attr.normalize(nvalue)
 
     def __delattr__(self, name):
         try:
-            self._fields.pop(name)
+            self._get_values()[self._fields_index[name][0]] = _DELETED
         except KeyError:
             object.__delattr__(self, name)
 
@@ -492,20 +602,40 @@ class BaseObject(with_metaclass(_BaseObjectMeta, StrConv, object)):
 
     def __getstate__(self):
         d = self.to_dict()
-        d.update((k, v) for k, v in self.__dict__.items() if k != '_fields')
+        d.update((k, v) for k, v in self.__dict__.items() if k != '_values')
         return d
 
     @classmethod
-    def from_dict(cls, values, backend=None):
+    def from_dict(cls, values, backend=None, trusted=False):
+        """
+        Build an object from a dict of values.
+
+        :param trusted: if True, values of fields are stored without any
+                        conversion or check, which is faster for example to
+                        load lots of objects previously serialized with
+                        :meth:`to_dict`
+        :type trusted: :class:`bool`
+        """
         self = cls()
 
+        if trusted:
+            fields_values = self._get_values()
+            for attr in values:
+                try:
+                    index, field = cls._fields_index[attr]
+                except KeyError:
+                    setattr(self, attr, values[attr])
+                else:
+                    fields_values[index] = field.normalize(values[attr])
+            return self
+
         for attr in values:
             setattr(self, attr, values[attr])
 
         return self
 
     def __setstate__(self, state):
-        self._fields = deepcopy(self._fields) # because yaml does not call __init__
+        self.__dict__['_values'] = self._new_values()  # because yaml does not call __init__
         for k in state:
             setattr(self, k, state[k])
 
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+from decimal import Decimal
+from unittest import TestCase
+
+import warnings
+
+from weboob.capabilities.base import (
+    BaseObject, Field, StringField, DecimalField, IntField, NotLoaded, NotAvailable, ConversionWarning,
+)
+from weboob.capabilities.date import DateField
+from weboob.tools.date import date as weboob_date
+
+
+class MyObject(BaseObject):
+    label = StringField('Label')
+    amount = DecimalField('Amount', default=NotAvailable)
+    date = DateField('Date')
+    tags = Field('Tags', list, default=[])
+    count = IntField('Count')
+    parent = Field('Parent', 'MyParent')
+
+
+class MySubObject(MyObject):
+    extra = StringField('Extra')
+
+
+class BaseObjectTest(TestCase):
+    def test_defaults(self):
+        obj = MyObject('1')
+        self.assertEqual(list(obj.iter_fields()), [('id', u'1'), ('url', NotLoaded), ('label', NotLoaded),
+                                                   ('amount', NotAvailable), ('date', NotLoaded), ('tags', []),
+                                                   ('count', NotLoaded), ('parent', NotLoaded)])
+        self.assertIsNot(obj.tags, MyObject().tags)
+
+    def test_fields_are_shared(self):
+        self.assertIs(MySubObject._fields['label'], MyObject._fields['label'])
+        self.assertEqual(list(MySubObject._fields), ['url', 'label', 'amount', 'date', 'tags', 'count', 'parent',
+                                                     'extra'])
+
+    def test_set(self):
+        obj = MyObject()
+        other = MyObject()
+        obj.label = u'foo'
+        obj.amount = Decimal('4.2')
+        obj.date = datetime.date(2018, 1, 1)
+        self.assertEqual(obj.label, u'foo')
+        self.assertEqual(obj.amount, Decimal('4.2'))
+        self.assertIs(type(obj.date), weboob_date)
+        self.assertIs(other.label, NotLoaded)
+        self.assertRaises(ValueError, setattr, obj, 'amount', u'foo')
+        self.assertRaises(AttributeError, getattr, obj, 'foo')
+
+    def test_convert(self):
+        obj = MyObject()
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            obj.count = 42
+            obj.count = 43
+            self.assertEqual(w, [])
+            obj.count = True
+            self.assertEqual(len(w), 1)
+            self.assertIs(w[0].category, ConversionWarning)
+        self.assertIs(type(obj.count), int)
+
+    def test_types_by_name(self):
+        obj = MyObject()
+        self.assertRaises(ValueError, setattr, obj, 'parent', obj)
+
+        class MyParent(BaseObject):
+            pass
+
+        parent = MyParent()
+        obj.parent = parent
+        self.assertIs(obj.parent, parent)
+
+    def test_from_dict_trusted(self):
+        values = {'id': u'1', 'label': u'foo', 'date': datetime.date(2018, 1, 1), 'tags': [u'bar']}
+        obj = MyObject.from_dict(values, trusted=True)
+        self.assertEqual(obj.to_dict(), MyObject.from_dict(values).to_dict())
+        self.assertIs(type(obj.date), weboob_date)
+
+    def test_copy(self):
+        obj = MyObject('1')
+        obj.label = u'foo'
+        obj._private = 42
+        copy = obj.copy()
+        copy.label = u'bar'
+        self.assertEqual(obj.label, u'foo')
+        self.assertEqual(copy.label, u'bar')
+        self.assertEqual(copy.id, u'1')
+        self.assertEqual(copy._private, 42)
+
+    def test_del(self):
+        obj = MyObject()
+        del obj.label
+        self.assertRaises(AttributeError, getattr, obj, 'label')
+        self.assertNotIn('label', dict(obj.iter_fields()))
+
+    def test_setstate(self):
+        obj = MyObject.__new__(MyObject)
+        obj.__setstate__({'id': u'1', 'label': u'foo'})
+        self.assertEqual(obj.to_dict(), MyObject.from_dict({'id': u'1', 'label': u'foo'}).to_dict())
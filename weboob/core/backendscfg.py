@@ -18,6 +18,8 @@
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
 import codecs
+from collections import OrderedDict
+from contextlib import contextmanager
 import stat
 import os
 import sys
@@ -43,6 +45,10 @@ class BackendsConfig(object):
 
     A backend is an instance of a module with a config.
     A module can thus have multiple instances.
+
+    The parsed file is kept in memory, along with an index of backends by
+    name, as long as the inode, size and modification time of the file do
+    not change.
     """
 
     class WrongPermissions(Exception):
@@ -50,6 +56,11 @@ class BackendsConfig(object):
 
     def __init__(self, confpath):
         self.confpath = confpath
+        self._config = None
+        self._config_key = None
+        self._index = None
+        self._batch = 0
+        self._dirty = False
         try:
             mode = os.stat(confpath).st_mode
         except OSError:
@@ -72,27 +83,98 @@ class BackendsConfig(object):
                     raise self.WrongPermissions(
                         u'Weboob will not start as long as config file %s is readable by group or other users.' % confpath)
 
+    def _stat_key(self):
+        try:
+            st = os.stat(self.confpath)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, getattr(st, 'st_mtime_ns', st.st_mtime))
+
     def _read_config(self):
+        # While a batch is in progress, the in-memory config has pending
+        # changes which must not be replaced by the file content.
+        if self._config is not None and (self._batch or self._stat_key() == self._config_key):
+            return self._config
+
+        key = self._stat_key()
         config = RawConfigParser()
         with codecs.open(self.confpath, 'r', encoding='utf-8') as fd:
             config.readfp(fd)
+        self._config = config
+        self._config_key = key
+        self._index = None
         return config
 
     def _write_config(self, config):
-        for section in config.sections():
-            for k, v in config.items(section):
-                if isinstance(v, unicode) and sys.version_info.major == 2:
-                    # python2's configparser enforces bytes coercion with str(value)...
-                    config.remove_option(section, k)
-                    config.set(section, k.encode('utf-8'), v.encode('utf-8'))
+        if self._batch:
+            self._dirty = True
+            return
 
         if sys.version_info.major == 2:
+            # python2's configparser enforces bytes coercion with str(value)...
+            # Encode a copy, as the config is kept in memory.
+            encoded = RawConfigParser()
+            for section in config.sections():
+                encoded.add_section(section)
+                for k, v in config.items(section):
+                    if isinstance(v, unicode):
+                        k, v = k.encode('utf-8'), v.encode('utf-8')
+                    encoded.set(section, k, v)
+            config = encoded
             f = open(self.confpath, 'wb')
         else:
             f = codecs.open(self.confpath, 'wb', encoding='utf-8')
         with f:
             config.write(f)
 
+        self._config_key = self._stat_key()
+
+    def _parse_backend(self, config, backend_name):
+        params = dict(config.items(backend_name))
+        try:
+            module_name = params.pop('_module')
+        except KeyError:
+            try:
+                module_name = params.pop('_backend')
+            except KeyError:
+                warning('Missing field "_module" for configured backend "%s"', backend_name)
+                return None
+            config.set(backend_name, '_module', module_name)
+            config.remove_option(backend_name, '_backend')
+            self._dirty = True
+        return module_name, params
+
+    def _get_index(self):
+        config = self._read_config()
+        if self._index is None:
+            self._index = OrderedDict()
+            for backend_name in config.sections():
+                self._index[backend_name] = self._parse_backend(config, backend_name)
+
+            if self._dirty and not self._batch:
+                self._dirty = False
+                self._write_config(config)
+        return self._index
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager to group several changes in a single write of the
+        config file, when leaving the outermost block.
+
+        >>> with backends_config.batch(): # doctest: +SKIP
+        ...     for name in names:
+        ...         backends_config.remove_backend(name)
+        """
+        self._batch += 1
+        try:
+            yield
+        finally:
+            self._batch -= 1
+            if not self._batch and self._dirty:
+                self._dirty = False
+                self._write_config(self._config)
+
     def iter_backends(self):
         """
         Iterate on backends.
@@ -101,32 +183,17 @@ class BackendsConfig(object):
         :rtype: :class:`tuple`
         """
 
-        config = self._read_config()
-        changed = False
-        for backend_name in config.sections():
-            params = dict(config.items(backend_name))
-            try:
-                module_name = params.pop('_module')
-            except KeyError:
-                try:
-                    module_name = params.pop('_backend')
-                    config.set(backend_name, '_module', module_name)
-                    config.remove_option(backend_name, '_backend')
-                    changed = True
-                except KeyError:
-                    warning('Missing field "_module" for configured backend "%s"', backend_name)
-                    continue
-            yield backend_name, module_name, params
-
-        if changed:
-            self._write_config(config)
+        for backend_name, backend in list(self._get_index().items()):
+            if backend is None:
+                continue
+            module_name, params = backend
+            yield backend_name, module_name, dict(params)
 
     def backend_exists(self, name):
         """
         Return True if the backend exists in config.
         """
-        config = self._read_config()
-        return name in config.sections()
+        return name in self._get_index()
 
     def add_backend(self, backend_name, module_name, params, edit=False):
         """
@@ -139,7 +206,8 @@ class BackendsConfig(object):
         """
         if not backend_name:
             raise ValueError(u'Please give a name to the configured backend.')
-        config = self._read_config()
+        index = self._get_index()
+        config = self._config
         if not edit:
             try:
                 config.add_section(backend_name)
@@ -148,6 +216,7 @@ class BackendsConfig(object):
         config.set(backend_name, '_module', module_name)
         for key, value in params.items():
             config.set(backend_name, key, value)
+        index[backend_name] = self._parse_backend(config, backend_name)
 
         self._write_config(config)
 
@@ -163,28 +232,20 @@ class BackendsConfig(object):
         :rtype: tuple
         """
 
-        config = self._read_config()
-        if not config.has_section(backend_name):
+        backend = self._get_index().get(backend_name)
+        if backend is None:
             raise KeyError(u'Configured backend "%s" not found' % backend_name)
 
-        items = dict(config.items(backend_name))
-
-        try:
-            module_name = items.pop('_module')
-        except KeyError:
-            try:
-                module_name = items.pop('_backend')
-                self.edit_backend(backend_name, module_name, items)
-            except KeyError:
-                warning('Missing field "_module" for configured backend "%s"', backend_name)
-                raise KeyError(u'Configured backend "%s" not found' % backend_name)
-        return module_name, items
+        module_name, items = backend
+        return module_name, dict(items)
 
     def remove_backend(self, backend_name):
         """Remove a backend from config."""
 
-        config = self._read_config()
+        index = self._get_index()
+        config = self._config
         if not config.remove_section(backend_name):
             return False
+        index.pop(backend_name, None)
         self._write_config(config)
         return True
@@ -18,20 +18,19 @@
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
 
+from collections import deque
 from copy import copy
-from threading import Thread, Event
-try:
-    import Queue
-except ImportError:
-    import queue as Queue
+from threading import Thread, Event, Condition, Lock
 
 from weboob.capabilities.base import BaseObject
+from weboob.exceptions import CallCancelled, CallTimeout
 from weboob.tools.compat import basestring
+from weboob.tools.deadline import Deadline, deadline_context
 from weboob.tools.misc import get_backtrace
 from weboob.tools.log import getLogger
 
 
-__all__ = ['BackendsCall', 'CallErrors']
+__all__ = ['AsyncCallIterator', 'BackendsCall', 'CallErrors', 'CallExecutor']
 
 
 class CallErrors(Exception):
@@ -47,27 +46,188 @@ class CallErrors(Exception):
         return self.errors.__iter__()
 
 
+class CallExecutor(object):
+    """
+    Pool of threads used to run backend calls.
+
+    Threads are started on demand and exit as soon as there is no more work
+    to do, so an idle executor does not hold any thread.
+
+    :param max_workers: maximum number of threads running concurrently, or
+                        None for no limit
+    :type max_workers: :class:`int`
+    :param max_per_backend: maximum number of tasks running concurrently on a
+                            same backend; other tasks on this backend are
+                            queued without holding a thread
+    :type max_per_backend: :class:`int`
+    """
+
+    def __init__(self, max_workers=None, max_per_backend=1):
+        assert max_workers is None or max_workers > 0
+        assert max_per_backend > 0
+
+        self.logger = getLogger('bcall.executor')
+        self.max_workers = max_workers
+        self.max_per_backend = max_per_backend
+
+        self.cond = Condition()
+        self.pending = deque()
+        self.running = {}
+        self.workers = 0
+        self.busy = 0
+
+    def submit(self, backend, function, *args, **kwargs):
+        """
+        Schedule a call of function(\*args) on backend.
+
+        :param backend: backend the task is running on
+        :type backend: :class:`Module`
+        :param function: callable to run
+        :type function: callable
+        :param max_per_backend: maximum number of tasks running on the
+                                backend when this one is started, if higher
+                                than the limit of the executor
+        :type max_per_backend: :class:`int`
+        """
+        limit = max(self.max_per_backend, kwargs.pop('max_per_backend', None) or 0)
+        assert not kwargs, 'unexpected arguments: %r' % list(kwargs)
+        with self.cond:
+            self.pending.append((backend, limit, function, args))
+            self._spawn_workers()
+
+    def _pop_task(self):
+        for i, task in enumerate(self.pending):
+            if self.running.get(task[0], 0) < task[1]:
+                del self.pending[i]
+                return task
+        return None
+
+    def _count_runnable_tasks(self):
+        slots = {}
+        count = 0
+        for backend, limit, _, _ in self.pending:
+            used = slots.get(backend, self.running.get(backend, 0))
+            if used < limit:
+                slots[backend] = used + 1
+                count += 1
+        return count
+
+    def _spawn_workers(self):
+        # Must be called with self.cond held.
+        idle = self.workers - self.busy
+        missing = self._count_runnable_tasks() - idle
+        while missing > 0 and (self.max_workers is None or self.workers < self.max_workers):
+            self.workers += 1
+            missing -= 1
+            Thread(target=self._worker_run).start()
+
+    def _worker_run(self):
+        while True:
+            with self.cond:
+                task = self._pop_task()
+                if task is None:
+                    self.workers -= 1
+                    return
+
+                backend, _, function, args = task
+                self.running[backend] = self.running.get(backend, 0) + 1
+                self.busy += 1
+
+            try:
+                function(*args)
+            except Exception as e:
+                self.logger.error('Task on %s raised an unhandled error: %s', backend, get_backtrace(e))
+            finally:
+                with self.cond:
+                    self.busy -= 1
+                    self.running[backend] -= 1
+                    if not self.running[backend]:
+                        del self.running[backend]
+                    # A slot for this backend is released, a queued task
+                    # may now be runnable.
+                    self._spawn_workers()
+
+
 class BackendsCall(object):
+    # Marker put in the responses queue by each backend when it has no more
+    # results to give.
+    END_OF_STREAM = object()
+
     def __init__(self, backends, function, *args, **kwargs):
         """
         :param backends: List of backends to call
         :type backends: list[:class:`Module`]
         :param function: backends' method name, or callable object.
         :type function: :class:`str` or :class:`callable`
+        :param executor: executor used to run calls (keyword only, not given
+                         to function); by default one thread per backend is used
+        :type executor: :class:`CallExecutor`
+        :param queue_size: maximum number of results waiting to be consumed
+                           (keyword only, not given to function); when the
+                           queue is full, backends are paused until the
+                           consumer catches up. 0 means unbounded.
+        :type queue_size: :class:`int`
+        :param timeout: maximum duration of the call in seconds (keyword only,
+                        not given to function); backends still running after
+                        it are reported with a
+                        :class:`weboob.exceptions.CallTimeout` error. They
+                        can not send new HTTP requests, and the timeout of
+                        each request is capped to the remaining time, but
+                        requests already in progress are not interrupted.
+        :type timeout: :class:`float`
         """
         self.logger = getLogger('bcall')
 
-        self.responses = Queue.Queue()
+        executor = kwargs.pop('executor', None)
+        if executor is None:
+            executor = CallExecutor()
+        self.queue_size = kwargs.pop('queue_size', 0)
+        self.deadline = Deadline(kwargs.pop('timeout', None))
+
+        self.responses = deque()
         self.errors = []
-        self.tasks = Queue.Queue()
         self.stop_event = Event()
-        self.threads = []
+
+        # All the following conditions share the same lock.
+        self.mutex = Lock()
+        self.not_empty = Condition(self.mutex)
+        self.not_full = Condition(self.mutex)
+        self.all_done = Condition(self.mutex)
+        self.backends_count = len(backends)
+        self.running_backends = set(backends)
+        self.timed_out = set()
+        self.finished_count = 0
+        self.consumed_count = 0
+        # Callables notified, from any thread, when the state of the call
+        # changes (new response, end of a backend, stop).
+        self.listeners = []
 
         for backend in backends:
-            t = Thread(target=self.backend_process, args=(function, args, kwargs))
-            t.start()
-            self.threads.append(t)
-            self.tasks.put(backend)
+            limit = None
+            if isinstance(function, basestring) and hasattr(backend, 'max_concurrent_calls'):
+                # Let methods using the browsers pool of the backend run
+                # concurrently, even with the default executor.
+                limit = backend.max_concurrent_calls(function)
+            executor.submit(backend, self.backend_process, backend, function, args, kwargs,
+                            max_per_backend=limit)
+
+    def _put(self, item, force=False):
+        with self.mutex:
+            if not force:
+                # When the queue is bounded, block the producer until the
+                # consumer takes some results, unless the call is stopped.
+                while self.queue_size and len(self.responses) >= self.queue_size and not self.stop_event.is_set():
+                    self.not_full.wait()
+                if self.stop_event.is_set():
+                    return
+            self.responses.append(item)
+            self.not_empty.notify()
+
+        self._notify_listeners()
+
+    def _notify_listeners(self):
+        for listener in list(self.listeners):
+            listener()
 
     def store_result(self, backend, result):
         """Store the result when a backend task finished."""
@@ -76,53 +236,146 @@ class BackendsCall(object):
 
         if isinstance(result, BaseObject):
             result.backend = backend.name
-        self.responses.put(result)
+        self._put(result)
 
-    def backend_process(self, function, args, kwargs):
+    def backend_process(self, backend, function, args, kwargs):
         """
         Internal method to run a method of a backend.
 
         As this method may be blocking, it should be run on its own thread.
         """
-        backend = self.tasks.get()
-        with backend:
-            try:
-                # Call method on backend
+        try:
+            # Methods which can run concurrently use a browser of the
+            # backend's pool, others hold the backend lock.
+            call_context = getattr(backend, 'call_context', None)
+            if call_context is None:
+                context = backend
+            else:
+                context = call_context(None if callable(function) else function)
+
+            with context, deadline_context(self.deadline):
+                self._call_backend(backend, function, args, kwargs)
+        except Exception as error:
+            # The context could not be entered, for example the browser
+            # of the pool failed to be cloned.
+            self.logger.debug('%s: Unable to call function %s: %r', backend, function, error)
+            self._store_error(backend, error)
+        finally:
+            # The end-of-stream marker is put even if the queue is full,
+            # as the consumer is expecting it.
+            self._put(self.END_OF_STREAM, force=True)
+            with self.mutex:
+                self.running_backends.discard(backend)
+                self.finished_count += 1
+                if self.finished_count == self.backends_count:
+                    self.all_done.notify_all()
+
+    def _call_backend(self, backend, function, args, kwargs):
+        # Call method on backend
+        try:
+            self.logger.debug('%s: Calling function %s', backend, function)
+            if callable(function):
+                result = function(backend, *args, **kwargs)
+            else:
+                result = getattr(backend, function)(*args, **kwargs)
+        except Exception as error:
+            self.logger.debug('%s: Called function %s raised an error: %r', backend, function, error)
+            self._store_error(backend, error)
+        else:
+            self.logger.debug('%s: Called function %s returned: %r', backend, function, result)
+
+            if hasattr(result, '__iter__') and not isinstance(result, (bytes, basestring)):
+                # Loop on iterator
                 try:
-                    self.logger.debug('%s: Calling function %s', backend, function)
-                    if callable(function):
-                        result = function(backend, *args, **kwargs)
-                    else:
-                        result = getattr(backend, function)(*args, **kwargs)
+                    for subresult in result:
+                        self.store_result(backend, subresult)
+                        if self.stop_event.is_set():
+                            break
                 except Exception as error:
-                    self.logger.debug('%s: Called function %s raised an error: %r', backend, function, error)
-                    self.errors.append((backend, error, get_backtrace(error)))
-                else:
-                    self.logger.debug('%s: Called function %s returned: %r', backend, function, result)
-
-                    if hasattr(result, '__iter__') and not isinstance(result, (bytes, basestring)):
-                        # Loop on iterator
-                        try:
-                            for subresult in result:
-                                self.store_result(backend, subresult)
-                                if self.stop_event.is_set():
-                                    break
-                        except Exception as error:
-                            self.errors.append((backend, error, get_backtrace(error)))
-                    else:
-                        self.store_result(backend, result)
-            finally:
-                self.tasks.task_done()
+                    self._store_error(backend, error)
+            else:
+                self.store_result(backend, result)
+
+    def _store_error(self, backend, error):
+        with self.mutex:
+            if backend in self.timed_out:
+                # Already reported.
+                return
+            if self.deadline.is_expired() and isinstance(error, CallCancelled):
+                # Caused by the deadline, other errors are reported as is.
+                self.timed_out.add(backend)
+                error = CallTimeout('Backend %s did not finish before the deadline' % backend.name,
+                                    self.deadline.timeout)
+            elif self.stop_event.is_set() and isinstance(error, CallCancelled):
+                # Expected consequence of stop().
+                return
+            self.errors.append((backend, error, get_backtrace(error)))
+
+    def _check_deadline(self):
+        # Must be called with self.mutex held.
+        if self.stop_event.is_set() or not self.deadline.is_expired():
+            return False
+
+        for backend in self.running_backends - self.timed_out:
+            self.logger.debug('%s: deadline reached', backend)
+            self.timed_out.add(backend)
+            error = CallTimeout('Backend %s did not finish before the deadline' % backend.name,
+                                self.deadline.timeout)
+            self.errors.append((backend, error, get_backtrace(error)))
+        self._stop()
+        return True
+
+    def check_deadline(self):
+        """
+        Stop the call if its deadline is reached.
+
+        :returns: True if the call has just been stopped
+        """
+        with self.mutex:
+            stopped = self._check_deadline()
+
+        if stopped:
+            self._notify_listeners()
+        return stopped
+
+    def _next_response(self, block=True):
+        """
+        Get the next result.
+
+        Return END_OF_STREAM when every backend has finished or when the call
+        is stopped, and None if block is False and no result is available yet.
+        """
+        with self.mutex:
+            while self.consumed_count < self.backends_count:
+                while block and not self.responses and not self._check_deadline() and not self.stop_event.is_set():
+                    self.not_empty.wait(self.deadline.remaining())
+                if self.stop_event.is_set():
+                    break
+                if not self.responses:
+                    return None
+
+                response = self.responses.popleft()
+                self.not_full.notify()
+
+                if response is self.END_OF_STREAM:
+                    self.consumed_count += 1
+                    continue
+
+                return response
+
+        return self.END_OF_STREAM
+
+    def _iter_responses(self):
+        while True:
+            response = self._next_response()
+            if response is self.END_OF_STREAM:
+                return
+            yield response
 
     def _callback_thread_run(self, callback, errback, finishback):
-        while not self.stop_event.is_set() and (self.tasks.unfinished_tasks or not self.responses.empty()):
-            try:
-                response = self.responses.get(timeout=0.1)
-            except Queue.Empty:
-                continue
-            else:
-                if callback:
-                    callback(response)
+        for response in self._iter_responses():
+            if callback:
+                callback(response)
 
         # Raise errors
         while errback and self.errors:
@@ -151,8 +404,13 @@ class BackendsCall(object):
 
     def wait(self):
         """Wait until all tasks are finished."""
-        for thread in self.threads:
-            thread.join()
+        with self.mutex:
+            while self.finished_count < self.backends_count:
+                self._check_deadline()
+                if self.deadline.is_expired():
+                    # Do not wait for backends which are still hanging.
+                    break
+                self.all_done.wait(self.deadline.remaining())
 
         if self.errors:
             raise CallErrors(self.errors)
@@ -165,21 +423,101 @@ class BackendsCall(object):
         :type wait: bool
         """
 
-        self.stop_event.set()
+        with self.mutex:
+            self._stop()
+
+        self._notify_listeners()
 
         if wait:
             self.wait()
 
+    def _stop(self):
+        # Must be called with self.mutex held.
+        self.stop_event.set()
+        # Abort HTTP requests of running backends.
+        self.deadline.cancel()
+        # Wake up consumers and paused producers.
+        self.not_empty.notify_all()
+        self.not_full.notify_all()
+
     def __iter__(self):
         try:
-            while not self.stop_event.is_set() and (self.tasks.unfinished_tasks or not self.responses.empty()):
-                try:
-                    yield self.responses.get(timeout=0.1)
-                except Queue.Empty:
-                    continue
+            for response in self._iter_responses():
+                yield response
         except:
             self.stop()
             raise
 
         if self.errors:
             raise CallErrors(self.errors)
+
+    def __aiter__(self):
+        return AsyncCallIterator(self)
+
+
+class AsyncCallIterator(object):
+    """
+    Asynchronous iterator on the results of a :class:`BackendsCall`, to be
+    used from an :mod:`asyncio` event loop with ``async for``.
+
+    Backends still run in the threads of the executor, but no thread is used
+    to wait for results: the event loop is woken up each time a result comes.
+    Cancelling the task waiting for a result stops the call.
+
+    :param bcall: call to iterate on
+    :type bcall: :class:`BackendsCall`
+    :param loop: event loop to use; default is the current one
+    """
+
+    def __init__(self, bcall, loop=None):
+        import asyncio
+
+        self.bcall = bcall
+        self.loop = loop or asyncio.get_event_loop()
+        self.future = None
+        self.bcall.listeners.append(self._wakeup)
+
+        remaining = self.bcall.deadline.remaining()
+        if remaining is not None:
+            self.loop.call_later(remaining, self.bcall.check_deadline)
+
+    def _wakeup(self):
+        # Called from backend threads.
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if self.future is None or self.future.done():
+            return
+
+        response = self.bcall._next_response(block=False)
+        if response is None:
+            return
+
+        if response is self.bcall.END_OF_STREAM:
+            self.bcall.listeners.remove(self._wakeup)
+            if self.bcall.errors:
+                self.future.set_exception(CallErrors(self.bcall.errors))
+            else:
+                self.future.set_exception(StopAsyncIteration())
+        else:
+            self.future.set_result(response)
+
+    def _on_done(self, future):
+        if future.cancelled():
+            self.stop()
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        self.future = self.loop.create_future()
+        self.future.add_done_callback(self._on_done)
+        self._resolve()
+        return self.future
+
+    def stop(self):
+        """
+        Stop the call.
+        """
+        self.bcall.stop()
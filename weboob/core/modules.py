@@ -105,6 +105,9 @@ class ModulesLoader(object):
         self.path = path
         self.loaded = {}
         self.logger = getLogger('modules')
+        # (mtime of path, module names) to avoid listing the modules
+        # directory again while it is unchanged.
+        self._names = None
 
     def get_or_load_module(self, module_name):
         """
@@ -115,19 +118,17 @@ class ModulesLoader(object):
         return self.loaded[module_name]
 
     def iter_existing_module_names(self):
-        for name in os.listdir(self.path):
-            try:
-                if '__init__.py' in os.listdir(os.path.join(self.path, name)):
-                    yield name
-            except OSError:
-                # if path/name is not a directory
-                continue
+        mtime = os.stat(self.path).st_mtime
+        if self._names is None or self._names[0] != mtime:
+            names = [name for name in os.listdir(self.path) if self._is_module_dir(name)]
+            self._names = (mtime, names)
+        return iter(self._names[1])
+
+    def _is_module_dir(self, name):
+        return os.path.isfile(os.path.join(self.path, name, '__init__.py'))
 
     def module_exists(self, name):
-        for existing_module_name in self.iter_existing_module_names():
-            if existing_module_name == name:
-                return True
-        return False
+        return self._is_module_dir(name)
 
     def load_all(self):
         for existing_module_name in self.iter_existing_module_names():
@@ -179,6 +180,9 @@ class RepositoryModulesLoader(ModulesLoader):
         for name in self.repositories.get_all_modules_info():
             yield name
 
+    def module_exists(self, name):
+        return self.repositories.get_module_info(name) is not None
+
     def get_module_path(self, module_name):
         minfo = self.repositories.get_module_info(module_name)
         if minfo is None:
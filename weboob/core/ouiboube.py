@@ -18,9 +18,17 @@
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
 
+from collections import OrderedDict
+from functools import partial
 import os
+import time
 
-from weboob.core.bcall import BackendsCall
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+from weboob.core.bcall import AsyncCallIterator, BackendsCall, CallExecutor
 from weboob.core.modules import ModulesLoader, RepositoryModulesLoader
 from weboob.core.backendscfg import BackendsConfig
 from weboob.core.requests import RequestsManager
@@ -53,10 +61,13 @@ class WebNip(object):
     :type storage: :class:`weboob.tools.storage.IStorage`
     :param scheduler: what scheduler to use; default is :class:`weboob.core.scheduler.Scheduler`
     :type scheduler: :class:`weboob.core.scheduler.IScheduler`
+    :param executor: executor used to run calls on backends; default is a
+                     :class:`weboob.core.bcall.CallExecutor` without limit
+    :type executor: :class:`weboob.core.bcall.CallExecutor`
     """
     VERSION = '1.4'
 
-    def __init__(self, modules_path=None, storage=None, scheduler=None):
+    def __init__(self, modules_path=None, storage=None, scheduler=None, executor=None):
         self.logger = getLogger('weboob')
         self.backend_instances = {}
         self.requests = RequestsManager()
@@ -77,6 +88,10 @@ class WebNip(object):
             scheduler = Scheduler()
         self.scheduler = scheduler
 
+        if executor is None:
+            executor = CallExecutor()
+        self.executor = executor
+
         self.storage = storage
 
     def __deinit__(self):
@@ -241,6 +256,25 @@ class WebNip(object):
         :type backends: list[:class:`str`]
         :param caps: iterate on backends which implement this caps
         :type caps: list[:class:`weboob.capabilities.base.Capability`]
+        :param max_workers: maximum number of backends called concurrently
+                            for this call; default is to use the
+                            :attr:`executor` limits
+        :type max_workers: :class:`int`
+        :param max_per_backend: maximum number of calls running concurrently
+                                on a backend; default is to use the
+                                :attr:`executor` limit, raised for methods
+                                listed in
+                                :attr:`weboob.tools.backend.Module.CONCURRENT_METHODS`
+                                up to the pool size of the backend
+        :type max_per_backend: :class:`int`
+        :param queue_size: maximum number of results buffered before backends
+                           are paused until the caller consumes them; default
+                           is unbounded
+        :type queue_size: :class:`int`
+        :param timeout: maximum duration of the call in seconds; backends
+                        still running after it are reported with a
+                        :class:`weboob.exceptions.CallTimeout` error
+        :type timeout: :class:`float`
         :rtype: A :class:`weboob.core.bcall.BackendsCall` object (iterable)
         """
         backends = list(self.backend_instances.values())
@@ -271,12 +305,35 @@ class WebNip(object):
             caps = kwargs.pop('caps')
             backends = [backend for backend in backends if backend.has_caps(caps)]
 
+        max_workers = kwargs.pop('max_workers', None)
+        max_per_backend = kwargs.pop('max_per_backend', None)
+        if max_workers is not None or max_per_backend is not None:
+            kwargs['executor'] = CallExecutor(max_workers if max_workers is not None else self.executor.max_workers,
+                                              max_per_backend or self.executor.max_per_backend)
+        else:
+            kwargs['executor'] = self.executor
+
         # The return value MUST BE the BackendsCall instance. Please never iterate
         # here on this object, because caller might want to use other methods, like
         # wait() on callback_thread().
         # Thanks a lot.
         return BackendsCall(backends, function, *args, **kwargs)
 
+    def async_do(self, function, *args, **kwargs):
+        """
+        Like :meth:`do`, but get an asynchronous iterator to use from an
+        :mod:`asyncio` event loop::
+
+            async for result in weboob.async_do('iter_accounts'):
+                print(result)
+
+        Cancelling the task which is waiting for a result stops the call, so
+        it can be used with :func:`asyncio.wait_for`.
+
+        :rtype: :class:`weboob.core.bcall.AsyncCallIterator`
+        """
+        return AsyncCallIterator(self.do(function, *args, **kwargs))
+
     def schedule(self, interval, function, *args):
         """
         Schedule an event.
@@ -342,11 +399,13 @@ class Weboob(WebNip):
     :type backends_filename: str
     :param storage: provide a storage where backends can save data
     :type storage: :class:`weboob.tools.storage.IStorage`
+    :param executor: executor used to run calls on backends
+    :type executor: :class:`weboob.core.bcall.CallExecutor`
     """
     BACKENDS_FILENAME = 'backends'
 
-    def __init__(self, workdir=None, datadir=None, backends_filename=None, scheduler=None, storage=None):
-        super(Weboob, self).__init__(modules_path=False, scheduler=scheduler, storage=storage)
+    def __init__(self, workdir=None, datadir=None, backends_filename=None, scheduler=None, storage=None, executor=None):
+        super(Weboob, self).__init__(modules_path=False, scheduler=scheduler, storage=storage, executor=executor)
 
         # Create WORKDIR
         if workdir is None:
@@ -423,7 +482,7 @@ class Weboob(WebNip):
 
         return super(Weboob, self).build_backend(module_name, params, storage, name, nofail)
 
-    def load_backends(self, caps=None, names=None, modules=None, exclude=None, storage=None, errors=None):
+    def load_backends(self, caps=None, names=None, modules=None, exclude=None, storage=None, errors=None, workers=1):
         """
         Load backends listed in config file.
 
@@ -439,10 +498,14 @@ class Weboob(WebNip):
         :type storage: :class:`weboob.tools.storage.IStorage`
         :param errors: if specified, store every errors in this list
         :type errors: list[:class:`LoadError`]
-        :returns: loaded backends
+        :param workers: number of backends instantiated concurrently (loading
+                        their configuration, which can run commands to get
+                        passwords, and their storage)
+        :type workers: :class:`int`
+        :returns: loaded backends, in the order of the configuration
         :rtype: dict[:class:`str`, :class:`weboob.tools.backend.Module`]
         """
-        loaded = {}
+        loaded = OrderedDict()
         if storage is None:
             storage = self.storage
 
@@ -450,6 +513,10 @@ class Weboob(WebNip):
             self.logger.error(u'Repositories are not consistent with the sources.list')
             raise VersionsMismatchError(u'Versions mismatch, please run "weboob-config update"')
 
+        to_load = []
+        # Modules are installed and imported only once, even when several
+        # backends use them.
+        modules_loaded = {}
         for backend_name, module_name, params in self.backends_config.iter_backends():
             if '_enabled' in params and not params['_enabled'].lower() in ('1', 'y', 'true', 'on', 'yes') or \
                names is not None and backend_name not in names or \
@@ -457,31 +524,39 @@ class Weboob(WebNip):
                exclude is not None and backend_name in exclude:
                 continue
 
-            minfo = self.repositories.get_module_info(module_name)
-            if minfo is None:
-                self.logger.warning(u'Backend "%s" is referenced in %s but was not found. '
-                                    u'Perhaps a missing repository or a removed module?', module_name, self.backends_config.confpath)
-                continue
-
-            if caps is not None and not minfo.has_caps(caps):
-                continue
-
-            if not minfo.is_installed():
-                self.repositories.install(minfo)
-
-            module = None
-            try:
-                module = self.modules_loader.get_or_load_module(module_name)
-            except ModuleLoadError as e:
-                self.logger.error(u'Unable to load module "%s": %s', module_name, e)
+            if module_name not in modules_loaded:
+                modules_loaded[module_name] = self._load_backends_module(module_name, caps)
+            module = modules_loaded[module_name]
+            if module is None:
                 continue
 
             if backend_name in self.backend_instances:
                 self.logger.warning(u'Oops, the backend "%s" is already loaded. Unload it before reloading...', backend_name)
                 self.unload_backends(backend_name)
 
+            to_load.append((backend_name, module, params))
+
+        def create_instance(backend_name, module, params):
+            start = time.time()
+            try:
+                return module.create_instance(self, backend_name, params, storage)
+            finally:
+                self.logger.debug(u'Backend "%s" loaded in %.3fs', backend_name, time.time() - start)
+
+        if workers > 1 and len(to_load) > 1 and ThreadPoolExecutor is not None:
+            executor = ThreadPoolExecutor(max_workers=workers)
             try:
-                backend_instance = module.create_instance(self, backend_name, params, storage)
+                futures = [executor.submit(create_instance, *args) for args in to_load]
+            finally:
+                executor.shutdown(wait=False)
+            results = [future.result for future in futures]
+        else:
+            results = [partial(create_instance, *args) for args in to_load]
+
+        # Backends are registered in the order of the configuration.
+        for (backend_name, module, params), result in zip(to_load, results):
+            try:
+                backend_instance = result()
             except Module.ConfigError as e:
                 if errors is not None:
                     errors.append(self.LoadError(backend_name, e))
@@ -489,6 +564,25 @@ class Weboob(WebNip):
                 self.backend_instances[backend_name] = loaded[backend_name] = backend_instance
         return loaded
 
+    def _load_backends_module(self, module_name, caps=None):
+        minfo = self.repositories.get_module_info(module_name)
+        if minfo is None:
+            self.logger.warning(u'Backend "%s" is referenced in %s but was not found. '
+                                u'Perhaps a missing repository or a removed module?', module_name, self.backends_config.confpath)
+            return None
+
+        if caps is not None and not minfo.has_caps(caps):
+            return None
+
+        if not minfo.is_installed():
+            self.repositories.install(minfo)
+
+        try:
+            return self.modules_loader.get_or_load_module(module_name)
+        except ModuleLoadError as e:
+            self.logger.error(u'Unable to load module "%s": %s', module_name, e)
+            return None
+
     def load_or_install_module(self, module_name):
         """ Load a backend, and install it if not done before """
         try:
@@ -27,6 +27,7 @@ import sys
 import os
 import subprocess
 import hashlib
+import json
 from datetime import datetime
 from contextlib import closing
 from compileall import compile_dir
@@ -122,7 +123,7 @@ class Repository(object):
     KEYDIR = '.keys'
     KEYRING = 'trusted.gpg'
 
-    def __init__(self, url):
+    def __init__(self, url, index=None):
         self.url = url
         self.name = u''
         self.update = 0
@@ -142,8 +143,12 @@ class Repository(object):
         else:
             # This is probably a file in ~/.weboob/repositories/, we
             # don't know if this is a local or a remote repository.
-            with open(self.url, 'r') as fp:
-                self.parse_index(fp)
+            if index is not None:
+                # Already parsed, see Repositories.load().
+                self.load_index(index)
+            else:
+                with open(self.url, 'r') as fp:
+                    self.parse_index(fp)
 
     def __repr__(self):
         return '<Repository %r>' % self.name
@@ -254,15 +259,52 @@ class Repository(object):
             raise RepositoryUnavailable('Missing "url" key in settings')
 
         # Load modules
+        self._load_modules((section, dict(config.items(section))) for section in config.sections())
+
+    def _load_modules(self, modules):
         self.modules.clear()
-        for section in config.sections():
-            module = ModuleInfo(section)
-            module.load(dict(config.items(section)))
+        for name, items in modules:
+            module = ModuleInfo(name)
+            module.load(items)
             if not self.local:
                 module.url = posixpath.join(self.url, '%s.tar.gz' % module.name)
                 module.repo_url = self.url
                 module.signed = self.signed
-            self.modules[section] = module
+            self.modules[name] = module
+
+    def dump_index(self):
+        """
+        Dump the parsed index of this repository, to be given to
+        :func:`load_index`.
+
+        :rtype: :class:`dict`
+        """
+        return {'name': self.name,
+                'update': self.update,
+                'maintainer': self.maintainer,
+                'signed': self.signed,
+                'key_update': self.key_update,
+                'obsolete': self.obsolete,
+                'url': self.url,
+                'local': self.local,
+                'modules': dict((name, dict(module.dump())) for name, module in self.modules.items()),
+               }
+
+    def load_index(self, index):
+        """
+        Load an index dumped by :func:`dump_index`.
+
+        :type index: :class:`dict`
+        """
+        self.name = index['name']
+        self.update = index['update']
+        self.maintainer = index['maintainer']
+        self.signed = index['signed']
+        self.key_update = index['key_update']
+        self.obsolete = index['obsolete']
+        self.url = index['url']
+        self.local = index['local']
+        self._load_modules(index['modules'].items())
 
     def build_index(self, path, filename):
         """
@@ -437,6 +479,10 @@ class Repositories(object):
     REPOS_DIR = 'repositories'
     KEYRINGS_DIR = 'keyrings'
     ICONS_DIR = 'icons'
+    # Parsed indexes of repositories, to load them quickly at startup.
+    MODULES_INDEX = 'modules.index'
+    # Version of the format of MODULES_INDEX.
+    MODULES_INDEX_FORMAT = 1
 
     SHARE_DIRS = [MODULES_DIR, REPOS_DIR, KEYRINGS_DIR, ICONS_DIR]
 
@@ -453,6 +499,7 @@ class Repositories(object):
         self.repos_dir = os.path.join(self.datadir, self.REPOS_DIR)
         self.keyrings_dir = os.path.join(self.datadir, self.KEYRINGS_DIR)
         self.icons_dir = os.path.join(self.datadir, self.ICONS_DIR)
+        self.modules_index = os.path.join(self.datadir, self.MODULES_INDEX)
 
         self.create_dir(self.datadir)
         self.create_dir(self.modules_dir)
@@ -526,16 +573,89 @@ class Repositories(object):
     def load(self):
         """
         Load repositories from ~/.local/share/weboob/repositories/.
+
+        Their parsed content is read from the modules index when it is up to
+        date, and the index is rebuilt otherwise.
         """
         self.repositories = []
-        for name in sorted(os.listdir(self.repos_dir)):
+        sources = self._get_index_sources()
+        index = self._read_modules_index()
+        if index is not None and index['sources'] == sources:
+            for name, path in sorted((name, os.path.join(self.repos_dir, name)) for name in sources):
+                self.repositories.append(Repository(path, index=index['repositories'][name]))
+            return
+
+        loaded = {}
+        for name in sorted(sources):
             path = os.path.join(self.repos_dir, name)
             try:
                 repository = Repository(path)
                 self.repositories.append(repository)
+                loaded[name] = repository
             except RepositoryUnavailable as e:
                 print('Unable to load repository %s (%s), try to update repositories.' % (name, e), file=sys.stderr)
 
+        # Do not hide errors with an index of the valid repositories only.
+        if len(loaded) == len(sources):
+            self.save_modules_index(loaded)
+
+    def _get_index_sources(self):
+        sources = {}
+        for name in os.listdir(self.repos_dir):
+            st = os.stat(os.path.join(self.repos_dir, name))
+            sources[name] = [st.st_mtime, st.st_size]
+        return sources
+
+    def _read_modules_index(self):
+        try:
+            with open(self.modules_index, 'r') as fp:
+                index = json.load(fp)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if not isinstance(index, dict) or index.get('format') != self.MODULES_INDEX_FORMAT or \
+           index.get('version') != self.version:
+            return None
+        return index
+
+    def save_modules_index(self, loaded=None):
+        """
+        Save the parsed repositories into the modules index.
+
+        It is called every time repositories are updated, and the index is
+        then used by :func:`load` as long as the files of
+        ~/.local/share/weboob/repositories/ are unchanged.
+
+        :param loaded: repositories already parsed, by file name
+        :type loaded: dict[:class:`str`, :class:`Repository`]
+        """
+        if loaded is None:
+            loaded = {}
+        sources = self._get_index_sources()
+        repositories = {}
+        for name in sources:
+            repository = loaded.get(name)
+            if repository is None:
+                try:
+                    repository = Repository(os.path.join(self.repos_dir, name))
+                except RepositoryUnavailable as e:
+                    self.logger.warning(u'Unable to index repository %s: %s', name, e)
+                    return
+            repositories[name] = repository.dump_index()
+
+        index = {'format': self.MODULES_INDEX_FORMAT,
+                 'version': self.version,
+                 'sources': sources,
+                 'repositories': repositories,
+                }
+        tmp = '%s.tmp' % self.modules_index
+        try:
+            with open(tmp, 'w') as fp:
+                json.dump(index, fp)
+            os.rename(tmp, self.modules_index)
+        except (IOError, OSError) as e:
+            self.logger.warning(u'Unable to save modules index: %s', e)
+
     def get_module_icon_path(self, module):
         return os.path.join(self.icons_dir, '%s.png' % module.name)
 
@@ -590,6 +710,7 @@ class Repositories(object):
         for name in os.listdir(self.repos_dir):
             os.remove(os.path.join(self.repos_dir, name))
 
+        loaded = {}
         gpg_found = Keyring.find_gpg() or Keyring.find_gpgv()
         for line in self._parse_source_list():
             progress.progress(0.0, 'Getting %s' % line)
@@ -609,11 +730,14 @@ class Repositories(object):
                 progress.error('Unable to load repository: %s' % e)
             else:
                 self.repositories.append(repository)
+                loaded[prio_filename] = repository
                 if repository.obsolete:
                     last_update = datetime.strptime(str(repository.update), '%Y%m%d%H%M').strftime('%Y-%m-%d')
                     progress.error('This repository does not receive updates anymore (since %s).\n'
                                    'Your weboob version is probably obsolete and should be upgraded.' % last_update)
 
+        self.save_modules_index(loaded)
+
     def check_repositories(self):
         """
         Check if sources.list is consistent with repositories
@@ -18,13 +18,12 @@
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
 
-from __future__ import print_function
-
-from threading import Event, RLock
-try:
-    from threading import _Timer as Timer
-except ImportError:
-    from threading import Timer
+from collections import deque
+import heapq
+from itertools import count
+import random
+from threading import Condition, Event, Lock, Thread, current_thread
+import time
 
 from weboob.tools.log import getLogger
 from weboob.tools.misc import get_backtrace
@@ -84,83 +83,183 @@ class IScheduler(object):
         raise NotImplementedError()
 
 
-class RepeatedTimer(Timer):
-    def run(self):
-        while not self.finished.isSet():
-            try:
-                self.function(*self.args, **self.kwargs)
-            except Exception:
-                # do not stop timer because of an exception
-                print(get_backtrace())
-            self.finished.wait(self.interval)
-        self.finished.set()
+class Job(object):
+    """
+    A function scheduled by :class:`Scheduler`.
+    """
 
+    def __init__(self, id, interval, function, args, repeat):
+        self.id = id
+        self.interval = interval
+        self.function = function
+        self.args = args
+        self.repeat = repeat
+        # Planned time of the next run.
+        self.next_run = None
+        self.cancelled = False
 
-class Scheduler(IScheduler):
-    """Scheduler using Python's :mod:`threading`."""
+    @property
+    def name(self):
+        return getattr(self.function, '__name__', repr(self.function))
 
-    def __init__(self):
+    def __repr__(self):
+        return '<Job %d %s>' % (self.id, self.name)
+
+
+class Scheduler(IScheduler):
+    """
+    Scheduler using Python's :mod:`threading`.
+
+    A single dispatcher thread keeps jobs in a heap ordered by their next
+    run time, and gives due jobs to a pool of worker threads. A repeated
+    job never runs concurrently with itself: it is scheduled again once
+    its previous run is over.
+
+    :param max_workers: number of threads used to run jobs
+    :type max_workers: :class:`int`
+    :param jitter: maximum random delay, in seconds, added to each run, to
+                   avoid running lots of periodic jobs at the same time
+    :type jitter: :class:`float`
+    :param misfire_grace_time: if a job can not be started before this
+                               number of seconds after its planned time
+                               (because all workers are busy), this run is
+                               skipped; None to never skip runs
+    :type misfire_grace_time: :class:`float`
+    """
+
+    def __init__(self, max_workers=10, jitter=0, misfire_grace_time=None):
         self.logger = getLogger('scheduler')
-        self.mutex = RLock()
+        self.max_workers = max_workers
+        self.jitter = jitter
+        self.misfire_grace_time = misfire_grace_time
+
         self.stop_event = Event()
+        self.mutex = Lock()
+        # Notified when the first job of the heap changes.
+        self.heap_changed = Condition(self.mutex)
+        # Notified when a job is ready to run.
+        self.job_ready = Condition(self.mutex)
         self.count = 0
+        # Entries are (time, seq, job). An entry is ignored if its job has
+        # been cancelled or rescheduled since it was pushed.
+        self.heap = []
+        self.seq = count()
         self.queue = {}
+        self.ready = deque()
+        self.threads = []
 
     def schedule(self, interval, function, *args):
-        return self._schedule(Timer, interval, self._schedule_callback, function, *args)
+        return self._schedule(interval, function, args, repeat=False)
 
     def repeat(self, interval, function, *args):
-        return self._schedule(RepeatedTimer, interval, self._repeat_callback, function, *args)
+        # As a repeated job is immediately called, the interval is only
+        # waited between runs.
+        return self._schedule(interval, function, args, repeat=True)
 
-    def _schedule(self, klass, interval, meta_func, function, *args):
-        if self.stop_event.isSet():
+    def _schedule(self, interval, function, args, repeat):
+        if self.stop_event.is_set():
             return
 
         with self.mutex:
             self.count += 1
-            self.logger.debug('function "%s" will be called in %s seconds' % (function.__name__, interval))
-            timer = klass(interval, meta_func, (self.count, interval, function, args))
-            self.queue[self.count] = timer
-            timer.start()
-            return self.count
+            job = Job(self.count, interval, function, args, repeat)
+            self.queue[job.id] = job
+            self._plan(job, time.time() + (0 if repeat else interval))
+            self.logger.debug('function "%s" will be called in %s seconds', job.name, 0 if repeat else interval)
+            self._start_threads()
+            return job.id
+
+    def _plan(self, job, when):
+        # Must be called with self.mutex held.
+        if self.jitter:
+            when += random.uniform(0, self.jitter)
+        job.next_run = when
+        heapq.heappush(self.heap, (when, next(self.seq), job))
+        if self.heap[0][2] is job:
+            # The dispatcher may be waiting for a later job.
+            self.heap_changed.notify()
+
+    def _start_threads(self):
+        # Must be called with self.mutex held.
+        if self.threads:
+            return
 
-    def _schedule_callback(self, count, interval, function, args):
-        with self.mutex:
-            self.queue.pop(count)
-        return function(*args)
+        self.threads.append(Thread(target=self._dispatcher_run, name='scheduler'))
+        for i in range(self.max_workers):
+            self.threads.append(Thread(target=self._worker_run, name='scheduler-worker-%d' % i))
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
 
-    def _repeat_callback(self, count, interval, function, args):
-        function(*args)
+    def _dispatcher_run(self):
         with self.mutex:
-            try:
-                e = self.queue[count]
-            except KeyError:
-                return
+            while not self.stop_event.is_set():
+                now = time.time()
+                while self.heap and self.heap[0][0] <= now:
+                    when, _, job = heapq.heappop(self.heap)
+                    if job.cancelled or job.next_run != when:
+                        continue
+                    self.ready.append(job)
+                    self.job_ready.notify()
+
+                if self.heap:
+                    self.heap_changed.wait(self.heap[0][0] - now)
+                else:
+                    self.heap_changed.wait()
+
+    def _worker_run(self):
+        while True:
+            with self.mutex:
+                while not self.ready and not self.stop_event.is_set():
+                    self.job_ready.wait()
+                if self.stop_event.is_set():
+                    return
+                job = self.ready.popleft()
+                if job.cancelled:
+                    continue
+
+            late = time.time() - job.next_run
+            if self.misfire_grace_time is not None and late > self.misfire_grace_time:
+                self.logger.warning('function "%s" missed its run by %.1f seconds, skipped', job.name, late)
             else:
-                self.logger.debug('function "%s" will be called in %s seconds' % (function.__name__, e.interval))
+                try:
+                    job.function(*job.args)
+                except Exception:
+                    # do not stop scheduler because of an exception
+                    self.logger.error(get_backtrace())
+
+            with self.mutex:
+                if job.cancelled:
+                    continue
+                if job.repeat:
+                    self._plan(job, time.time() + job.interval)
+                    self.logger.debug('function "%s" will be called in %s seconds', job.name, job.interval)
+                else:
+                    self.queue.pop(job.id, None)
 
     def cancel(self, ev):
         with self.mutex:
             try:
-                e = self.queue.pop(ev)
+                job = self.queue.pop(ev)
             except KeyError:
                 return False
-            e.cancel()
-            self.logger.debug('scheduled function "%s" is canceled' % e.function.__name__)
+            job.cancelled = True
+            self.logger.debug('scheduled function "%s" is canceled', job.name)
             return True
 
     def _wait_to_stop(self):
         self.want_stop()
-        with self.mutex:
-            for e in self.queue.values():
-                e.cancel()
-                e.join()
-            self.queue = {}
+        for thread in self.threads:
+            if thread is not current_thread():
+                thread.join()
+        self.threads = []
 
     def run(self):
         try:
-            while True:
-                self.stop_event.wait(0.1)
+            while not self.stop_event.is_set():
+                # Waiting with a timeout keeps the loop interruptible by
+                # KeyboardInterrupt on Python 2.
+                self.stop_event.wait(1)
         except KeyboardInterrupt:
             self._wait_to_stop()
             raise
@@ -171,8 +270,13 @@ class Scheduler(IScheduler):
     def want_stop(self):
         self.stop_event.set()
         with self.mutex:
-            for t in self.queue.values():
-                t.cancel()
-                # Contrary to _wait_to_stop(), don't call t.join
-                # because want_stop() have to be non-blocking.
+            for job in self.queue.values():
+                job.cancelled = True
             self.queue = {}
+            self.heap = []
+            self.ready.clear()
+            # Wake up the dispatcher and idle workers. Contrary to
+            # _wait_to_stop(), don't wait for running jobs because
+            # want_stop() have to be non-blocking.
+            self.heap_changed.notify_all()
+            self.job_ready.notify_all()
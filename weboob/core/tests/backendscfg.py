@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import codecs
+import os
+import shutil
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from weboob.core.backendscfg import BackendsConfig, BackendAlreadyExists
+
+
+class BackendsConfigTest(TestCase):
+    def setUp(self):
+        self.tmpdir = mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'backends')
+        self.config = BackendsConfig(self.path)
+        self.reads = 0
+
+        read_config = self.config._read_config
+
+        def counting_read_config():
+            config = self.config._config
+            ret = read_config()
+            if ret is not config:
+                self.reads += 1
+            return ret
+        self.config._read_config = counting_read_config
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, text):
+        with codecs.open(self.path, 'w', encoding='utf-8') as fd:
+            fd.write(text)
+
+    def test_cache(self):
+        self.config.add_backend(u'a', u'foo', {u'login': u'é'})
+        self.config.add_backend(u'b', u'bar', {})
+        self.assertEqual(self.reads, 1)
+
+        self.assertTrue(self.config.backend_exists(u'a'))
+        self.assertFalse(self.config.backend_exists(u'c'))
+        self.assertEqual(self.config.get_backend(u'a'), (u'foo', {u'login': u'é'}))
+        self.assertEqual([name for name, _, _ in self.config.iter_backends()], [u'a', u'b'])
+        self.assertEqual(self.reads, 1)
+
+        # returned params are copies
+        self.config.get_backend(u'a')[1][u'login'] = u'x'
+        self.assertEqual(self.config.get_backend(u'a'), (u'foo', {u'login': u'é'}))
+
+        self.assertRaises(BackendAlreadyExists, self.config.add_backend, u'a', u'foo', {})
+        self.config.edit_backend(u'a', u'foo', {u'_enabled': u'0'})
+        self.assertEqual(self.config.get_backend(u'a'), (u'foo', {u'login': u'é', u'_enabled': u'0'}))
+        self.assertTrue(self.config.remove_backend(u'b'))
+        self.assertFalse(self.config.remove_backend(u'b'))
+        self.assertFalse(self.config.backend_exists(u'b'))
+        self.assertEqual(self.reads, 1)
+
+        other = BackendsConfig(self.path)
+        self.assertEqual(list(other.iter_backends()), [(u'a', u'foo', {u'login': u'é', u'_enabled': u'0'})])
+
+    def test_external_change(self):
+        self.write(u'[a]\n_module = foo\n')
+        self.assertEqual(self.config.get_backend(u'a'), (u'foo', {}))
+
+        self.write(u'[a]\n_module = foo\n\n[b]\n_backend = bar\n')
+        self.assertEqual(self.config.get_backend(u'b'), (u'bar', {}))
+        self.assertEqual(self.reads, 2)
+
+        # the legacy _backend option has been migrated
+        with codecs.open(self.path, 'r', encoding='utf-8') as fd:
+            self.assertIn(u'_module = bar', fd.read())
+
+    def test_batch(self):
+        self.write(u'[a]\n_module = foo\n')
+        with self.config.batch():
+            self.config.add_backend(u'b', u'bar', {})
+            self.config.remove_backend(u'a')
+            self.assertEqual(list(self.config.iter_backends()), [(u'b', u'bar', {})])
+            with codecs.open(self.path, 'r', encoding='utf-8') as fd:
+                self.assertEqual(fd.read(), u'[a]\n_module = foo\n')
+
+        other = BackendsConfig(self.path)
+        self.assertEqual(list(other.iter_backends()), [(u'b', u'bar', {})])
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from threading import Lock, RLock
+import time
+from unittest import TestCase, skipIf
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+from weboob.core.bcall import AsyncCallIterator, BackendsCall, CallErrors, CallExecutor
+from weboob.exceptions import BrowserUnavailable, CallTimeout
+from weboob.tools.deadline import get_deadline
+
+
+class FakeBackend(object):
+    def __init__(self, name, count=3, delay=0):
+        self.name = name
+        self.count = count
+        self.delay = delay
+        self.lock = RLock()
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, t, v, tb):
+        self.lock.release()
+
+    def __repr__(self):
+        return '<FakeBackend %r>' % self.name
+
+    def iter_numbers(self):
+        for i in range(self.count):
+            if self.delay:
+                time.sleep(self.delay)
+            yield '%s-%d' % (self.name, i)
+
+    def fail(self):
+        raise ValueError(self.name)
+
+
+class BackendsCallTest(TestCase):
+    def test_all_results(self):
+        backends = [FakeBackend('b%d' % i) for i in range(5)]
+        results = sorted(BackendsCall(backends, 'iter_numbers'))
+        self.assertEqual(results, sorted('b%d-%d' % (i, j) for i in range(5) for j in range(3)))
+
+    def test_errors(self):
+        backends = [FakeBackend('b1'), FakeBackend('b2')]
+        with self.assertRaises(CallErrors) as cm:
+            list(BackendsCall(backends, 'fail'))
+        self.assertEqual(sorted(b.name for b, _, _ in cm.exception), ['b1', 'b2'])
+
+    def test_max_workers(self):
+        lock = Lock()
+        state = {'current': 0, 'max': 0}
+
+        def func(backend):
+            with lock:
+                state['current'] += 1
+                state['max'] = max(state['max'], state['current'])
+            time.sleep(0.02)
+            with lock:
+                state['current'] -= 1
+            return backend.name
+
+        backends = [FakeBackend('b%d' % i) for i in range(8)]
+        results = list(BackendsCall(backends, func, executor=CallExecutor(max_workers=2)))
+        self.assertEqual(len(results), 8)
+        self.assertEqual(state['max'], 2)
+
+    def test_bounded_queue(self):
+        backend = FakeBackend('b', count=20)
+        call = BackendsCall([backend], 'iter_numbers', queue_size=2)
+        time.sleep(0.1)
+        # producer is paused until we consume
+        self.assertEqual(len(call.responses), 2)
+        self.assertEqual(len(list(call)), 20)
+
+    def test_no_backend(self):
+        self.assertEqual(list(BackendsCall([], 'iter_numbers')), [])
+
+    def test_returns_when_last_backend_finishes(self):
+        backends = [FakeBackend('b%d' % i, count=1) for i in range(10)]
+        start = time.time()
+        list(BackendsCall(backends, 'iter_numbers'))
+        self.assertLess(time.time() - start, 0.05)
+
+    def test_stop(self):
+        backend = FakeBackend('b', count=1000, delay=0.001)
+        call = BackendsCall([backend], 'iter_numbers')
+        for _ in call:
+            break
+        call.wait()
+        self.assertTrue(call.stop_event.is_set())
+
+    def test_timeout(self):
+        backends = [FakeBackend('fast', count=1), FakeBackend('slow', count=100, delay=0.05)]
+        call = BackendsCall(backends, 'iter_numbers', timeout=0.2)
+        start = time.time()
+        with self.assertRaises(CallErrors) as cm:
+            results = []
+            for result in call:
+                results.append(result)
+        self.assertLess(time.time() - start, 0.4)
+        self.assertIn('fast-0', results)
+        errors = list(cm.exception)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][0].name, 'slow')
+        self.assertIsInstance(errors[0][1], CallTimeout)
+        self.assertEqual(errors[0][1].timeout, 0.2)
+
+    def test_error_after_timeout(self):
+        def func(backend):
+            time.sleep(0.2)
+            raise BrowserUnavailable('down')
+
+        call = BackendsCall([FakeBackend('late')], func, timeout=0.1)
+        # The backend fails after the deadline, before the consumer checks it.
+        time.sleep(0.4)
+        with self.assertRaises(CallErrors) as cm:
+            call.wait()
+        self.assertEqual([type(error) for _, error, _ in cm.exception], [BrowserUnavailable])
+
+    def test_timeout_wait(self):
+        call = BackendsCall([FakeBackend('slow', count=100, delay=0.05)], 'iter_numbers', timeout=0.1)
+        start = time.time()
+        with self.assertRaises(CallErrors):
+            call.wait()
+        self.assertLess(time.time() - start, 0.3)
+
+    def test_stop_cancels_requests(self):
+        def func(backend):
+            get_deadline().cancelled.wait()
+            get_deadline().check()
+
+        call = BackendsCall([FakeBackend('b')], func)
+        call.stop(wait=True)
+        self.assertEqual(call.errors, [])
+
+
+@skipIf(asyncio is None, 'asyncio is not available')
+class AsyncCallIteratorTest(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def collect(self, it):
+        results = []
+        while True:
+            try:
+                results.append(self.loop.run_until_complete(it.__anext__()))
+            except StopAsyncIteration:
+                return results
+
+    def test_all_results(self):
+        backends = [FakeBackend('b%d' % i, delay=0.001) for i in range(5)]
+        it = AsyncCallIterator(BackendsCall(backends, 'iter_numbers'), self.loop)
+        self.assertEqual(sorted(self.collect(it)), sorted('b%d-%d' % (i, j) for i in range(5) for j in range(3)))
+
+    def test_errors(self):
+        it = AsyncCallIterator(BackendsCall([FakeBackend('b')], 'fail'), self.loop)
+        with self.assertRaises(CallErrors):
+            self.collect(it)
+
+    def test_cancel(self):
+        call = BackendsCall([FakeBackend('b', count=1000, delay=0.5)], 'iter_numbers')
+        it = AsyncCallIterator(call, self.loop)
+        with self.assertRaises(asyncio.TimeoutError):
+            self.loop.run_until_complete(asyncio.wait_for(it.__anext__(), 0.001))
+        self.assertTrue(call.stop_event.is_set())
+        call.wait()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+from tempfile import mkdtemp
+from threading import Lock
+import time
+from unittest import TestCase
+
+from weboob.core.ouiboube import Weboob
+from weboob.tools.backend import Module
+
+
+class FakeModuleInfo(object):
+    def has_caps(self, *caps):
+        return True
+
+    def is_installed(self):
+        return True
+
+
+class FakeBackend(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, t, v, tb):
+        pass
+
+    def deinit(self):
+        pass
+
+
+class FakeModule(object):
+    def __init__(self, name):
+        self.name = name
+        self.lock = Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def create_instance(self, weboob, backend_name, params, storage):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.running, self.max_running)
+        try:
+            # Backends configured first are the slowest to load.
+            time.sleep(float(params['delay']))
+            if params.get('fail'):
+                raise Module.ConfigError('invalid config of %s' % backend_name)
+            return FakeBackend(backend_name)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class LoadBackendsTest(TestCase):
+    def setUp(self):
+        self.tmpdir = mkdtemp()
+        with open(os.path.join(self.tmpdir, 'sources.list'), 'w') as fp:
+            fp.write('file://%s\n' % self.tmpdir)
+        self.weboob = Weboob(workdir=self.tmpdir, datadir=self.tmpdir)
+
+        self.modules = {}
+        self.imports = []
+        self.weboob.repositories.check_repositories = lambda: True
+        self.weboob.repositories.get_module_info = lambda name: FakeModuleInfo()
+        self.weboob.modules_loader.get_or_load_module = self.load_module
+
+        config = self.weboob.backends_config
+        with config.batch():
+            for i in range(6):
+                params = {'delay': str(0.02 * (6 - i))}
+                if i in (1, 4):
+                    params['fail'] = '1'
+                config.add_backend('backend%d' % i, 'module%d' % (i % 2), params)
+
+    def tearDown(self):
+        self.weboob.deinit()
+        shutil.rmtree(self.tmpdir)
+
+    def load_module(self, name):
+        self.imports.append(name)
+        return self.modules.setdefault(name, FakeModule(name))
+
+    def check_loaded(self, loaded, errors):
+        self.assertEqual(list(loaded), ['backend0', 'backend2', 'backend3', 'backend5'])
+        self.assertEqual([err.backend_name for err in errors], ['backend1', 'backend4'])
+        self.assertEqual(str(errors[0]), 'invalid config of backend1')
+        self.assertEqual(sorted(self.imports), ['module0', 'module1'])
+
+    def test_sequential(self):
+        errors = []
+        self.check_loaded(self.weboob.load_backends(errors=errors), errors)
+        self.assertEqual(max(module.max_running for module in self.modules.values()), 1)
+
+    def test_concurrent(self):
+        errors = []
+        self.check_loaded(self.weboob.load_backends(errors=errors, workers=4), errors)
+        self.assertGreater(sum(module.max_running for module in self.modules.values()), 1)
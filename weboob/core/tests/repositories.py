@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import shutil
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from weboob.core.repositories import ModuleInfo, Repositories, Repository
+
+
+URL = 'https://updates.example.org/main/'
+
+
+class ModulesIndexTest(TestCase):
+    def setUp(self):
+        self.tmpdir = mkdtemp()
+        with open(os.path.join(self.tmpdir, Repositories.SOURCES_LIST), 'w') as fp:
+            fp.write('%s\n' % URL)
+
+        self.repo_path = os.path.join(self.tmpdir, Repositories.REPOS_DIR, '00-%s' % Repositories.url2filename(URL))
+        os.makedirs(os.path.dirname(self.repo_path))
+        self.save_repository([u'foo', u'bar'])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def save_repository(self, names):
+        repository = Repository(URL)
+        repository.name = u'main'
+        repository.update = 201801010000
+        repository.maintainer = u'admin@example.org'
+        for name in names:
+            module = ModuleInfo(name)
+            module.version = 201801010000
+            module.capabilities = [u'CapBank']
+            module.description = u'Module %s' % name
+            repository.modules[name] = module
+        repository.save(self.repo_path, private=True)
+
+    def load(self):
+        return Repositories(self.tmpdir, self.tmpdir, '1.4')
+
+    def edit_index(self, func):
+        path = os.path.join(self.tmpdir, Repositories.MODULES_INDEX)
+        with open(path) as fp:
+            index = json.load(fp)
+        func(index)
+        with open(path, 'w') as fp:
+            json.dump(index, fp)
+
+    def test_index(self):
+        repositories = self.load()
+        self.assertEqual(sorted(repositories.get_all_modules_info()), [u'bar', u'foo'])
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, Repositories.MODULES_INDEX)))
+
+        def edit(index):
+            for repository in index['repositories'].values():
+                repository['modules']['foo']['description'] = u'From index'
+        self.edit_index(edit)
+
+        repositories = self.load()
+        info = repositories.get_module_info(u'foo')
+        self.assertEqual(info.description, u'From index')
+        self.assertTrue(info.has_caps('CapBank'))
+        self.assertEqual(info.url, '%sfoo.tar.gz' % URL)
+        self.assertEqual(repositories.repositories[0].name, u'main')
+
+    def test_invalidation(self):
+        self.load()
+        self.save_repository([u'foo', u'bar', u'baz'])
+        self.assertEqual(sorted(self.load().get_all_modules_info()), [u'bar', u'baz', u'foo'])
+
+        def edit(index):
+            index['version'] = '0.0'
+            for repository in index['repositories'].values():
+                repository['modules']['foo']['description'] = u'From index'
+        self.edit_index(edit)
+        self.assertEqual(self.load().get_module_info(u'foo').description, u'Module foo')
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from threading import Event
+import time
+from unittest import TestCase
+
+from weboob.core.scheduler import Scheduler
+
+
+class SchedulerTest(TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler(max_workers=2)
+
+    def tearDown(self):
+        self.scheduler.want_stop()
+
+    def test_schedule(self):
+        done = Event()
+        calls = []
+        self.scheduler.schedule(0.05, lambda x: (calls.append(x), done.set()), 42)
+        start = time.time()
+        self.assertTrue(done.wait(1))
+        self.assertGreaterEqual(time.time() - start, 0.04)
+        self.assertEqual(calls, [42])
+        self.assertEqual(self.scheduler.queue, {})
+
+    def test_order(self):
+        calls = []
+        done = Event()
+        scheduler = Scheduler(max_workers=1)
+        scheduler.schedule(0.06, lambda: (calls.append(3), done.set()))
+        scheduler.schedule(0.02, calls.append, 1)
+        scheduler.schedule(0.04, calls.append, 2)
+        self.assertTrue(done.wait(1))
+        scheduler.want_stop()
+        self.assertEqual(calls, [1, 2, 3])
+
+    def test_repeat_and_cancel(self):
+        calls = []
+        ev = self.scheduler.repeat(0.01, calls.append, 1)
+        time.sleep(0.1)
+        self.assertTrue(self.scheduler.cancel(ev))
+        self.assertFalse(self.scheduler.cancel(ev))
+        count = len(calls)
+        self.assertGreater(count, 3)
+        time.sleep(0.05)
+        self.assertEqual(len(calls), count)
+
+    def test_many_jobs_use_few_threads(self):
+        for i in range(5000):
+            self.scheduler.repeat(60, lambda: None)
+        self.assertEqual(len(self.scheduler.threads), 3)
+
+    def test_misfire(self):
+        calls = []
+        scheduler = Scheduler(max_workers=1, misfire_grace_time=0.01)
+        scheduler.schedule(0, time.sleep, 0.1)
+        scheduler.schedule(0.01, calls.append, 1)
+        time.sleep(0.2)
+        scheduler.want_stop()
+        self.assertEqual(calls, [])
+
+    def test_run(self):
+        self.scheduler.schedule(0.02, self.scheduler.want_stop)
+        self.assertTrue(self.scheduler.run())
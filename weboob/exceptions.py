@@ -103,3 +103,22 @@ class AuthMethodNotImplemented(ActionNeeded):
 
 class BrowserPasswordExpired(ActionNeeded):
     pass
+
+
+class CallCancelled(Exception):
+    """
+    Raised when a request is made by a backend whose call has been stopped.
+    """
+
+
+class CallTimeout(CallCancelled):
+    """
+    Raised when the deadline of a backend call is reached.
+
+    :param timeout: duration of the call in seconds, if known
+    :type timeout: :class:`float`
+    """
+
+    def __init__(self, msg='', timeout=None):
+        super(CallTimeout, self).__init__(msg)
+        self.timeout = timeout
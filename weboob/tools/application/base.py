@@ -166,6 +166,8 @@ class Application(object):
             self._parser.add_option_group(app_options)
         self._parser.add_option('-b', '--backends', help='what backend(s) to enable (comma separated)')
         self._parser.add_option('-e', '--exclude-backends', help='what backend(s) to exclude (comma separated)')
+        self._parser.add_option('--load-workers', type='int', default=1, metavar='N',
+                                help='number of backends loaded concurrently (default: 1)')
         self._parser.add_option('-I', '--insecure', action='store_true', help='do not validate SSL')
         self._parser.add_option('--nss', action='store_true', help='Use NSS instead of OpenSSL')
         logging_options = OptionGroup(self._parser, 'Logging Options')
@@ -199,8 +201,8 @@ class Application(object):
         :rtype: :class:`weboob.tools.storage.IStorage`
         """
         if klass is None:
-            from weboob.tools.storage import StandardStorage
-            klass = StandardStorage
+            from weboob.tools.storage import ShardedStorage
+            klass = ShardedStorage
 
         if path is None:
             path = os.path.join(self.CONFDIR, self.APPNAME + '.storage')
@@ -257,6 +259,7 @@ class Application(object):
             names = self.options.backends.split(',')
         if exclude is None and self.options.exclude_backends:
             exclude = self.options.exclude_backends.split(',')
+        kwargs.setdefault('workers', self.options.load_workers)
         loaded = self.weboob.load_backends(caps, names, exclude=exclude, *args, **kwargs)
         if not loaded:
             logging.info(u'No backend loaded')
@@ -286,8 +289,19 @@ class Application(object):
     def _do_complete_iter(self, backend, count, fields, res):
         modif = 0
 
+        def iter_objs():
+            for sub in res:
+                if sub and isinstance(sub, BaseObject):
+                    sub.backend = backend.name
+                yield sub
+
+        res = iter_objs()
+        if fields is None or len(fields) > 0:
+            # Objects may be filled while the next ones are retrieved, the
+            # module bounds the number of objects retrieved in advance.
+            res = backend.fillobjs(res, fields)
+
         for i, sub in enumerate(res):
-            sub = self._do_complete_obj(backend, fields, sub)
             if self.condition and self.condition.limit and \
                self.condition.limit == i:
                 return
@@ -307,7 +321,10 @@ class Application(object):
         if callable(function):
             res = function(backend, *args, **kwargs)
         else:
-            res = getattr(backend, function)(*args, **kwargs)
+            method = getattr(backend, function)
+            if self.condition and getattr(method, 'accepts_conditions', False):
+                kwargs['conditions'] = self.condition.get_hints()
+            res = method(*args, **kwargs)
 
         if hasattr(res, '__iter__') and not isinstance(res, (bytes, unicode)):
             return self._do_complete_iter(backend, count, selected_fields, res)
@@ -36,7 +36,7 @@ from weboob.core.repositories import IProgress
 from weboob.exceptions import BrowserUnavailable, BrowserIncorrectPassword, BrowserForbidden, \
                               BrowserSSLError, BrowserQuestion, BrowserHTTPSDowngrade, \
                               ModuleInstallError, ModuleLoadError, NoAccountsException, \
-                              ActionNeeded, CaptchaQuestion
+                              ActionNeeded, CaptchaQuestion, CallTimeout
 from weboob.tools.value import Value, ValueBool, ValueFloat, ValueInt, ValueBackendPassword
 from weboob.tools.misc import to_unicode
 from weboob.tools.compat import unicode, long
@@ -603,6 +603,12 @@ class ConsoleApplication(Application):
         elif isinstance(error, BrowserUnavailable):
             msg = unicode(error)
             print(u'Error(%s): %s' % (backend.name, msg or 'Website is unavailable.'), file=self.stderr)
+        elif isinstance(error, CallTimeout):
+            if error.timeout is None:
+                msg = u'no answer before the deadline'
+            else:
+                msg = u'no answer within %g seconds' % error.timeout
+            print(u'Error(%s): %s, results of this backend may be incomplete.' % (backend.name, msg), file=self.stderr)
         elif isinstance(error, ActionNeeded):
             msg = unicode(error)
             print(u'Error(%s): Action needed on website: %s' % (backend.name, msg), file=self.stderr)
@@ -753,9 +753,10 @@ class ReplApplication(ConsoleApplication, MyCmd):
                     if not enabled:
                         self.enabled_backends.remove(newb)
         elif action == 'remove':
-            for backend in given_backends:
-                self.weboob.backends_config.remove_backend(backend.name)
-                self.unload_backends(backend.name)
+            with self.weboob.backends_config.batch():
+                for backend in given_backends:
+                    self.weboob.backends_config.remove_backend(backend.name)
+                    self.unload_backends(backend.name)
         elif action == 'list-modules':
             modules = []
             print('Modules list:')
@@ -17,7 +17,12 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
+import re
+from datetime import date, datetime, timedelta
+
 from weboob.capabilities import UserError
+from weboob.capabilities.base import BaseObject, _DELETED
+import weboob.tools.date as date_utils
 from weboob.tools.compat import unicode
 
 
@@ -38,6 +43,72 @@ class Condition(object):
         self.left = left  # Field of the object to test
         self.op = op
         self.right = right
+        self.function = functions[op]
+        # Right operand converted to the type of tested values.
+        self._typed = {}
+
+    def __eq__(self, other):
+        return isinstance(other, Condition) and \
+            (self.left, self.op, self.right) == (other.left, other.op, other.right)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.left, self.op, self.right))
+
+    def __repr__(self):
+        return '<Condition %s%s%s>' % (self.left, self.op, self.right)
+
+    def convert(self, value):
+        """
+        Convert the right operand, always given as a string by the
+        application, to the type of a value. It is done only once for each
+        type.
+
+        :returns: the converted operand, or _INVALID if it can't be converted
+        """
+        typed = type(value)
+        try:
+            return self._typed[typed]
+        except KeyError:
+            try:
+                tocompare = convert_operand(value, self.right)
+            except Exception:
+                tocompare = _INVALID
+            self._typed[typed] = tocompare
+            return tocompare
+
+    def evaluate(self, value):
+        tocompare = self.convert(value)
+        if tocompare is _INVALID:
+            return False
+
+        try:
+            return self.function(tocompare, value)
+        except Exception:
+            return False
+
+
+TIMEDELTA_RE = re.compile(r'^\s*((?P<hours>\d+)\s*h)?\s*((?P<minutes>\d+)\s*m)?\s*((?P<seconds>\d+)\s*s)?\s*$')
+
+_INVALID = object()
+
+
+def convert_operand(value, right):
+    if isinstance(value, date_utils.date):
+        return date(*[int(x) for x in right.split('-')])
+    elif isinstance(value, date_utils.datetime):
+        splitted_datetime = right.split(' ')
+        return datetime(*([int(x) for x in splitted_datetime[0].split('-')] +
+                          [int(x) for x in splitted_datetime[1].split(':')]))
+    elif isinstance(value, timedelta):
+        time_dict = TIMEDELTA_RE.match(right).groupdict()
+        return timedelta(seconds=int(time_dict['seconds'] or "0"),
+                         minutes=int(time_dict['minutes'] or "0"),
+                         hours=int(time_dict['hours'] or "0"))
+    else:
+        return type(value)(right)
 
 
 def is_egal(left, right):
@@ -97,55 +168,109 @@ class ResultsCondition(IResultsCondition):
             or_list.append(and_list)
         self.condition = or_list
         self.condition_str = condition_str
+        # Predicates by class of tested objects.
+        self._compiled = {}
 
-    def is_valid(self, obj):
-        import weboob.tools.date as date_utils
-        import re
-        from datetime import date, datetime, timedelta
-        d = obj.to_dict()
-        # We evaluate all member of a list at each iteration.
-        for _or in self.condition:
-            myeval = True
-            for condition in _or:
-                if condition.left in d:
+    def get_hints(self):
+        """
+        Get the conditions which are true for every valid object, to be given
+        as a hint to backends able to filter results by themselves.
+
+        :rtype: list[:class:`Condition`]
+        """
+        hints = []
+        for condition in self.condition[0]:
+            if all(condition in _and for _and in self.condition[1:]) and condition not in hints:
+                hints.append(condition)
+        return hints
+
+    def compile(self, klass):
+        """
+        Build a predicate testing objects of a class.
+
+        Fields are read directly in the values of objects, and right operands
+        are converted once for each type of values.
+        """
+        def overridden(name):
+            method = getattr(klass, name)
+            base = getattr(BaseObject, name)
+            return getattr(method, '__func__', method) is not getattr(base, '__func__', base)
+
+        if not isinstance(klass, type) or not issubclass(klass, BaseObject) or \
+           overridden('iter_fields') or overridden('to_dict'):
+            # Values are not the fields declared in the class, for example
+            # BaseCollection.to_dict() changes id and split_path.
+            return self._is_valid_dict
+
+        def field_getter(name):
+            # Return the value of a field, or _DELETED if it is missing.
+            if name == 'id':
+                def get_id(obj):
+                    if obj.id is None:
+                        return _DELETED
                     # in the case of id, test id@backend and id
+                    return obj.fullid if obj.backend is not None else obj.id
+                return get_id
+
+            if name not in klass._fields_index:
+                return lambda obj: _DELETED
+
+            index = klass._fields_index[name][0]
+            return lambda obj: obj._get_values()[index]
+
+        or_list = [[(condition, field_getter(condition.left)) for condition in _and] for _and in self.condition]
+
+        def is_valid(obj):
+            for _and in or_list:
+                for condition, getter in _and:
+                    value = getter(obj)
+                    if value is _DELETED:
+                        raise ResultsConditionError(u'Field "%s" is not valid.' % condition.left)
+
                     if condition.left == 'id':
-                        tocompare = condition.right
-                        evalfullid = functions[condition.op](tocompare, d['id'])
-                        evalid = functions[condition.op](tocompare, obj.id)
-                        myeval = evalfullid or evalid
+                        myeval = condition.function(condition.right, value) or \
+                            condition.function(condition.right, obj.id)
                     else:
-                        # We have to change the type of v, always gived as string by application
-                        typed = type(d[condition.left])
-                        try:
-                            if isinstance(d[condition.left], date_utils.date):
-                                tocompare = date(*[int(x) for x in condition.right.split('-')])
-                            elif isinstance(d[condition.left], date_utils.datetime):
-                                splitted_datetime = condition.right.split(' ')
-                                tocompare = datetime(*([int(x) for x in splitted_datetime[0].split('-')] +
-                                                       [int(x) for x in splitted_datetime[1].split(':')]))
-                            elif isinstance(d[condition.left], timedelta):
-                                time_dict = re.match('^\s*((?P<hours>\d+)\s*h)?\s*((?P<minutes>\d+)\s*m)?\s*((?P<seconds>\d+)\s*s)?\s*$',
-                                                     condition.right).groupdict()
-                                tocompare = timedelta(seconds=int(time_dict['seconds'] or "0"),
-                                                      minutes=int(time_dict['minutes'] or "0"),
-                                                      hours=int(time_dict['hours'] or "0"))
-                            else:
-                                tocompare = typed(condition.right)
-                            myeval = functions[condition.op](tocompare, d[condition.left])
-                        except:
-                            myeval = False
+                        myeval = condition.evaluate(value)
+
+                    # Do not try all AND conditions if one is false
+                    if not myeval:
+                        break
                 else:
+                    # Return True at the first OR valid condition
+                    return True
+            # If we are here, all OR conditions are False
+            return False
+
+        return is_valid
+
+    def _is_valid_dict(self, obj):
+        d = obj.to_dict()
+        for _and in self.condition:
+            for condition in _and:
+                if condition.left not in d:
                     raise ResultsConditionError(u'Field "%s" is not valid.' % condition.left)
-                # Do not try all AND conditions if one is false
+
+                if condition.left == 'id':
+                    myeval = condition.function(condition.right, d['id']) or \
+                        condition.function(condition.right, obj.id)
+                else:
+                    myeval = condition.evaluate(d[condition.left])
+
                 if not myeval:
                     break
-            # Return True at the first OR valid condition
-            if myeval:
+            else:
                 return True
-        # If we are here, all OR conditions are False
         return False
 
+    def is_valid(self, obj):
+        klass = type(obj)
+        try:
+            predicate = self._compiled[klass]
+        except KeyError:
+            predicate = self._compiled.setdefault(klass, self.compile(klass))
+        return predicate(obj)
+
     def __str__(self):
         return unicode(self).encode('utf-8')
 
@@ -18,13 +18,21 @@
 
 
 import os
-from threading import RLock
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition, Lock, RLock, local
 from copy import copy
 
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
 from weboob.capabilities.base import BaseObject, FieldNotFound, \
     Capability, NotLoaded, NotAvailable
 from weboob.tools.misc import iter_fields
 from weboob.tools.compat import basestring
+from weboob.tools.deadline import get_deadline, deadline_context
 from weboob.tools.log import getLogger
 from weboob.tools.value import ValuesDict
 from weboob.exceptions import ModuleInstallError
@@ -250,6 +258,21 @@ class Module(object):
     # When the method is called, fields are only the one which are
     # NOT yet filled.
     OBJECTS = {}
+    # If True, fillobjs() fills several objects at the same time, in
+    # threads. Only enable it if methods of OBJECTS can be called
+    # concurrently, for example if they do not rely on the browser state.
+    CONCURRENT_FILLOBJ = False
+    # Maximum number of objects filled at the same time by fillobjs().
+    FILLOBJS_WINDOW = 10
+    # Maximum number of browsers cloned from the main one, to run the
+    # methods of CONCURRENT_METHODS at the same time. 0 disables the pool,
+    # every call is then serialized by the backend lock.
+    BROWSERS_POOL_SIZE = 0
+    # Names of methods which can be called concurrently, each one with its
+    # own browser of the pool. Only list methods which do not change the
+    # state of the module or of the browser (login, navigation state) that
+    # other calls rely on.
+    CONCURRENT_METHODS = ()
 
     class ConfigError(Exception):
         """
@@ -270,6 +293,17 @@ class Module(object):
         self.weboob = weboob
         self.name = name
         self.lock = RLock()
+        # Browsers of the pool are given to threads through this object.
+        self._local = local()
+        self._pool = []
+        self._pool_count = 0
+        # Incremented by deinit(), browsers checked out before are then
+        # released instead of being put back in the pool.
+        self._pool_generation = 0
+        self._pool_cond = Condition()
+        # Threads used by fillobjs(), created on first use.
+        self._fillobjs_executor = None
+        self._fillobjs_lock = Lock()
         if config is None:
             config = {}
 
@@ -286,14 +320,30 @@ class Module(object):
         """
         This abstract method is called when the backend is unloaded.
         """
-        if self._browser is None:
+        with self._fillobjs_lock:
+            executor, self._fillobjs_executor = self._fillobjs_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+        with self._pool_cond:
+            pool, self._pool = self._pool, []
+            self._pool_count = 0
+            self._pool_generation += 1
+            self._pool_cond.notify_all()
+        for browser in pool:
+            if hasattr(browser, 'deinit'):
+                browser.deinit()
+
+        # Not self.browser, which is the pooled one in a pooled_browser() block.
+        browser = self._browser
+        if browser is None:
             return
 
-        if hasattr(self.browser, 'dump_state'):
-            self.storage.set('browser_state', self.browser.dump_state())
+        if hasattr(browser, 'dump_state'):
+            self.storage.set('browser_state', browser.dump_state())
             self.storage.save()
-        if hasattr(self.browser, 'deinit'):
-            self.browser.deinit()
+        if hasattr(browser, 'deinit'):
+            browser.deinit()
 
     _browser = None
 
@@ -304,7 +354,14 @@ class Module(object):
         of this attribute, to avoid useless pages access.
 
         Note that the :func:`create_default_browser` method is called to create it.
+
+        In a :func:`pooled_browser` block, this is the browser of the pool
+        given to the current thread.
         """
+        browser = getattr(self._local, 'browser', None)
+        if browser is not None:
+            return browser
+
         if self._browser is None:
             self._browser = self.create_default_browser()
         return self._browser
@@ -345,10 +402,115 @@ class Module(object):
         browser = klass(*args, **kwargs)
 
         if hasattr(browser, 'load_state'):
-            browser.load_state(self.storage.get('browser_state', default={}))
+            state = getattr(self._local, 'clone_state', None)
+            if state is None:
+                state = self.storage.get('browser_state', default={})
+            browser.load_state(state)
 
         return browser
 
+    def clone_browser(self):
+        """
+        Build a new browser with the state of the main one (cookies and
+        ``__states__``), for browsers which support
+        :func:`weboob.browser.browsers.StatesMixin.dump_state`.
+
+        Others are built with :func:`create_default_browser`, with the state
+        saved in storage.
+        """
+        with self:
+            browser = self.browser
+            state = browser.dump_state() if hasattr(browser, 'dump_state') else None
+
+        self._local.clone_state = state
+        try:
+            return self.create_default_browser()
+        finally:
+            self._local.clone_state = None
+
+    @contextmanager
+    def pooled_browser(self):
+        """
+        Context manager to run a block with a browser of the pool as
+        :attr:`browser`, without holding the backend lock.
+
+        Browsers are cloned on demand with :func:`clone_browser`, up to
+        :attr:`BROWSERS_POOL_SIZE`, and reused by later blocks. When they are
+        all in use, this waits for one to be released.
+        """
+        browser = getattr(self._local, 'browser', None)
+        if browser is not None:
+            # Nested block in the same thread.
+            yield browser
+            return
+
+        browser, generation = self._acquire_pooled_browser()
+        self._local.browser = browser
+        try:
+            yield browser
+        finally:
+            self._local.browser = None
+            self._release_pooled_browser(browser, generation)
+
+    def _acquire_pooled_browser(self):
+        browser = None
+        with self._pool_cond:
+            while not self._pool and self._pool_count >= self.BROWSERS_POOL_SIZE:
+                self._pool_cond.wait()
+            generation = self._pool_generation
+            if self._pool:
+                browser = self._pool.pop()
+            else:
+                self._pool_count += 1
+
+        if browser is None:
+            try:
+                browser = self.clone_browser()
+            except BaseException:
+                with self._pool_cond:
+                    if generation == self._pool_generation:
+                        self._pool_count -= 1
+                        self._pool_cond.notify()
+                raise
+        return browser, generation
+
+    def _release_pooled_browser(self, browser, generation):
+        with self._pool_cond:
+            released = generation == self._pool_generation
+            if released:
+                self._pool.append(browser)
+                self._pool_cond.notify()
+        if not released and hasattr(browser, 'deinit'):
+            # The pool has been deinitialized meanwhile.
+            browser.deinit()
+
+    def call_context(self, method):
+        """
+        Get the context manager to use to call a method of the backend.
+
+        :param method: name of the method, or None for any other callable
+        :type method: :class:`str`
+        :returns: :func:`pooled_browser` if the method is in
+                  :attr:`CONCURRENT_METHODS` and the pool is enabled, else
+                  the backend itself, which holds its lock
+        """
+        if self.BROWSERS_POOL_SIZE > 0 and method in self.CONCURRENT_METHODS:
+            return self.pooled_browser()
+        return self
+
+    def max_concurrent_calls(self, method):
+        """
+        Get the maximum number of calls of a method which can run at the same
+        time on the backend.
+
+        :param method: name of the method
+        :type method: :class:`str`
+        :rtype: :class:`int`
+        """
+        if self.BROWSERS_POOL_SIZE > 0 and method in self.CONCURRENT_METHODS:
+            return self.BROWSERS_POOL_SIZE
+        return 1
+
     def get_proxy(self):
         tmpproxy = None
         tmpproxys = None
@@ -464,6 +626,84 @@ class Module(object):
 
         return obj
 
+    def fillobjs(self, objs, fields=None):
+        """
+        Fill several objects with the wanted fields.
+
+        Objects are yielded in the same order, once filled. Objects which
+        are not :class:`weboob.capabilities.base.BaseObject` are yielded as
+        is.
+
+        By default, objects are filled one by one with :meth:`fillobj`, or
+        :attr:`FILLOBJS_WINDOW` at a time if :attr:`CONCURRENT_FILLOBJ` is
+        True, each one with its own browser of the pool if
+        :attr:`BROWSERS_POOL_SIZE` is set. Modules which can fill several
+        objects at once can override it.
+
+        :param objs: objects to fill
+        :type objs: iter[:class:`weboob.capabilities.base.BaseObject`]
+        :param fields: what fields to fill; if None, all fields are filled
+        :type fields: :class:`list`
+        :rtype: iter[:class:`weboob.capabilities.base.BaseObject`]
+        """
+        def fill(obj):
+            if not isinstance(obj, BaseObject):
+                return obj
+            return self.fillobj(obj, fields) or obj
+
+        if not self.CONCURRENT_FILLOBJ or ThreadPoolExecutor is None or self.FILLOBJS_WINDOW < 2:
+            for obj in objs:
+                yield fill(obj)
+            return
+
+        # A thread already using a browser of the pool would wait for itself
+        # if the pool is full.
+        use_pool = self.BROWSERS_POOL_SIZE > 0 and getattr(self._local, 'browser', None) is None
+        if self.BROWSERS_POOL_SIZE > 0 and not use_pool:
+            for obj in objs:
+                yield fill(obj)
+            return
+
+        # Threads have to respect the deadline of the current call.
+        deadline = get_deadline()
+
+        def fill_in_thread(obj, browser):
+            with deadline_context(deadline):
+                self._local.browser = browser
+                try:
+                    return fill(obj)
+                finally:
+                    self._local.browser = None
+
+        with self._fillobjs_lock:
+            if self._fillobjs_executor is None:
+                self._fillobjs_executor = ThreadPoolExecutor(max_workers=self.FILLOBJS_WINDOW)
+            executor = self._fillobjs_executor
+
+        pending = deque()
+        try:
+            for obj in objs:
+                browser = None
+                if use_pool and isinstance(obj, BaseObject):
+                    # Browsers are taken in this thread, which may hold the
+                    # backend lock needed by clone_browser().
+                    browser, generation = self._acquire_pooled_browser()
+                future = executor.submit(fill_in_thread, obj, browser)
+                if browser is not None:
+                    # Also called if the future is cancelled.
+                    future.add_done_callback(lambda f, browser=browser, generation=generation:
+                                             self._release_pooled_browser(browser, generation))
+                pending.append(future)
+                if len(pending) >= self.FILLOBJS_WINDOW:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # The consumer may stop before the end.
+            for future in pending:
+                future.cancel()
+
 
 class AbstractModuleMissingParentError(Exception):
     pass
@@ -17,13 +17,22 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
-from collections import OrderedDict
+from collections import deque
 from decimal import Decimal, InvalidOperation
+from threading import Condition, Thread
 import datetime
+import heapq
 import re
+import sys
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
 
 from weboob.capabilities.bank import Transaction, Account
 from weboob.capabilities import NotAvailable, NotLoaded
+from weboob.tools.deadline import Deadline, get_deadline, deadline_context
 from weboob.tools.misc import to_unicode
 from weboob.tools.log import getLogger
 from weboob.tools.date import new_datetime
@@ -45,6 +54,172 @@ class classproperty(object):
         return self.f(owner)
 
 
+class PatternsMatcher(object):
+    """
+    Find the first regexp of a list of (regexp, value) which matches a
+    string, as if they were tried in order with ``regexp.match()``.
+
+    Regexps are dispatched on the first character of the literal prefix
+    they start with, and the candidates for a string are tried at once in
+    a regexp combining them in an alternation, which keeps the order of
+    the list.
+
+    >>> matcher = PatternsMatcher([(re.compile(r'^VIR(EMENT)? (?P<text>.*)'), 'transfer'),
+    ...                            (re.compile(r'^PRLV (?P<text>.*)'), 'order'),
+    ...                            (re.compile(r'^(?P<text>.*) CB$'), 'card')])
+    >>> matcher.match(u'VIREMENT LOYER') == ('transfer', {'text': u'LOYER'})
+    True
+    >>> matcher.match(u'PRLV FREE CB') == ('order', {'text': u'FREE CB'})
+    True
+    >>> matcher.match(u'CARREFOUR CB') == ('card', {'text': u'CARREFOUR'})
+    True
+    >>> matcher.match(u'CHEQUE')
+    (None, None)
+    """
+
+    # Sources which can not be embedded in a larger regexp: numbered or
+    # conditional backreferences, and inline global flags (as well as
+    # verbose regexps).
+    UNSAFE_RE = re.compile(r'\\[1-9]|\(\?\(|\(\?[aiLmsux]+\)')
+    GROUP_NAME_RE = re.compile(r'\\.|\(\?P([<=])(\w+)')
+
+    def __init__(self, patterns):
+        self.source = patterns
+        self.patterns = list(patterns)
+
+        self.prefixed = {}
+        self.unprefixed = []
+        for index, (pattern, _type) in enumerate(self.patterns):
+            prefix = self.literal_prefix(pattern)
+            if prefix:
+                self.prefixed.setdefault(prefix[0], []).append(index)
+            else:
+                self.unprefixed.append(index)
+
+        self.dispatch = {}
+
+    def built_from(self, patterns):
+        return patterns is self.source and len(patterns) == len(self.patterns)
+
+    @staticmethod
+    def literal_prefix(pattern):
+        """
+        Get the literal text any string matched by the regexp starts with.
+        """
+        if pattern.flags & (re.IGNORECASE | re.LOCALE):
+            return u''
+
+        try:
+            tokens = sre_parse.parse(pattern.pattern, pattern.flags)
+        except Exception:
+            return u''
+
+        prefix = []
+        PatternsMatcher._walk_prefix(tokens, prefix)
+        return u''.join(prefix)
+
+    @staticmethod
+    def _walk_prefix(tokens, prefix):
+        # Return True if all the tokens are literals, and have been added
+        # to the prefix.
+        for op, av in tokens:
+            if op == sre_parse.AT and av == sre_parse.AT_BEGINNING and not prefix:
+                continue
+            if op == sre_parse.LITERAL:
+                prefix.append(u'%c' % av)
+                continue
+            # Groups are (group, [add_flags, del_flags,] tokens).
+            if op == sre_parse.SUBPATTERN and (len(av) == 2 or not (av[1] or av[2])):
+                if PatternsMatcher._walk_prefix(av[-1], prefix):
+                    continue
+            return False
+        return True
+
+    def combine(self, first):
+        """
+        Build the list of regexps to try for strings starting with a
+        character: runs of candidates which can be embedded are combined,
+        and the others are kept as is.
+        """
+        indexes = sorted(self.prefixed.get(first, []) + self.unprefixed)
+
+        runs = []
+        for index in indexes:
+            pattern = self.patterns[index][0]
+            if pattern.flags & re.VERBOSE or self.UNSAFE_RE.search(pattern.pattern):
+                runs.append((None, [index]))
+            elif runs and runs[-1][0] == pattern.flags:
+                runs[-1][1].append(index)
+            else:
+                runs.append((pattern.flags, [index]))
+
+        regexps = []
+        for flags, run in runs:
+            combined = None
+            if len(run) > 1:
+                combined = self.compile_run(run, flags)
+            if combined is None:
+                regexps.extend((self.patterns[index][0], index, None) for index in run)
+            else:
+                regexps.append(combined)
+        return regexps
+
+    def compile_run(self, run, flags):
+        sources = []
+        for index in run:
+            source = self.GROUP_NAME_RE.sub(lambda m: m.group(0) if not m.group(1) else
+                                            '(?P%s_%d_%s' % (m.group(1), index, m.group(2)),
+                                            self.patterns[index][0].pattern)
+            if source.startswith('^'):
+                # Keep the fast check of literals done on each branch of
+                # the alternation.
+                source = source[1:]
+            # The empty group closes last, so it is the lastgroup of a match.
+            sources.append('(?:%s)(?P<_%d>)' % (source, index))
+
+        try:
+            combined = re.compile('|'.join(sources), flags)
+        except (re.error, TypeError, OverflowError, AssertionError):
+            return None
+
+        # Make sure the renaming has not been fooled by the syntax.
+        groups = {}
+        for index in run:
+            names = self.patterns[index][0].groupindex
+            groups['_%d' % index] = (index, [(name, combined.groupindex.get('_%d_%s' % (index, name)))
+                                             for name in names])
+        if len(combined.groupindex) != len(groups) + sum(len(names) for index, names in groups.values()) or \
+           any(number is None for index, names in groups.values() for name, number in names):
+            return None
+        return combined, None, groups
+
+    def match(self, text):
+        """
+        Get the value associated to the first regexp matching the text, and
+        the named groups of the match.
+
+        :rtype: tuple(object, dict)
+        """
+        first = text[:1]
+        try:
+            regexps = self.dispatch[first]
+        except KeyError:
+            regexps = self.dispatch.setdefault(first, self.combine(first))
+
+        for regexp, index, groups in regexps:
+            m = regexp.match(text)
+            if not m:
+                continue
+
+            if groups is None:
+                return self.patterns[index][1], m.groupdict()
+
+            index, names = groups[m.lastgroup]
+            return self.patterns[index][1], dict((name, m.group(number)) for name, number in names)
+
+        return None, None
+
+
 class FrenchTransaction(Transaction):
     """
     Transaction with some helpers for french bank websites.
@@ -55,6 +230,17 @@ class FrenchTransaction(Transaction):
         super(FrenchTransaction, self).__init__(id, *args, **kwargs)
         self._logger = getLogger('FrenchTransaction')
 
+    @classmethod
+    def get_patterns_matcher(klass):
+        """
+        Get the :class:`PatternsMatcher` of PATTERNS, built once per class.
+        """
+        matcher = klass.__dict__.get('_patterns_matcher')
+        if matcher is None or not matcher.built_from(klass.PATTERNS):
+            matcher = PatternsMatcher(klass.PATTERNS)
+            klass._patterns_matcher = matcher
+        return matcher
+
     @classmethod
     def clean_amount(klass, text):
         """
@@ -130,56 +316,51 @@ class FrenchTransaction(Transaction):
         else:
             self.label = self.raw
 
-        for pattern, _type in self.PATTERNS:
-            m = pattern.match(self.raw)
-            if m:
-                args = m.groupdict()
-
-                def inargs(key):
-                    """
-                    inner function to check if a key is in args,
-                    and is not None.
-                    """
-                    return args.get(key, None) is not None
-
-                self.type = _type
-                labels = [args[name].strip() for name in ('text', 'text2') if inargs(name)]
-                if labels:
-                    self.label = ' '.join(labels)
-
-                if inargs('category'):
-                    self.category = args['category'].strip()
-
-                # Set date from information in raw label.
-                if inargs('dd') and inargs('mm'):
-                    dd = int(args['dd'])
-                    mm = int(args['mm'])
-
-                    if inargs('yy'):
-                        yy = int(args['yy'])
-                    else:
-                        d = self.date
-                        try:
-                            d = d.replace(month=mm, day=dd)
-                        except ValueError:
-                            d = d.replace(year=d.year-1, month=mm, day=dd)
-
-                        yy = d.year
-                        if d > self.date:
-                            yy -= 1
+        _type, args = self.get_patterns_matcher().match(self.raw)
+        if args is not None:
+            def inargs(key):
+                """
+                inner function to check if a key is in args,
+                and is not None.
+                """
+                return args.get(key, None) is not None
+
+            self.type = _type
+            labels = [args[name].strip() for name in ('text', 'text2') if inargs(name)]
+            if labels:
+                self.label = ' '.join(labels)
+
+            if inargs('category'):
+                self.category = args['category'].strip()
+
+            # Set date from information in raw label.
+            if inargs('dd') and inargs('mm'):
+                dd = int(args['dd'])
+                mm = int(args['mm'])
+
+                if inargs('yy'):
+                    yy = int(args['yy'])
+                else:
+                    d = self.date
+                    try:
+                        d = d.replace(month=mm, day=dd)
+                    except ValueError:
+                        d = d.replace(year=d.year-1, month=mm, day=dd)
 
-                    if yy < 100:
-                        yy += 2000
+                    yy = d.year
+                    if d > self.date:
+                        yy -= 1
 
-                    try:
-                        if inargs('HH') and inargs('MM'):
-                            self.rdate = datetime.datetime(yy, mm, dd, int(args['HH']), int(args['MM']))
-                        else:
-                            self.rdate = datetime.date(yy, mm, dd)
-                    except ValueError as e:
-                        self._logger.warning('Unable to date in label %r: %s' % (self.raw, e))
+                if yy < 100:
+                    yy += 2000
 
-                return
+                try:
+                    if inargs('HH') and inargs('MM'):
+                        self.rdate = datetime.datetime(yy, mm, dd, int(args['HH']), int(args['MM']))
+                    else:
+                        self.rdate = datetime.date(yy, mm, dd)
+                except ValueError as e:
+                    self._logger.warning('Unable to date in label %r: %s' % (self.raw, e))
 
     @classproperty
     def TransactionElement(k):
@@ -229,7 +410,7 @@ class FrenchTransaction(Transaction):
 
     @classmethod
     def Raw(klass, *args, **kwargs):
-        patterns = klass.PATTERNS
+        matcher = klass.get_patterns_matcher()
 
         class Filter(CleanText):
             def __call__(self, item):
@@ -242,56 +423,51 @@ class FrenchTransaction(Transaction):
                 else:
                     item.obj.label = raw
 
-                for pattern, _type in patterns:
-                    m = pattern.match(raw)
-                    if m:
-                        args = m.groupdict()
-
-                        def inargs(key):
-                            """
-                            inner function to check if a key is in args,
-                            and is not None.
-                            """
-                            return args.get(key, None) is not None
-
-                        item.obj.type = _type
-                        labels = [args[name].strip() for name in ('text', 'text2') if inargs(name)]
-                        if labels:
-                            item.obj.label = ' '.join(labels)
-
-                        if inargs('category'):
-                            item.obj.category = args['category'].strip()
-
-                        # Set date from information in raw label.
-                        if inargs('dd') and inargs('mm'):
-                            dd = int(args['dd']) if args['dd'] != '00' else 1
-                            mm = int(args['mm'])
-
-                            if inargs('yy'):
-                                yy = int(args['yy'])
-                            else:
-                                d = item.obj.date
-                                try:
-                                    d = d.replace(month=mm, day=dd)
-                                except ValueError:
-                                    d = d.replace(year=d.year-1, month=mm, day=dd)
-
-                                yy = d.year
-                                if d > item.obj.date:
-                                    yy -= 1
+                _type, args = matcher.match(raw)
+                if args is not None:
+                    def inargs(key):
+                        """
+                        inner function to check if a key is in args,
+                        and is not None.
+                        """
+                        return args.get(key, None) is not None
+
+                    item.obj.type = _type
+                    labels = [args[name].strip() for name in ('text', 'text2') if inargs(name)]
+                    if labels:
+                        item.obj.label = ' '.join(labels)
+
+                    if inargs('category'):
+                        item.obj.category = args['category'].strip()
+
+                    # Set date from information in raw label.
+                    if inargs('dd') and inargs('mm'):
+                        dd = int(args['dd']) if args['dd'] != '00' else 1
+                        mm = int(args['mm'])
+
+                        if inargs('yy'):
+                            yy = int(args['yy'])
+                        else:
+                            d = item.obj.date
+                            try:
+                                d = d.replace(month=mm, day=dd)
+                            except ValueError:
+                                d = d.replace(year=d.year-1, month=mm, day=dd)
 
-                            if yy < 100:
-                                yy += 2000
+                            yy = d.year
+                            if d > item.obj.date:
+                                yy -= 1
 
-                            try:
-                                if inargs('HH') and inargs('MM'):
-                                    item.obj.rdate = datetime.datetime(yy, mm, dd, int(args['HH']), int(args['MM']))
-                                else:
-                                    item.obj.rdate = datetime.date(yy, mm, dd)
-                            except ValueError as e:
-                                raise ParseError('Unable to parse date in label %r: %s' % (raw, e))
+                        if yy < 100:
+                            yy += 2000
 
-                        break
+                        try:
+                            if inargs('HH') and inargs('MM'):
+                                item.obj.rdate = datetime.datetime(yy, mm, dd, int(args['HH']), int(args['MM']))
+                            else:
+                                item.obj.rdate = datetime.date(yy, mm, dd)
+                        except ValueError as e:
+                            raise ParseError('Unable to parse date in label %r: %s' % (raw, e))
 
                 return raw
 
@@ -355,30 +531,137 @@ def sorted_transactions(iterable):
     return sorted(iterable, reverse=True, key=lambda tr: (tr.date, new_datetime(tr.rdate) if tr.rdate else datetime.datetime.min))
 
 
-def merge_iterators(*iterables):
-    """Merge transactions iterators keeping sort order.
-
-    Each iterator must already be sorted in reverse chronological order.
+class _MergedIterator(object):
     """
+    Head of an iterator in the heap of :func:`merge_iterators`.
+    """
+    __slots__ = ('key', 'index', 'value', 'iterator')
 
-    def keyfunc(kv):
-        return (kv[1].date, kv[1].rdate)
+    def __init__(self, index, iterator):
+        self.index = index
+        self.iterator = iterator
 
-    its = OrderedDict((iter(it), None) for it in iterables)
-    for k in list(its):
-        try:
-            its[k] = next(k)
-        except StopIteration:
-            del its[k]
+    def advance(self):
+        self.value = next(self.iterator)
+        self.key = (self.value.date, self.value.rdate)
 
-    while its:
-        k, v = max(its.items(), key=keyfunc)
-        yield v
+    def __lt__(self, other):
+        # Most recent first, and on equality, the first given iterator.
+        if self.key == other.key:
+            return self.index < other.index
+        return self.key > other.key
+
+
+class _BufferedIterator(object):
+    """
+    Drain an iterator in its own thread, keeping at most `size` items
+    waiting to be consumed. The thread respects the deadline of the call
+    which created it.
+    """
 
+    def __init__(self, iterable, size):
+        self.iterator = iter(iterable)
+        self.size = size
+        self.deadline = get_deadline()
+        self.items = deque()
+        self.cond = Condition()
+        self.done = False
+        self.closed = False
+        self.exc_info = None
+
+        self.thread = Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
         try:
-            its[k] = next(k)
-        except StopIteration:
-            del its[k]
+            with deadline_context(self.deadline):
+                for item in self.iterator:
+                    with self.cond:
+                        while len(self.items) >= self.size and not self.closed:
+                            self.cond.wait()
+                        if self.closed:
+                            return
+                        self.items.append(item)
+                        self.cond.notify_all()
+        except Exception:
+            self.exc_info = sys.exc_info()
+        finally:
+            with self.cond:
+                self.done = True
+                self.cond.notify_all()
+
+    def __iter__(self):
+        while True:
+            with self.cond:
+                while not self.items and not self.done:
+                    self.cond.wait()
+
+                if not self.items:
+                    break
+                item = self.items.popleft()
+                self.cond.notify_all()
+            yield item
+
+        if self.exc_info is not None:
+            exc_info, self.exc_info = self.exc_info, None
+            raise exc_info[1]
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+def merge_iterators(*iterables, **kwargs):
+    """Merge transactions iterators keeping sort order.
+
+    Each iterator must already be sorted in reverse chronological order.
+
+    :param queue_size: if not 0, each iterator is drained in its own thread,
+                       with at most this number of transactions waiting to
+                       be merged, so slow iterators are fetched concurrently.
+                       Iterators then must not share a browser: use a
+                       different browser for each one, for example with
+                       :meth:`weboob.tools.backend.Module.pooled_browser`
+                       inside each iterator
+    :type queue_size: :class:`int`
+    """
+    queue_size = kwargs.pop('queue_size', 0)
+    assert not kwargs, 'unexpected arguments: %s' % ', '.join(kwargs)
+
+    if queue_size:
+        buffers = [_BufferedIterator(it, queue_size) for it in iterables]
+        its = [iter(buf) for buf in buffers]
+    else:
+        its = [iter(it) for it in iterables]
+
+    try:
+        heap = []
+        for index, it in enumerate(its):
+            head = _MergedIterator(index, it)
+            try:
+                head.advance()
+            except StopIteration:
+                continue
+            heap.append(head)
+        heapq.heapify(heap)
+
+        while heap:
+            head = heap[0]
+            yield head.value
+
+            try:
+                head.advance()
+            except StopIteration:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, head)
+    finally:
+        if queue_size:
+            for buf in buffers:
+                buf.close()
+
 
 def test():
     clean_amount = AmericanTransaction.clean_amount
@@ -392,3 +675,54 @@ def test():
     decimal_amount = AmericanTransaction.decimal_amount
     assert decimal_amount('$12,442.12 USD') == Decimal('12442.12')
     assert decimal_amount('') == Decimal('0')
+
+
+def test_merge_iterators():
+    def transactions(name, days):
+        for day in days:
+            tr = Transaction()
+            tr.date = tr.rdate = datetime.date(2018, 3, day)
+            tr.label = name
+            yield tr
+
+    def merged(**kwargs):
+        return [(tr.date.day, tr.label) for tr in merge_iterators(transactions('a', [20, 10, 5]),
+                                                                    transactions('b', []),
+                                                                    transactions('c', [21, 10, 10, 1]),
+                                                                    **kwargs)]
+
+    expected = [(21, 'c'), (20, 'a'), (10, 'a'), (10, 'c'), (10, 'c'), (5, 'a'), (1, 'c')]
+    assert merged() == expected
+    assert merged(queue_size=1) == expected
+
+
+def test_merge_iterators_error():
+    def failing():
+        tr = Transaction()
+        tr.date = tr.rdate = datetime.date(2018, 3, 1)
+        yield tr
+        raise ValueError('fetch error')
+
+    it = merge_iterators(failing(), queue_size=2)
+    assert next(it).date == datetime.date(2018, 3, 1)
+    try:
+        next(it)
+    except ValueError as e:
+        assert str(e) == 'fetch error'
+    else:
+        assert False, 'error has not been raised'
+
+
+def test_merge_iterators_deadline():
+    deadlines = []
+
+    def transactions():
+        deadlines.append(get_deadline())
+        tr = Transaction()
+        tr.date = tr.rdate = datetime.date(2018, 3, 1)
+        yield tr
+
+    deadline = Deadline(60)
+    with deadline_context(deadline):
+        assert len(list(merge_iterators(transactions(), transactions(), queue_size=1))) == 2
+    assert deadlines == [deadline, deadline]
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from contextlib import contextmanager
+from threading import Event, local
+import time
+
+from weboob.exceptions import CallCancelled, CallTimeout
+
+__all__ = ['Deadline', 'get_deadline', 'deadline_context']
+
+
+class Deadline(object):
+    """
+    Time limit of an operation, which can also be cancelled before it is
+    reached.
+
+    :param timeout: number of seconds before expiration, or None for no limit
+    :type timeout: :class:`float`
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self.expires = None if timeout is None else time.time() + timeout
+        self.cancelled = Event()
+
+    def remaining(self):
+        """
+        Get the number of seconds before expiration, or None if there is no
+        limit.
+        """
+        if self.expires is None:
+            return None
+        return max(0, self.expires - time.time())
+
+    def is_expired(self):
+        return self.expires is not None and time.time() >= self.expires
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def check(self):
+        """
+        Raise an exception if the deadline is reached or cancelled.
+
+        :raises: :class:`weboob.exceptions.CallTimeout`,
+                 :class:`weboob.exceptions.CallCancelled`
+        """
+        if self.is_expired():
+            raise CallTimeout('Deadline reached', self.timeout)
+        if self.cancelled.is_set():
+            raise CallCancelled('Call has been stopped')
+
+
+_local = local()
+
+
+def get_deadline():
+    """
+    Get the deadline of the operation running in the current thread.
+
+    :rtype: :class:`Deadline` or None
+    """
+    return getattr(_local, 'deadline', None)
+
+
+@contextmanager
+def deadline_context(deadline):
+    """
+    Set the deadline of the operation running in the current thread.
+    """
+    previous = get_deadline()
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = previous
@@ -17,10 +17,22 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
-
+from contextlib import contextmanager
 from copy import deepcopy
+import os
+import shutil
+import tempfile
+
+import yaml
+
+from .compat import quote, unquote
+from .config.yamlconfig import YamlConfig, Loader, WeboobDumper
 
-from .config.yamlconfig import YamlConfig
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows.
+    fcntl = None
 
 
 class IStorage(object):
@@ -61,11 +73,8 @@ class StandardStorage(IStorage):
         self.config.load()
 
     def load(self, what, name, default={}):
-        d = {}
-        if what not in self.config.values:
-            self.config.values[what] = {}
-        else:
-            d = self.config.values[what].get(name, {})
+        # setdefault() is atomic, backends may be loaded concurrently.
+        d = self.config.values.setdefault(what, {}).get(name, {})
 
         self.config.values[what][name] = deepcopy(default)
         self.config.values[what][name].update(d)
@@ -81,3 +90,143 @@ class StandardStorage(IStorage):
 
     def get(self, what, name, *args, **kwargs):
         return self.config.get(what, name, *args, **kwargs)
+
+
+@contextmanager
+def locked(path, exclusive=False):
+    """
+    Hold a lock on a file, shared by readers, or exclusive for a writer.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    with open(path, 'a') as fd:
+        fcntl.flock(fd.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd.fileno(), fcntl.LOCK_UN)
+
+
+class ShardedStorage(IStorage):
+    """
+    Storage writing data of each backend (or application) in its own YAML
+    file, in the ``<path>.d`` directory.
+
+    Files are read only when the backend is used, and saving a backend
+    only writes its file, if data have changed. Files are locked while
+    they are read or written, so several processes can share the storage.
+
+    If a :class:`StandardStorage` file exists at `path`, it is split in
+    files the first time, and is then left untouched.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.dirname = path + '.d'
+        self.config = YamlConfig(None)
+        # Data of the (what, name) files, as last read or written.
+        self.dumps = {}
+
+        if not os.path.isdir(self.dirname):
+            with locked(self.dirname + '.lock', exclusive=True):
+                if not os.path.isdir(self.dirname):
+                    self.migrate()
+
+    def migrate(self):
+        values = {}
+        if os.path.isfile(self.path):
+            with open(self.path, 'r') as f:
+                values = yaml.load(f, Loader=Loader) or {}
+
+        # Files are written in a temporary directory, renamed once they are
+        # all written.
+        dirname = self.dirname
+        tmpdirname = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(dirname)))
+        self.dirname = tmpdirname
+        try:
+            for what, names in values.items():
+                for name, data in (names or {}).items():
+                    self.config.values.setdefault(what, {})[name] = data
+                    self.dumps[(what, name)] = None
+                    self.save(what, name)
+            os.rename(tmpdirname, dirname)
+        except Exception:
+            shutil.rmtree(tmpdirname, ignore_errors=True)
+            raise
+        finally:
+            self.dirname = dirname
+
+    def get_filename(self, what, name):
+        return os.path.join(self.dirname, '%s.%s.yaml' % (quote(what, safe=''), quote(name, safe='')))
+
+    def list_names(self, what):
+        """
+        Get names of stored backends (or applications), without loading them.
+        """
+        prefix = '%s.' % quote(what, safe='')
+        for filename in sorted(os.listdir(self.dirname)):
+            if filename.startswith(prefix) and filename.endswith('.yaml'):
+                yield unquote(filename[len(prefix):-len('.yaml')])
+
+    def _ensure_loaded(self, what, name):
+        if (what, name) in self.dumps:
+            return
+
+        filename = self.get_filename(what, name)
+        dump = None
+        if os.path.exists(filename):
+            with locked(filename + '.lock'):
+                with open(filename, 'r') as f:
+                    dump = f.read()
+
+        self.dumps[(what, name)] = dump
+        if dump is not None:
+            self.config.values.setdefault(what, {})[name] = yaml.load(dump, Loader=Loader)
+
+    def load(self, what, name, default={}):
+        self._ensure_loaded(what, name)
+
+        # setdefault() is atomic, backends may be loaded concurrently.
+        d = self.config.values.setdefault(what, {}).get(name, {})
+
+        self.config.values[what][name] = deepcopy(default)
+        self.config.values[what][name].update(d)
+
+    def save(self, what, name):
+        self._ensure_loaded(what, name)
+
+        filename = self.get_filename(what, name)
+        if name in self.config.values.get(what, {}):
+            dump = yaml.dump(self.config.values[what][name], Dumper=WeboobDumper, default_flow_style=False)
+        else:
+            dump = None
+
+        if dump == self.dumps[(what, name)]:
+            return
+
+        with locked(filename + '.lock', exclusive=True):
+            if dump is None:
+                os.remove(filename)
+            else:
+                # write in a temporary file to avoid corruption problems
+                fd, tmpname = tempfile.mkstemp(dir=self.dirname, suffix='.tmp')
+                with os.fdopen(fd, 'w') as f:
+                    f.write(dump)
+                if os.name == 'nt' and os.path.exists(filename):
+                    os.remove(filename)
+                os.rename(tmpname, filename)
+        self.dumps[(what, name)] = dump
+
+    def set(self, what, name, *args):
+        self._ensure_loaded(what, name)
+        self.config.set(what, name, *args)
+
+    def delete(self, what, name, *args):
+        self._ensure_loaded(what, name)
+        self.config.delete(what, name, *args)
+
+    def get(self, what, name, *args, **kwargs):
+        self._ensure_loaded(what, name)
+        return self.config.get(what, name, *args, **kwargs)
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from threading import Event, Lock, Thread
+import time
+from unittest import TestCase
+
+from weboob.capabilities.base import BaseObject, StringField, NotAvailable
+from weboob.core.bcall import BackendsCall, CallErrors, CallExecutor
+from weboob.core.ouiboube import WebNip
+from weboob.tools.backend import Module
+from weboob.tools.deadline import Deadline, deadline_context, get_deadline
+
+
+class Ad(BaseObject):
+    title = StringField('Title')
+    description = StringField('Description')
+
+
+def fill_ad(module, ad, fields):
+    with module.counter_lock:
+        module.running += 1
+        module.max_running = max(module.running, module.max_running)
+    module.deadlines.append(get_deadline())
+    # Fill objects slower at the beginning, to check order is kept.
+    time.sleep(0.05 / (int(ad.id) + 1))
+    if 'description' in fields:
+        ad.description = u'Description of %s' % ad.id
+    with module.counter_lock:
+        module.running -= 1
+    return ad
+
+
+class MyModule(Module):
+    NAME = 'mymodule'
+    OBJECTS = {Ad: fill_ad}
+
+    def __init__(self, *args, **kwargs):
+        super(MyModule, self).__init__(*args, **kwargs)
+        self.counter_lock = Lock()
+        self.running = 0
+        self.max_running = 0
+        self.deadlines = []
+
+
+class MyConcurrentModule(MyModule):
+    CONCURRENT_FILLOBJ = True
+    FILLOBJS_WINDOW = 4
+
+
+class FillObjsTest(TestCase):
+    def iter_ads(self):
+        for i in range(10):
+            yield Ad(str(i))
+        yield None
+
+    def test_sequential(self):
+        module = MyModule(None, 'mymodule')
+        objs = list(module.fillobjs(self.iter_ads(), ['description']))
+        self.assertEqual([obj.id for obj in objs[:-1]], [str(i) for i in range(10)])
+        self.assertEqual(objs[0].description, u'Description of 0')
+        self.assertIsNone(objs[-1])
+        self.assertEqual(module.max_running, 1)
+
+    def test_concurrent(self):
+        module = MyConcurrentModule(None, 'mymodule')
+        deadline = Deadline(60)
+        with deadline_context(deadline):
+            objs = list(module.fillobjs(self.iter_ads(), ['description', 'title']))
+        self.assertEqual([obj.id for obj in objs[:-1]], [str(i) for i in range(10)])
+        self.assertEqual([obj.description for obj in objs[:-1]], [u'Description of %d' % i for i in range(10)])
+        self.assertIs(objs[0].title, NotAvailable)
+        self.assertGreater(module.max_running, 1)
+        self.assertLessEqual(module.max_running, 4)
+        self.assertEqual(set(module.deadlines), set([deadline]))
+
+    def test_lookahead(self):
+        module = MyConcurrentModule(None, 'mymodule')
+        consumed = []
+
+        def iter_ads():
+            for i in range(100):
+                consumed.append(i)
+                yield Ad(str(i))
+
+        it = module.fillobjs(iter_ads(), ['description'])
+        self.assertEqual(next(it).id, '0')
+        it.close()
+        self.assertEqual(len(consumed), 4)
+
+
+class StatefulBrowser(object):
+    def __init__(self, *args, **kwargs):
+        self.token = None
+
+    def load_state(self, state):
+        self.token = state.get('token')
+
+    def dump_state(self):
+        return {'token': self.token}
+
+
+class MyPooledModule(Module):
+    NAME = 'mypooledmodule'
+    BROWSER = StatefulBrowser
+    BROWSERS_POOL_SIZE = 2
+    CONCURRENT_METHODS = ('get_token',)
+
+    def __init__(self, *args, **kwargs):
+        super(MyPooledModule, self).__init__(*args, **kwargs)
+        self.counter_lock = Lock()
+        self.running = 0
+        self.max_running = 0
+        self.browsers = set()
+
+    def get_proxy(self):
+        return {}
+
+    def login(self):
+        self.browser.token = u'logged'
+
+    def get_token(self):
+        with self.counter_lock:
+            self.running += 1
+            self.max_running = max(self.running, self.max_running)
+            self.browsers.add(self.browser)
+        time.sleep(0.05)
+        with self.counter_lock:
+            self.running -= 1
+        return self.browser.token
+
+
+def fill_ad_with_token(module, ad, fields):
+    ad.description = module.get_token()
+    return ad
+
+
+class MyPooledFillModule(MyPooledModule):
+    OBJECTS = {Ad: fill_ad_with_token}
+    CONCURRENT_FILLOBJ = True
+    FILLOBJS_WINDOW = 4
+
+
+class BrowsersPoolTest(TestCase):
+    def test_pooled_browser(self):
+        module = MyPooledModule(None, 'mypooledmodule')
+        module.login()
+        with module.pooled_browser() as browser:
+            self.assertIsNot(browser, module._browser)
+            self.assertIs(module.browser, browser)
+            self.assertEqual(browser.token, u'logged')
+            with module.pooled_browser() as nested:
+                self.assertIs(nested, browser)
+        self.assertIs(module.browser, module._browser)
+
+        # The browser is reused.
+        with module.pooled_browser() as other:
+            self.assertIs(other, browser)
+
+    def test_pool_size(self):
+        module = MyPooledModule(None, 'mypooledmodule')
+        module.login()
+        release = Event()
+        acquired = []
+
+        def use_browser():
+            with module.pooled_browser() as browser:
+                acquired.append(browser)
+                release.wait()
+
+        threads = [Thread(target=use_browser) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        self.assertEqual(len(acquired), 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(acquired), 3)
+        self.assertEqual(len(set(acquired)), 2)
+
+    def test_backends_call(self):
+        module = MyPooledModule(None, 'mypooledmodule')
+        module.login()
+        executor = CallExecutor(max_per_backend=4)
+        calls = [BackendsCall([module], 'get_token', executor=executor) for _ in range(4)]
+        for call in calls:
+            self.assertEqual(list(call), [u'logged'])
+        self.assertEqual(module.max_running, 2)
+        self.assertEqual(len(module.browsers), 2)
+        self.assertNotIn(module._browser, module.browsers)
+
+        # Other methods are still serialized with the main browser.
+        self.assertEqual(module.call_context('login'), module)
+
+    def test_weboob_do(self):
+        module = MyPooledModule(None, 'mypooledmodule')
+        module.login()
+        weboob = WebNip(modules_path=False)
+        weboob.backend_instances[module.name] = module
+
+        # The default executor runs one call at a time on a backend, except
+        # for the methods using the pool.
+        calls = [weboob.do('get_token') for _ in range(4)]
+        for call in calls:
+            self.assertEqual(list(call), [u'logged'])
+        self.assertEqual(module.max_running, 2)
+        self.assertEqual(module.max_concurrent_calls('get_token'), 2)
+        self.assertEqual(module.max_concurrent_calls('login'), 1)
+        weboob.deinit()
+
+    def test_clone_error(self):
+        module = MyPooledModule(None, 'mypooledmodule')
+
+        def clone_browser():
+            raise ValueError('unable to clone')
+        module.clone_browser = clone_browser
+
+        call = BackendsCall([module], 'get_token')
+        with self.assertRaises(CallErrors) as cm:
+            list(call)
+        self.assertIsInstance(cm.exception.errors[0][1], ValueError)
+        # The slot of the failed browser is released.
+        self.assertEqual(module._pool_count, 0)
+
+    def test_deinit(self):
+        module = MyPooledModule(None, 'mypooledmodule')
+        module.login()
+        deinit = []
+        with module.pooled_browser() as browser:
+            browser.deinit = lambda: deinit.append(browser)
+            module.deinit()
+        self.assertEqual(deinit, [browser])
+        self.assertEqual(module._pool, [])
+
+        with module.pooled_browser() as other:
+            self.assertIsNot(other, browser)
+
+    def test_fillobjs(self):
+        module = MyPooledFillModule(None, 'mypooledmodule')
+        module.login()
+        ads = [Ad(str(i)) for i in range(6)]
+        # The caller holds the backend lock, which is needed to clone the
+        # browsers.
+        with module:
+            objs = list(module.fillobjs(ads, ['description']))
+        self.assertEqual([obj.description for obj in objs], [u'logged' for _ in range(6)])
+        self.assertEqual(module.max_running, 2)
+        self.assertEqual(len(module.browsers), 2)
+        self.assertNotIn(module._browser, module.browsers)
+        self.assertEqual(module._pool_count, 2)
+        self.assertEqual(len(module._pool), 2)
+
+        # The executor is kept between calls, and stopped by deinit().
+        executor = module._fillobjs_executor
+        list(module.fillobjs([Ad(u'6')], ['description']))
+        self.assertIs(module._fillobjs_executor, executor)
+        module.deinit()
+        self.assertIsNone(module._fillobjs_executor)
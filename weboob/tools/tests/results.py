@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import TestCase
+
+from weboob.capabilities.base import BaseObject, DecimalField, Field, IntField, StringField, NotAvailable
+from weboob.capabilities.collection import Collection
+from weboob.capabilities.date import DateField
+from weboob.tools.application.results import ResultsCondition, ResultsConditionError
+
+
+class Video(BaseObject):
+    title = StringField('Title')
+    duration = Field('Duration', timedelta)
+    date = DateField('Date')
+    rating = DecimalField('Rating')
+    views = IntField('Views')
+
+
+def make_video(id, title, duration, day, rating, views=NotAvailable):
+    video = Video(id, backend='youtube')
+    video.title = title
+    video.duration = duration
+    video.date = date(2018, 3, day)
+    video.rating = Decimal(rating)
+    video.views = views
+    return video
+
+
+class DictObject(object):
+    # Object which is not a BaseObject, only providing to_dict().
+    id = u'1'
+
+    def to_dict(self):
+        return {'id': u'1@test', 'title': u'dict'}
+
+
+class ResultsConditionTest(TestCase):
+    def setUp(self):
+        self.videos = [make_video(u'1', u'foo', timedelta(minutes=3), 1, '4.5', 10),
+                       make_video(u'2', u'bar', timedelta(hours=1, minutes=10), 15, '3'),
+                       make_video(u'3', u'baz', timedelta(seconds=40), 30, '2.5', 1000)]
+
+    def select(self, condition):
+        condition = ResultsCondition(condition)
+        return [video.id for video in self.videos if condition.is_valid(video)]
+
+    def test_types(self):
+        self.assertEqual(self.select('title=foo'), [u'1'])
+        self.assertEqual(self.select('title!=foo'), [u'2', u'3'])
+        self.assertEqual(self.select('rating>2.9'), [u'1', u'2'])
+        self.assertEqual(self.select('date<2018-03-15'), [u'1'])
+        self.assertEqual(self.select('duration>2m30s'), [u'1', u'2'])
+        self.assertEqual(self.select('views>100'), [u'3'])
+        self.assertEqual(self.select('title|a'), [u'2', u'3'])
+        self.assertEqual(self.select('rating>invalid'), [])
+
+    def test_boolean(self):
+        self.assertEqual(self.select('title=foo OR rating<3 AND date>2018-03-20'), [u'1', u'3'])
+        self.assertEqual(self.select('rating>2 AND title!=bar AND views<100'), [u'1'])
+
+    def test_id(self):
+        self.assertEqual(self.select('id=2'), [u'2'])
+        self.assertEqual(self.select('id=2@youtube'), [u'2'])
+        self.assertEqual(self.select('id=2@other'), [])
+
+    def test_invalid_field(self):
+        with self.assertRaises(ResultsConditionError):
+            self.select('foo=bar')
+        # The missing field is not evaluated when the first condition is true.
+        condition = ResultsCondition('title=foo OR foo=bar')
+        self.assertTrue(condition.is_valid(self.videos[0]))
+        with self.assertRaises(ResultsConditionError):
+            condition.is_valid(self.videos[1])
+
+    def test_to_dict(self):
+        condition = ResultsCondition('title=dict AND id=1')
+        self.assertTrue(condition.is_valid(DictObject()))
+        self.assertFalse(ResultsCondition('title=foo').is_valid(DictObject()))
+
+    def test_overridden_to_dict(self):
+        collection = Collection([u'foo', u'bar'], u'Bar')
+        collection.backend = u'test'
+        self.assertTrue(ResultsCondition('split_path=foo/bar').is_valid(collection))
+        self.assertTrue(ResultsCondition('id=bar@test').is_valid(collection))
+        self.assertFalse(ResultsCondition('id=foo/bar@test').is_valid(collection))
+
+    def test_hints(self):
+        condition = ResultsCondition('title=foo AND rating>3 OR rating>3 AND date<2018-03-10')
+        self.assertEqual([(c.left, c.op, c.right) for c in condition.get_hints()], [('rating', '>', '3')])
+        self.assertEqual(ResultsCondition('title=foo OR title=bar').get_hints(), [])
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2018 weboob project
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from weboob.tools.storage import ShardedStorage, StandardStorage
+
+
+class ShardedStorageTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'app.storage')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_save_load(self):
+        storage = ShardedStorage(self.path)
+        storage.load('backends', 'b1', {'seen': {}, 'lastpurge': 0})
+        storage.set('backends', 'b1', 'seen', 'id1', True)
+        storage.save('backends', 'b1')
+        storage.load('backends', 'b2', {})
+        storage.set('backends', 'b2', 'browser_state', {'cookies': 'xxx'})
+        storage.save('backends', 'b2')
+
+        storage = ShardedStorage(self.path)
+        self.assertEqual(list(storage.list_names('backends')), ['b1', 'b2'])
+        storage.load('backends', 'b1', {'seen': {}, 'lastpurge': 0, 'new': 1})
+        self.assertEqual(storage.get('backends', 'b1'), {'seen': {'id1': True}, 'lastpurge': 0, 'new': 1})
+        self.assertEqual(storage.get('backends', 'b1', 'seen', 'id1'), True)
+        self.assertEqual(storage.get('backends', 'b1', 'missing', 'path', default='lol'), 'lol')
+        self.assertEqual(storage.get('backends', 'b2', 'browser_state'), {'cookies': 'xxx'})
+        self.assertEqual(storage.get('backends', 'b3', 'foo', default=None), None)
+
+    def test_lazy_loading(self):
+        storage = ShardedStorage(self.path)
+        for name in ('b1', 'b2'):
+            storage.load('backends', name, {'value': name})
+            storage.save('backends', name)
+
+        with open(storage.get_filename('backends', 'b2'), 'w') as f:
+            f.write('{invalid yaml')
+
+        storage = ShardedStorage(self.path)
+        storage.load('backends', 'b1', {})
+        self.assertEqual(storage.get('backends', 'b1', 'value'), 'b1')
+
+    def test_incremental_save(self):
+        storage = ShardedStorage(self.path)
+        storage.load('backends', 'b1', {'value': 1})
+        storage.save('backends', 'b1')
+        filename = storage.get_filename('backends', 'b1')
+        os.remove(filename)
+
+        # Nothing has changed, the file is not written.
+        storage.save('backends', 'b1')
+        self.assertFalse(os.path.exists(filename))
+
+        storage.set('backends', 'b1', 'value', 2)
+        storage.save('backends', 'b1')
+        self.assertEqual(ShardedStorage(self.path).get('backends', 'b1', 'value'), 2)
+
+        storage.delete('backends', 'b1')
+        storage.save('backends', 'b1')
+        self.assertFalse(os.path.exists(filename))
+
+    def test_migration(self):
+        storage = StandardStorage(self.path)
+        storage.load('backends', 'b1', {'value': 1})
+        storage.load('applications', 'app', {'optims': ['a']})
+        storage.save('backends', 'b1')
+
+        storage = ShardedStorage(self.path)
+        self.assertEqual(storage.get('backends', 'b1', 'value'), 1)
+        self.assertEqual(storage.get('applications', 'app', 'optims'), ['a'])
+        self.assertTrue(os.path.isfile(self.path))
+
+        os.remove(self.path)
+        storage = ShardedStorage(self.path)
+        self.assertEqual(storage.get('backends', 'b1', 'value'), 1)
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['app.storage.d', 'app.storage.d.lock'])